@@ -0,0 +1,117 @@
+"""
+On-the-fly augmentation of raw IMU windows, vectorized over the batch.
+
+Augmenter works on (batch, window, 6) windows before feature extraction and
+draws fresh randomness on every call, so each pass over the training windows
+sees different variants without ever storing augmented copies of the data:
+
+    noise     -- Gaussian noise, as a fraction of each channel's std in the batch
+    scale     -- per-window, per-channel magnitude factor ~ N(1, scale)
+    rotation  -- small random 3D rotation (max degrees) applied to accel and gyro alike,
+                 i.e. the sensor sitting slightly differently in the hand
+    warp      -- smooth random time warp (relative speed deviation)
+    shift     -- time shift of up to `shift` rows, padded with the edge sample
+
+Each transform hits a window with probability `p`. augmented_matrix() builds a
+training matrix from only the training windows (a split or CV fold): the
+original features plus `copies` augmented passes, assembled batch by batch so
+only feature rows are materialized.
+"""
+import numpy as np
+from dataset import flatten_windows
+
+
+def random_rotations(rng, n, max_degrees):
+    """(n, 3, 3) rotation matrices about random axes by up to max_degrees (Rodrigues)."""
+    axis = rng.normal(size=(n, 3))
+    axis /= np.linalg.norm(axis, axis=1, keepdims=True)
+    angle = np.radians(rng.uniform(-max_degrees, max_degrees, size=n))[:, None, None]
+    k = np.zeros((n, 3, 3))
+    k[:, 0, 1], k[:, 0, 2], k[:, 1, 2] = -axis[:, 2], axis[:, 1], -axis[:, 0]
+    k -= k.transpose(0, 2, 1)
+    return np.eye(3) + np.sin(angle) * k + (1 - np.cos(angle)) * (k @ k)
+
+
+def resample_rows(x, positions):
+    """Linearly interpolate each window of x at fractional row positions (batch, window)."""
+    n = x.shape[1]
+    positions = np.clip(positions, 0, n - 1)
+    lo = np.floor(positions).astype(np.int64)
+    hi = np.minimum(lo + 1, n - 1)
+    frac = (positions - lo)[:, :, None]
+    lo_rows = np.take_along_axis(x, lo[:, :, None], axis=1)
+    hi_rows = np.take_along_axis(x, hi[:, :, None], axis=1)
+    return lo_rows * (1 - frac) + hi_rows * frac
+
+
+class Augmenter:
+    """Callable batch augmentation; pass 0 to disable a transform."""
+
+    def __init__(self, noise=0.05, scale=0.1, rotation=10.0, warp=0.2, shift=10, p=0.5, warp_knots=4, seed=None):
+        self.noise = noise
+        self.scale = scale
+        self.rotation = rotation
+        self.warp = warp
+        self.shift = shift
+        self.p = p
+        self.warp_knots = warp_knots
+        self.rng = np.random.default_rng(seed)
+
+    def _chosen(self, n):
+        return self.rng.random(n) < self.p
+
+    def __call__(self, windows):
+        x = np.array(windows, dtype=np.float64)  # always a copy; the input may be a view of the store
+        batch, n, _ = x.shape
+        rows = np.arange(n, dtype=np.float64)
+
+        if self.shift:
+            offsets = self.rng.integers(-self.shift, self.shift + 1, size=batch) * self._chosen(batch)
+            x = resample_rows(x, rows[None, :] - offsets[:, None])
+
+        if self.warp:
+            # random speed at a few knots, interpolated and integrated into a monotonic time map
+            speeds = 1 + self.warp * self.rng.standard_normal((batch, self.warp_knots + 2, 1))
+            speeds = np.clip(speeds, 0.2, None)
+            speeds[~self._chosen(batch)] = 1.0
+            knot_positions = np.broadcast_to(rows * (self.warp_knots + 1) / max(n - 1, 1), (batch, n))
+            speed = resample_rows(speeds, knot_positions)[:, :, 0]
+            warped = np.cumsum(speed, axis=1) - speed[:, :1]
+            warped *= (n - 1) / warped[:, -1:]
+            x = resample_rows(x, warped)
+
+        if self.rotation:
+            rotations = random_rotations(self.rng, batch, self.rotation)
+            rotations[~self._chosen(batch)] = np.eye(3)
+            x[:, :, 0:3] = np.einsum('bij,btj->bti', rotations, x[:, :, 0:3])
+            x[:, :, 3:6] = np.einsum('bij,btj->bti', rotations, x[:, :, 3:6])
+
+        if self.scale:
+            factors = 1 + self.scale * self.rng.standard_normal((batch, 1, x.shape[2]))
+            factors[~self._chosen(batch)] = 1.0
+            x *= factors
+
+        if self.noise:
+            sigma = self.noise * x.std(axis=(0, 1))
+            chosen = self._chosen(batch)
+            x[chosen] += self.rng.standard_normal(x[chosen].shape) * sigma
+
+        return x
+
+
+def augmented_matrix(windows, idx, augmenter, copies=1, transform=flatten_windows, batch_size=256):
+    """Features of windows[idx] plus `copies` freshly augmented passes over them.
+
+    Returns (X, y) with len(idx) * (copies + 1) rows; the originals come first.
+    """
+    idx = np.asarray(idx)
+    passes = [lambda w: w] + [augmenter] * copies
+    X, y = None, np.tile(windows.labels[idx], copies + 1)
+    for p, augment in enumerate(passes):
+        for i in range(0, len(idx), batch_size):
+            features = transform(augment(windows.windows(idx[i:i + batch_size])))
+            if X is None:
+                X = np.empty((len(y),) + features.shape[1:], dtype=features.dtype)
+            start = p * len(idx) + i
+            X[start:start + len(features)] = features
+    return X, y
@@ -0,0 +1,336 @@
+"""
+Latency and throughput benchmarks for each stage of the real-time path.
+
+    python benchmark.py --models ../model/bundle.npz ../model/lgbm_bundle.npz --output bench.json
+    python benchmark.py --models ../model/bundle.npz --baseline bench.json   # exit code 1 on regression
+
+The input is a stream of data_new recordings, resampled to each --rates value
+as if the sensor ran at that rate. Stages, in the order a sample meets them:
+
+    serial     -- read_available() from a pseudo-terminal (imu_replay.PtyReplay), unpaced;
+                  includes parsing, reported per sample and as bytes/s
+    parse      -- StreamParser / BinaryStreamParser.feed() on 256-byte chunks, per sample
+    resample   -- StreamResampler.feed() onto the model's grid, per 5-sample chunk
+    buffer     -- RunningFeatures.append() (ring buffer plus running sums), per sample
+    features   -- RunningFeatures.features() and extract_features() for one window
+    predict    -- ModelServer.predict_features() for one feature row (scaler, model, label)
+    classify   -- StreamingClassifier.push() per sample, ungated, model calls included
+    udp_ack    -- command sent to ACK received, against the stub drone
+    end_to_end -- a sample's bytes written to the serial port until the command it
+                  triggered reaches the stub drone, through the threaded Pipeline
+
+Each row of the JSON report is one (stage, variant, model, rate, window, hop)
+measurement with n, mean/p50/p95/p99/max in microseconds and the throughput
+per second. --baseline compares p50 against an earlier report and fails when a
+stage is more than --tolerance slower. Window sizes vary the feature stages
+only; the model stages use the window the bundle was trained with.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import socket
+import sys
+import time
+
+import numpy as np
+import serial
+from dataset import DATA_ROOT
+from features import extract_features
+from imu_parser import SAMPLE_DTYPE, as_array, make_parser, read_available
+from imu_replay import ENCODERS, PtyReplay, find_csvs, join_recordings, load_csv, replay
+from pipeline import Pipeline
+from resample import StreamResampler, resample_recording
+from running_features import RunningFeatures
+from serving import ModelServer, streaming_classifier
+from tello_stub import BackgroundStub
+
+DEFAULT_MODELS = ['../model/bundle.npz', '../model/lgbm_bundle.npz']  # written by svm.py and lgbm.py
+PARSE_CHUNK = 256  # bytes per parser feed, about one serial read at 115200 baud
+RESAMPLE_CHUNK = 5  # samples per resampler feed
+UDP_COMMANDS = 200
+
+
+def summarize(seconds, per=1, throughput=True):
+    """Latency statistics (microseconds) of `seconds` durations, each covering `per` items."""
+    us = np.asarray(seconds, dtype=np.float64) * 1e6 / per
+    if not len(us):
+        return {'n': 0}
+    p50, p95, p99 = np.percentile(us, [50, 95, 99])
+    row = {'n': int(round(len(us) * per)), 'mean_us': round(float(us.mean()), 3), 'p50_us': round(float(p50), 3),
+           'p95_us': round(float(p95), 3), 'p99_us': round(float(p99), 3), 'max_us': round(float(us.max()), 3)}
+    if throughput:
+        row['per_s'] = round(1e6 / float(us.mean()), 1)
+    return row
+
+
+def timed_calls(fn, items):
+    """Durations of fn(item) for each item."""
+    durations = np.empty(len(items))
+    clock = time.perf_counter
+    for i, item in enumerate(items):
+        start = clock()
+        fn(item)
+        durations[i] = clock() - start
+    return durations
+
+
+def as_records(rows):
+    records = np.empty(len(rows), dtype=SAMPLE_DTYPE)
+    as_array(records)[:] = rows
+    return records
+
+
+def input_stream(files, rate):
+    """The recordings joined into one stream and resampled to `rate` Hz, as SAMPLE_DTYPE records."""
+    records, _ = join_recordings([(f, load_csv(f)) for f in files])
+    return as_records(resample_recording(as_array(records), rate))
+
+
+def bench_serial(records, fmt):
+    data = b''.join(replay(records, fmt, chunk_samples=64))
+    chunks = [data[i:i + 4096] for i in range(0, len(data), 4096)]
+    source = PtyReplay(chunks)
+    parser = make_parser(fmt)
+    port = serial.Serial(source.port, timeout=0.1)
+    try:
+        source.start()
+        start = time.perf_counter()
+        reads = []
+        while parser.frames < len(records):
+            before = time.perf_counter()
+            if not len(read_available(port, parser)) and not source.is_alive():
+                break
+            reads.append(time.perf_counter() - before)
+        elapsed = time.perf_counter() - start
+    finally:
+        port.close()
+        source.close()
+    row = summarize(reads, per=max(parser.frames, 1) / max(len(reads), 1))
+    row.update(per_s=round(parser.frames / elapsed, 1), bytes_per_s=round(len(data) / elapsed, 1), reads=len(reads))
+    return row
+
+
+def bench_parse(records, fmt):
+    data = b''.join(replay(records, fmt, chunk_samples=64))
+    chunks = [data[i:i + PARSE_CHUNK] for i in range(0, len(data), PARSE_CHUNK)]
+    parser = make_parser(fmt)
+    return summarize(timed_calls(parser.feed, chunks), per=len(records) / len(chunks))
+
+
+def bench_resample(records, model_rate):
+    rows = as_array(records)
+    chunks = [rows[i:i + RESAMPLE_CHUNK] for i in range(0, len(rows), RESAMPLE_CHUNK)]
+    return summarize(timed_calls(StreamResampler(model_rate).feed, chunks))
+
+
+def bench_buffer(values, window):
+    engine = RunningFeatures(window)
+    return summarize(timed_calls(engine.append, values))
+
+
+def bench_features(values, window, n=500):
+    engine = RunningFeatures(window)
+    engine.extend(values[:window])
+    rows = {'running': summarize(timed_calls(lambda _: engine.features(), range(n)))}
+    windows = [values[i:i + window][None] for i in range(min(n, len(values) - window))]
+    rows['batch'] = summarize(timed_calls(extract_features, windows))
+    return rows
+
+
+def bench_predict(server, values, n=500):
+    window = server.window_rows
+    engine = RunningFeatures(window)
+    engine.extend(values[:window])
+    rows = [engine.features()]
+    for sample in values[window:window + n - 1]:
+        engine.append(sample)
+        rows.append(engine.features())
+    return summarize(timed_calls(server.predict_features, rows))
+
+
+def bench_classify(server, values, hop):
+    classifier = streaming_classifier(server, hop=hop, votes=1)
+    classifier.push_many(values[:server.window_rows])
+    rest = values[server.window_rows:]
+    row = summarize(timed_calls(classifier.push, rest))
+    row['windows'] = classifier.predictions
+    return row
+
+
+def bench_udp(n=UDP_COMMANDS):
+    stub = BackgroundStub()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(1.0)
+    durations = []
+    try:
+        for i in range(n):
+            start = time.perf_counter()
+            sock.sendto(b'command', stub.address)
+            sock.recvfrom(1024)
+            durations.append(time.perf_counter() - start)
+    finally:
+        sock.close()
+        stub.close()
+    return summarize(durations, throughput=False)
+
+
+def bench_end_to_end(server, records, hop, fmt='text', settle=0.5):
+    """Write `records` to a pty in real time through the full Pipeline; every classified window sends a command.
+
+    The command carries the classifier's sample count, which maps back to the
+    input sample that completed the window and to the moment its bytes were written.
+    """
+    classifier = streaming_classifier(server, hop=hop, votes=1, refractory=0, idle_labels=())
+    on_gesture = lambda gesture: f"bench {classifier.buffer.count}"
+    write_times = []
+
+    def timed(chunks):
+        for chunk in chunks:
+            yield chunk
+            write_times.append(time.monotonic())  # resumed once the chunk is written
+
+    stub = BackgroundStub()
+    source = PtyReplay(timed(replay(records, fmt, chunk_samples=1, speed=1.0)))
+    port = serial.Serial(source.port, timeout=0.1)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    pipeline = Pipeline(port, make_parser(fmt), classifier, on_gesture, sock, stub.address,
+                        resampler=server.resampler())
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):  # CommandSender prints every command and ACK
+            pipeline.start()
+            source.start()
+            source.join()
+            time.sleep(settle)
+            pipeline.stop()
+    finally:
+        port.close()
+        source.close()
+        sock.close()
+        stub.close()
+
+    times = as_array(records)[:, 0]
+    latencies = []
+    for arrived, command in stub.protocol.received:
+        count = int(command.split()[1])
+        if server.sample_rate:  # grid sample `count - 1` is emitted by the first input sample at or after it
+            index = np.searchsorted(times, times[0] + (count - 1) / server.sample_rate - 1e-9)
+        else:
+            index = count - 1
+        if index < len(write_times):
+            latencies.append(arrived - write_times[index])
+    row = summarize(latencies, throughput=False)
+    snapshot = pipeline.stats.snapshot()
+    row.update({key: snapshot.get(key, 0) for key in ('samples_read', 'samples_dropped', 'windows_classified',
+                                                       'commands_sent', 'commands_dropped', 'ack_timeouts')})
+    return row
+
+
+def environment():
+    import sklearn
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'sklearn': sklearn.__version__,
+            'machine': platform.machine(), 'processor': platform.processor(), 'cpus': os.cpu_count(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def run(args):
+    files = find_csvs([args.data_root])
+    files = files[::max(1, len(files) // args.recordings)][:args.recordings]  # spread over the classes
+    servers = {os.path.basename(path): ModelServer.load(path) for path in args.models if os.path.exists(path)}
+    if not servers:
+        raise FileNotFoundError(f"None of the model bundles exist: {args.models}; run svm.py / lgbm.py first")
+    results = []
+
+    def add(stage, row, variant=None, model=None, rate=None, window=None, hop=None):
+        results.append({'stage': stage, 'variant': variant, 'model': model, 'rate': rate,
+                        'window': window, 'hop': hop, **row})
+        label = " ".join(f"{key}={value}" for key, value in
+                         (('model', model), ('variant', variant), ('rate', rate), ('window', window), ('hop', hop))
+                         if value is not None)
+        rate_text = f"{row['per_s']:12.1f}/s" if 'per_s' in row else ''
+        print(f"{stage:10s} {label:55s} p50 {row.get('p50_us', float('nan')):10.1f} us  "
+              f"p99 {row.get('p99_us', float('nan')):10.1f} us  {rate_text}")
+
+    for rate in args.rates:
+        records = input_stream(files, rate)
+        values = np.ascontiguousarray(as_array(records)[:, 1:])
+        print(f"-- {len(records)} samples at {rate:g} Hz from {len(files)} recordings")
+        for fmt in ENCODERS:
+            add('serial', bench_serial(records, fmt), variant=fmt, rate=rate)
+            add('parse', bench_parse(records, fmt), variant=fmt, rate=rate)
+        for name, server in servers.items():
+            if server.sample_rate:
+                add('resample', bench_resample(records, server.sample_rate), model=name, rate=rate)
+        for window in args.windows:
+            add('buffer', bench_buffer(values, window), rate=rate, window=window)
+            for variant, row in bench_features(values, window).items():
+                add('features', row, variant=variant, rate=rate, window=window)
+        if args.e2e_seconds:
+            for name, server in servers.items():
+                # one window to fill the buffer, then --e2e-seconds of classified windows
+                seconds = server.window_rows / (server.sample_rate or rate) + args.e2e_seconds
+                e2e_records = records[:int(seconds * rate)]
+                for hop in args.hops:
+                    add('end_to_end', bench_end_to_end(server, e2e_records, hop), model=name, rate=rate,
+                        window=server.window_rows, hop=hop)
+
+    records = input_stream(files, args.rates[0])
+    values = np.ascontiguousarray(as_array(records)[:, 1:])
+    for name, server in servers.items():
+        add('predict', bench_predict(server, values), model=name, window=server.window_rows)
+        for hop in args.hops:
+            add('classify', bench_classify(server, values, hop), model=name, window=server.window_rows, hop=hop)
+    add('udp_ack', bench_udp())
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Rows whose p50 is more than `tolerance` slower than the matching baseline row."""
+    key = lambda row: tuple(row.get(k) for k in ('stage', 'variant', 'model', 'rate', 'window', 'hop'))
+    previous = {key(row): row for row in baseline['results']}
+    regressions = []
+    for row in results:
+        old = previous.get(key(row))
+        if old is None or not old.get('p50_us') or 'p50_us' not in row:
+            continue
+        ratio = row['p50_us'] / old['p50_us']
+        if ratio > 1 + tolerance:
+            regressions.append((key(row), old['p50_us'], row['p50_us'], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark each stage of the real-time gesture path")
+    parser.add_argument('--models', nargs='+', default=DEFAULT_MODELS, help="serving bundles (.npz or .pkl)")
+    parser.add_argument('--data-root', default=os.path.join('..', DATA_ROOT))
+    parser.add_argument('--recordings', type=int, default=20, help="recordings joined into the input stream")
+    parser.add_argument('--rates', type=float, nargs='+', default=[50.0, 100.0], help="input sample rates (Hz)")
+    parser.add_argument('--windows', type=int, nargs='+', default=[60, 120, 240], help="feature window sizes")
+    parser.add_argument('--hops', type=int, nargs='+', default=[1, 5, 20])
+    parser.add_argument('--e2e-seconds', type=float, default=3.0,
+                        help="real-time seconds streamed per end-to-end run after the first window (0 skips end_to_end)")
+    parser.add_argument('--output', help="write the JSON report here")
+    parser.add_argument('--baseline', help="earlier JSON report to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed p50 slowdown vs the baseline")
+    args = parser.parse_args()
+
+    report = {'environment': environment(), 'config': vars(args), 'results': run(args)}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=1)
+        print(f"Report saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report['results'], json.load(f), args.tolerance)
+        for key, old, new, ratio in regressions:
+            print(f"REGRESSION {key}: p50 {old:.1f} -> {new:.1f} us ({ratio:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print(f"No stage slower than {1 + args.tolerance:.2f}x the baseline")
+
+
+if __name__ == '__main__':
+    main()
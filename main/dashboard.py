@@ -0,0 +1,231 @@
+"""
+Live view of the IMU stream and the classifier's confidence.
+
+    feed = LiveFeed(server.class_list, rate=100).start()   # opens the plot window
+    feed.push(values)                                       # (n, 6) samples, every read
+    feed.proba(server.last_proba)                           # after each prediction
+    feed.close()
+
+The loop that reads the serial port only copies samples into a ring buffer
+in a memory-mapped file (a slice assignment per read; it never waits on the
+plot). A separate process (python dashboard.py <file> ...) draws the last
+`seconds` of accel and gyro and the latest class probabilities from that
+file at up to `fps` frames per second. Every line, bar and x axis is
+allocated once; a frame copies the ring into a preallocated window, updates
+the artists in place and blits them onto a cached background instead of
+redrawing the figure. When a frame takes longer than 1/fps the frames it
+missed are skipped, not queued: the next frame shows the newest samples and
+no sample is held back for the plot. The plot may show a sample row torn by
+a concurrent write for one frame; nothing else reads the file.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+SECONDS = 5.0  # history shown
+FPS = 20
+ACCE_RANGE = 4.0  # y limits (+/-) of the accel plot, in g
+GYRO_RANGE = 500.0  # y limits (+/-) of the gyro plot, in deg/s
+CHANNELS = ['acce_x', 'acce_y', 'acce_z', 'gyro_x', 'gyro_y', 'gyro_z']
+
+# file layout: int64 header [samples written, predictions written, closed], sample ring, probabilities
+HEADER_FIELDS = 3
+HEADER_BYTES = HEADER_FIELDS * 8
+
+
+def _open(path, capacity, n_classes, mode):
+    header = np.memmap(path, np.int64, mode, 0, (HEADER_FIELDS,))
+    ring = np.memmap(path, np.float64, mode, HEADER_BYTES, (capacity, len(CHANNELS)))
+    proba = np.memmap(path, np.float64, mode, HEADER_BYTES + ring.nbytes, (n_classes,))
+    return header, ring, proba
+
+
+class LiveFeed:
+    """Producer side: write samples and probabilities for the dashboard process."""
+
+    def __init__(self, class_list, rate, seconds=SECONDS, fps=FPS):
+        self.class_list = list(class_list)
+        self.rate = rate
+        self.seconds = seconds
+        self.fps = fps
+        self.capacity = max(int(seconds * rate), 2)
+        self.count = 0
+        self.process = None
+
+    def start(self):
+        fd, self.path = tempfile.mkstemp(prefix='imu-dashboard-', suffix='.bin')
+        os.close(fd)
+        self.header, self.ring, self._proba = _open(self.path, self.capacity, len(self.class_list), 'w+')
+        self.ring[:] = np.nan  # not yet received: not drawn
+        self.process = subprocess.Popen([sys.executable, os.path.abspath(__file__), self.path,
+                                         '--rate', str(self.rate), '--seconds', str(self.seconds),
+                                         '--fps', str(self.fps), '--classes', *self.class_list])
+        return self
+
+    def push(self, values):
+        """Append (n, 6) samples to the ring."""
+        n = len(values)
+        if not n:
+            return
+        values = values[-self.capacity:]
+        start = (self.count + n - len(values)) % self.capacity
+        first = min(len(values), self.capacity - start)
+        self.ring[start:start + first] = values[:first]
+        self.ring[:len(values) - first] = values[first:]
+        self.count += n
+        self.header[0] = self.count
+
+    def proba(self, proba):
+        """Publish the class probabilities of the latest prediction."""
+        if proba is None:
+            return
+        self._proba[:] = proba
+        self.header[1] += 1
+
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def close(self):
+        if self.process is None:
+            return
+        self.header[2] = 1
+        try:
+            self.process.wait(timeout=2.0)
+        except subprocess.TimeoutExpired:
+            self.process.terminate()
+        self.process = None
+        del self.header, self.ring, self._proba
+        os.remove(self.path)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Dashboard:
+    """Consumer side: the figure, its preallocated artists and one blitted frame per call."""
+
+    def __init__(self, path, class_list, rate, seconds=SECONDS, acce_range=ACCE_RANGE, gyro_range=GYRO_RANGE):
+        import matplotlib.pyplot as plt
+        self.class_list = list(class_list)
+        self.capacity = max(int(seconds * rate), 2)
+        self.header, self.ring, self.proba = _open(path, self.capacity, len(self.class_list), 'r')
+        self.window = np.full((self.capacity, len(CHANNELS)), np.nan)  # oldest sample first
+        self.base = np.arange(self.capacity)
+        self.order = np.empty(self.capacity, dtype=np.intp)
+        self.predictions = -1
+
+        self.fig, (ax_acce, ax_gyro, ax_proba) = plt.subplots(
+            3, 1, figsize=(10, 8), gridspec_kw={'height_ratios': [2, 2, 1.5]})
+        self.fig.canvas.manager.set_window_title("IMU dashboard")
+        time_axis = np.arange(1 - self.capacity, 1) / rate
+        self.lines = []
+        for ax, title, limit, channels in [(ax_acce, "Acceleration (g)", acce_range, CHANNELS[:3]),
+                                           (ax_gyro, "Gyroscope (deg/s)", gyro_range, CHANNELS[3:])]:
+            for channel in channels:
+                line, = ax.plot(time_axis, np.full(self.capacity, np.nan), label=channel, linewidth=0.8,
+                                animated=True)
+                self.lines.append(line)
+            ax.set_xlim(time_axis[0], 0)
+            ax.set_ylim(-limit, limit)  # fixed: autoscaling would invalidate the cached background
+            ax.set_ylabel(title)
+            ax.grid(True)
+            ax.legend(loc='upper left')
+        ax_gyro.set_xlabel("Time (s)")
+        positions = np.arange(len(self.class_list))
+        self.bars = ax_proba.bar(positions, np.zeros(len(self.class_list)), animated=True)
+        ax_proba.set_xticks(positions, self.class_list, rotation=30, ha='right', fontsize=8)
+        ax_proba.set_ylim(0, 1)
+        ax_proba.set_ylabel("Probability")
+        self.label = ax_proba.text(0.99, 0.85, "no prediction yet", transform=ax_proba.transAxes, ha='right',
+                                   animated=True)
+        self.artists = self.lines + list(self.bars) + [self.label]
+        self.fig.tight_layout()
+
+        self.background = None
+        self.fig.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _on_draw(self, event):
+        # full redraws (first show, resize) refresh the background the frames are blitted onto
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        for artist in self.artists:
+            self.fig.draw_artist(artist)
+
+    def closed(self):
+        return bool(self.header[2])
+
+    def frame(self):
+        """Copy the newest samples and probabilities into the artists and blit them."""
+        count = int(self.header[0])
+        np.add(self.base, count, out=self.order)
+        np.mod(self.order, self.capacity, out=self.order)
+        np.take(self.ring, self.order, axis=0, out=self.window)
+        for k, line in enumerate(self.lines):
+            line.set_ydata(self.window[:, k])
+        predictions = int(self.header[1])
+        if predictions != self.predictions:
+            self.predictions = predictions
+            for bar, p in zip(self.bars, self.proba):
+                bar.set_height(p)
+            best = int(np.argmax(self.proba))
+            self.label.set_text(f"{self.class_list[best]} {self.proba[best]:.2f} (prediction {predictions})")
+        if self.background is None:
+            self.fig.canvas.draw()
+        canvas = self.fig.canvas
+        canvas.restore_region(self.background)
+        for artist in self.artists:
+            self.fig.draw_artist(artist)
+        canvas.blit(self.fig.bbox)
+        canvas.flush_events()
+
+
+def run(dashboard, fps=FPS):
+    """Draw frames until the producer closes the feed or the window is closed; returns (drawn, skipped)."""
+    import matplotlib.pyplot as plt
+    parent = os.getppid()
+    plt.show(block=False)
+    period = 1.0 / fps
+    next_frame = time.monotonic()
+    drawn = skipped = 0
+    while plt.fignum_exists(dashboard.fig.number) and not dashboard.closed() and os.getppid() == parent:
+        dashboard.frame()
+        drawn += 1
+        next_frame += period
+        delay = next_frame - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        else:  # behind: skip the missed frames rather than catching up on them
+            skipped += int(-delay / period) + 1
+            next_frame = time.monotonic()
+    return drawn, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plot a LiveFeed (started by LiveFeed.start())")
+    parser.add_argument('path', help="memory-mapped feed file")
+    parser.add_argument('--rate', type=float, required=True, help="sample rate of the feed (Hz)")
+    parser.add_argument('--seconds', type=float, default=SECONDS)
+    parser.add_argument('--fps', type=float, default=FPS)
+    parser.add_argument('--classes', nargs='+', required=True)
+    parser.add_argument('--acce-range', type=float, default=ACCE_RANGE)
+    parser.add_argument('--gyro-range', type=float, default=GYRO_RANGE)
+    args = parser.parse_args()
+
+    import matplotlib
+    if matplotlib.get_backend().lower() == 'agg':
+        print("Dashboard: no interactive matplotlib backend available, not plotting.")
+        return
+    dashboard = Dashboard(args.path, args.classes, args.rate, args.seconds, args.acce_range, args.gyro_range)
+    drawn, skipped = run(dashboard, args.fps)
+    print(f"Dashboard: {drawn} frames drawn, {skipped} skipped")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,13 @@
 import serial
 import serial.tools.list_ports
+import argparse
 import os
-import csv
 import time
+from dataset import DATA_ROOT
+from recorder import SessionRecorder
+from segment import report, segment_session, split_evenly, take_seconds, write_segments
+
+SERIAL_FORMAT = 'text'  # 'binary' when the firmware is built with IMU_BINARY_FRAMES
 
 def get_port():
     ports = serial.tools.list_ports.comports()
@@ -16,56 +21,60 @@ def open_serial_port(port='COM7', baudrate=115200):
         print(f"Error opening serial port {port}: {e}")
         return None
 
-def parse_line(line, line_data, start_time):
-    """Parse the line and update line_data dictionary with the new data."""
-    try:
-        if "time" in line:
-            time_stamp = time.time() - start_time
-            line_data['timestamp'] = round(time_stamp, 3)
-        elif "acce_x" in line:
-            acce_data = line.split("mpu6050 test: ")[1]
-            acce_x, acce_y, acce_z = [float(val.split(":")[1]) for val in acce_data.split(",")]
-            line_data.update({'acce_x': acce_x, 'acce_y': acce_y, 'acce_z': acce_z})
-        elif "gyro_x" in line:
-            gyro_data = line.split("mpu6050 test: ")[1]
-            gyro_x, gyro_y, gyro_z = [float(val.split(":")[1]) for val in gyro_data.split(",")]
-            line_data.update({'gyro_x': gyro_x, 'gyro_y': gyro_y, 'gyro_z': gyro_z})
-    except Exception as e:
-        print(f"Error parsing line: {line}, error: {e}")
-
-    required_keys = ['timestamp', 'acce_x', 'acce_y', 'acce_z', 'gyro_x', 'gyro_y', 'gyro_z']
-    return all(key in line_data for key in required_keys)
-
 def collect_gesture_data(ser, gesture_name, direction, num_in_series, duration=5):
     """Collect data for a specific gesture and save to a CSV file."""
     data_dir = os.path.join('.', 'data', 'zixin', gesture_name)
     os.makedirs(data_dir, exist_ok=True)
 
-    file_path = os.path.join(data_dir, f"{direction}_{num_in_series}.csv")
+    stem = os.path.join(data_dir, f"{direction}_{num_in_series}")
+    file_path = stem + '.csv'
     print(f"Collecting data for '{direction}_{num_in_series}' gesture, saving to {file_path}")
 
     try:
-        with open(file_path, mode='w', newline='') as file:
-            writer = csv.DictWriter(file, fieldnames=['timestamp', 'acce_x', 'acce_y', 'acce_z', 'gyro_x', 'gyro_y', 'gyro_z'])
-            writer.writeheader()
-            line_data = {} 
-            start_time = time.time()
-
-            while time.time() - start_time <= duration:
-                if ser.in_waiting > 0:
-                    line = ser.readline().decode('utf-8').rstrip()
-                    print(line)
-                    
-                    if parse_line(line, line_data, start_time):
-                        writer.writerow(line_data)
-                        line_data.clear() 
-
-        print(f"Data collection for '{gesture_name}' completed and saved.")
+        ser.reset_input_buffer()  # bytes that arrived before Enter belong to no take
+        # serial reads and disk writes on their own threads; the raw bytes are kept in <stem>.raw
+        recorder = SessionRecorder(ser, stem, fmt=SERIAL_FORMAT, csv_path=file_path).start()
+        time.sleep(duration)
+        recorder.close()
+        if recorder.error is not None:
+            raise recorder.error
+
+        print(f"Data collection for '{gesture_name}' completed and saved: {recorder.summary()}")
+        if recorder.parser.malformed or getattr(recorder.parser, 'dropped', 0):
+            print(f"Parser: {recorder.parser.stats()}")
 
     except Exception as e:
         print(f"Error during data collection for '{gesture_name}': {e}")
 
-def main():
+def collect_session(ser, gesture_name, direction, length=None):
+    """Record one long session of repeated gestures and split it into data_new/<gesture>/<direction>/.
+
+    Each repetition is `length` seconds, by default as long as the takes already in the dataset.
+    """
+    data_dir = os.path.join('.', 'data', 'zixin', gesture_name)
+    os.makedirs(data_dir, exist_ok=True)
+    stem = os.path.join(data_dir, f"session_{direction}_{time.strftime('%Y%m%d-%H%M%S')}")
+
+    if length is None:
+        length = take_seconds(DATA_ROOT)
+    input(f"Press Enter to start a '{gesture_name}/{direction}' session...")
+    ser.reset_input_buffer()
+    # no CSV for the whole session: rename_csv.py would take it for a single take
+    recorder = SessionRecorder(ser, stem, fmt=SERIAL_FORMAT).start()
+    input("Repeat the gesture, pausing still for a second between repetitions; press Enter when done.")
+    records = recorder.close()
+    print(f"Session saved to {stem}.raw: {recorder.summary()}")
+
+    if gesture_name == 'none':
+        segments, rejected = split_evenly(records, length), []
+    else:
+        segments, rejected = segment_session(records, length)
+    report(segments, rejected)
+    if segments:
+        paths = write_segments(segments, gesture_name, direction, stem, DATA_ROOT)
+        print(f"Wrote {paths[0]} .. {paths[-1]}")
+
+def main(continuous=False, length=None):
     ser = open_serial_port()
     if ser is None:
         print("Could not open serial port. Exiting...")
@@ -80,6 +89,9 @@ def main():
     try: 
         for gesture in gestures:
             for direction in directions:
+                if continuous:
+                    collect_session(ser, gesture, direction, length)
+                    continue
                 for i in range(num_collect):
                     input(f"Press Enter to start collecting data for '{gesture}/{direction}_{i}' gesture...")
                     collect_gesture_data(ser, gesture, direction, num_in_series=i, duration=duration)
@@ -91,5 +103,11 @@ def main():
         print("Serial connection closed.")
 
 if __name__ == '__main__':
-    get_port()  
-    main()
+    arg_parser = argparse.ArgumentParser(description="Collect gesture recordings from the IMU")
+    arg_parser.add_argument('--continuous', action='store_true',
+                            help="one session per gesture, split into repetitions automatically (segment.py)")
+    arg_parser.add_argument('--length', type=float, default=None,
+                            help="seconds per repetition (default: median length of the takes in data_new)")
+    args = arg_parser.parse_args()
+    get_port()
+    main(args.continuous, args.length)
@@ -4,11 +4,35 @@ CS 528 - Assignment 2
 Due Date: Oct 13, 2024 
 This is the file for visualizing raw data from IMU vs time. 
 *** I only remove the initial datapoints because it makes it clear to see the trends. *** 
+
+Batch report for the whole dataset, rendered headless (Agg) on a process pool:
+
+    python data_vis.py --batch --data-root ../data_new --out ../graph/vis
+
+writes one PNG per recording (<out>/<category>/<direction>/<name>.png, accel
+and gyro) and one overlay per class (<out>/classes/<label>.png, every
+recording of the class on the same axes). Lines longer than --max-points are
+downsampled (min/max per bucket by default, or LTTB) so long sessions render
+as fast as short ones without losing their peaks. <out>/report.json keeps the
+(mtime, size) signature of the input of every PNG; a re-run only renders
+the plots whose inputs changed, were added, or whose PNG is missing.
+
+Without --batch the given CSVs are shown interactively, as before.
 """
+import argparse
+import json
 import os
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import pandas as pd 
 import matplotlib.pyplot as plt
+from dataset import DATA_ROOT, file_signature, find_recordings
+
+MAX_POINTS = 2000  # per line in batch plots; longer signals are downsampled
+REPORT_FILE = "report.json"
+ACCE = ['acce_x', 'acce_y', 'acce_z']
+GYRO = ['gyro_x', 'gyro_y', 'gyro_z']
 
 def data_vis_multiple_signals(file_name, title, signals, labels, time):
     plt.figure(figsize=(10, 6))
@@ -22,7 +46,7 @@ def data_vis_multiple_signals(file_name, title, signals, labels, time):
     plt.legend()
     plt.show()
 
-def data_vis_multiple_signals_subplots(file_name, title, signals, labels, time):
+def data_vis_multiple_signals_subplots(file_name, title, signals, labels, time, sampling_rate=100):
     fig, axes = plt.subplots(2, 1, figsize=(10, 6))
     fig.suptitle(f"{title} for {file_name}", fontsize=16)
     x_min, x_max = -0.25, 4.25 
@@ -62,40 +86,214 @@ def data_vis(title, signal, time):
     plt.grid(True)
     plt.show()
 
+
+
+def downsample_minmax(time, signal, max_points=MAX_POINTS):
+    """Keep the smallest and largest sample of each of max_points // 2 buckets, in time order."""
+    n = len(signal)
+    if n <= max_points:
+        return time, signal
+    edges = np.linspace(0, n, max_points // 2 + 1).astype(int)
+    keep = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        chunk = signal[start:end]
+        keep.extend(sorted({start + int(np.argmin(chunk)), start + int(np.argmax(chunk))}))
+    keep = np.asarray(keep)
+    return time[keep], signal[keep]
+
+
+def downsample_lttb(time, signal, max_points=MAX_POINTS):
+    """Largest-Triangle-Three-Buckets: the max_points samples that best keep the visual shape."""
+    n = len(signal)
+    if n <= max_points or max_points < 3:
+        return time, signal
+    every = (n - 2) / (max_points - 2)  # first and last samples are always kept
+    keep, a = [0], 0
+    for i in range(max_points - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        next_start, next_end = end, min(int((i + 2) * every) + 1, n)  # the last bucket looks at the last sample
+        avg_t, avg_y = time[next_start:next_end].mean(), signal[next_start:next_end].mean()
+        t, y = time[start:end], signal[start:end]
+        area = np.abs((time[a] - avg_t) * (y - signal[a]) - (time[a] - t) * (avg_y - signal[a]))
+        a = start + int(np.argmax(area))
+        keep.append(a)
+    keep.append(n - 1)
+    keep = np.asarray(keep)
+    return time[keep], signal[keep]
+
+
+DOWNSAMPLERS = {'minmax': downsample_minmax, 'lttb': downsample_lttb}
+
+
+def _figure(rows, cols, width, height):
+    # a bare Figure on the Agg canvas: no pyplot state, safe to render in worker processes
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=(width, height))
+    FigureCanvasAgg(fig)
+    return fig, fig.subplots(rows, cols, squeeze=False)
+
+
+def _save(fig, png):
+    os.makedirs(os.path.dirname(png) or '.', exist_ok=True)
+    fig.tight_layout()
+    fig.savefig(png + ".tmp.png", dpi=100)
+    os.replace(png + ".tmp.png", png)  # a half-written PNG never looks up to date
+
+
+def render_recording(csv_path, png, max_points=MAX_POINTS, method='minmax'):
+    """Accel and gyro of one recording, one subplot each."""
+    df = pd.read_csv(csv_path, delimiter=',')
+    time = df[df.columns[0]].to_numpy(dtype=np.float64)
+    downsample = DOWNSAMPLERS[method]
+    fig, axes = _figure(2, 1, 10, 6)
+    fig.suptitle(f"{os.path.basename(csv_path)} ({len(df)} samples)")
+    for ax, title, columns in zip(axes[:, 0], ["Acceleration", "Gyroscope"], [ACCE, GYRO]):
+        for column in columns:
+            ax.plot(*downsample(time, df[column].to_numpy(dtype=np.float64), max_points),
+                    label=column, linewidth=0.8)
+        ax.set_ylabel(title)
+        ax.grid(True)
+        ax.legend(loc='upper right')
+    axes[-1, 0].set_xlabel("Time (s)")
+    _save(fig, png)
+
+
+def render_class(label, csv_paths, png, max_points=MAX_POINTS, method='minmax'):
+    """Every recording of one class overlaid, one subplot per channel."""
+    downsample = DOWNSAMPLERS[method]
+    fig, axes = _figure(2, 3, 15, 7)
+    fig.suptitle(f"{label} ({len(csv_paths)} recordings)")
+    for csv_path in csv_paths:
+        df = pd.read_csv(csv_path, delimiter=',')
+        time = df[df.columns[0]].to_numpy(dtype=np.float64)
+        for ax, column in zip(axes.flat, ACCE + GYRO):
+            ax.plot(*downsample(time, df[column].to_numpy(dtype=np.float64), max_points),
+                    color='tab:blue', alpha=0.25, linewidth=0.6)
+    for ax, column in zip(axes.flat, ACCE + GYRO):
+        ax.set_title(column)
+        ax.grid(True)
+    for ax in axes[-1]:
+        ax.set_xlabel("Time (s)")
+    _save(fig, png)
+
+
+def _render(job):
+    kind, png, inputs, max_points, method = job
+    try:
+        if kind == 'recording':
+            render_recording(inputs[0], png, max_points, method)
+        else:
+            render_class(kind, inputs, png, max_points, method)
+    except Exception as e:
+        return png, f"{type(e).__name__}: {e}"
+    return png, None
+
+
+def plan_report(data_root, out_dir, max_points=MAX_POINTS, method='minmax'):
+    """[(kind, png, input csvs, max_points, method, signature), ...] for the whole tree."""
+    by_label = {}
+    jobs = []
+    for csv_path, label in find_recordings(data_root):
+        by_label.setdefault(label, []).append(csv_path)
+        relative = os.path.relpath(csv_path, data_root)
+        png = os.path.join(out_dir, os.path.splitext(relative)[0] + ".png")
+        signature = [max_points, method, list(file_signature(csv_path))]
+        jobs.append(('recording', png, [csv_path], max_points, method, signature))
+    for label, paths in sorted(by_label.items()):
+        png = os.path.join(out_dir, "classes", label + ".png")
+        signature = [max_points, method] + [[os.path.relpath(p, data_root), *file_signature(p)] for p in paths]
+        jobs.append((label, png, paths, max_points, method, signature))
+    return jobs
+
+
+def batch_report(data_root=DATA_ROOT, out_dir=os.path.join('graph', 'vis'), jobs=None,
+                 max_points=MAX_POINTS, method='minmax', force=False):
+    """Render the plots whose inputs changed since the last run; returns (rendered, skipped, failed)."""
+    report_path = os.path.join(out_dir, REPORT_FILE)
+    try:
+        with open(report_path, encoding="utf-8") as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = {}
+
+    planned = plan_report(data_root, out_dir, max_points, method)
+    current, todo = {}, []
+    for kind, png, inputs, points, how, signature in planned:
+        key = os.path.relpath(png, out_dir).replace('\\', '/')
+        current[key] = signature
+        if force or previous.get(key) != signature or not os.path.exists(png):
+            todo.append((kind, png, inputs, points, how))
+
+    failed = []
+    if todo:
+        with ProcessPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+            for png, error in pool.map(_render, todo, chunksize=8):
+                if error:
+                    failed.append(png)
+                    current.pop(os.path.relpath(png, out_dir).replace('\\', '/'))
+                    print(f"Failed to render {png}: {error}")
+
+    for key in set(previous) - set(current):  # plots of recordings that are gone
+        stale = os.path.join(out_dir, *key.split('/'))
+        if os.path.exists(stale):
+            os.remove(stale)
+    os.makedirs(out_dir, exist_ok=True)
+    with open(report_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(current, f, indent=1, sort_keys=True)
+    os.replace(report_path + ".tmp", report_path)
+    return len(todo) - len(failed), len(planned) - len(todo), failed
+
+
+def show_recording(file_path):
+    file_name = os.path.splitext(os.path.basename(file_path))[0]
+    sampling_rate = 100 # sampling rate = 1000/10
+
+    df = pd.read_csv(file_path, delimiter=',') 
+    time = df[df.columns[0]].to_numpy()
+    acce_x = df['acce_x'].to_numpy() 
+    acce_y = df['acce_y'].to_numpy() 
+    acce_z = df['acce_z'].to_numpy() 
+    gyro_x = df['gyro_x'].to_numpy() 
+    gyro_y = df['gyro_y'].to_numpy() 
+    gyro_z = df['gyro_z'].to_numpy() 
+
+    data_vis_multiple_signals_subplots(
+        file_name, "Acceleration (X, Y, Z)", [acce_x, acce_y, acce_z],
+        ["Acceleration X", "Acceleration Y", "Acceleration Z"], time, sampling_rate
+    )
+    data_vis_multiple_signals_subplots(
+        file_name, "Gyroscope (X, Y, Z)", [gyro_x, gyro_y, gyro_z],
+        ["Gyroscope X", "Gyroscope Y", "Gyroscope Z"], time, sampling_rate
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plot IMU recordings")
+    parser.add_argument('paths', nargs='*', help="CSVs to show interactively (default: the first two rotate recordings)")
+    parser.add_argument('--batch', action='store_true', help="render PNGs for the whole dataset instead")
+    parser.add_argument('--data-root', default=os.path.join('..', DATA_ROOT))
+    parser.add_argument('--out', default=os.path.join('..', 'graph', 'vis'), help="output directory of --batch")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument('--max-points', type=int, default=MAX_POINTS, help="points per line before downsampling")
+    parser.add_argument('--downsample', choices=list(DOWNSAMPLERS), default='minmax')
+    parser.add_argument('--force', action='store_true', help="re-render plots that are up to date")
+    args = parser.parse_args()
+
+    if args.batch:
+        import time
+        start = time.perf_counter()
+        rendered, skipped, failed = batch_report(args.data_root, args.out, args.jobs, args.max_points,
+                                                 args.downsample, args.force)
+        print(f"{rendered} plots rendered, {skipped} up to date, {len(failed)} failed "
+              f"in {time.perf_counter() - start:.1f}s -> {args.out}")
+        return
+
+    paths = args.paths or [os.path.join(args.data_root, 'rotate', motion, f"{motion}_{i}.csv")
+                           for motion in ['cw', 'ccw'] for i in range(2)]
+    for file_path in paths:
+        show_recording(file_path)
+
+
 if __name__ == '__main__':
-    # motions = ["up", "down", "left", "right"]
-    motions = ['cw', 'ccw']
-    graph_dir = os.path.join('.', 'graph', 'vis') 
-    os.makedirs(graph_dir, exist_ok=True) 
-
-    for motion in motions:
-        data_dir = os.path.join('.', 'data_new', 'rotate', motion)
-        for i in range(2): 
-            file_name = motion + "_" + str(i)
-            file_path = os.path.join(data_dir, file_name + ".csv")
-            
-            sampling_rate = 100 # sampling rate = 1000/10
-            
-            df = pd.read_csv(file_path, delimiter=',') 
-            time = df[df.columns[0]].to_numpy()
-            acce_x = df['acce_x'].to_numpy() 
-            acce_y = df['acce_y'].to_numpy() 
-            acce_z = df['acce_z'].to_numpy() 
-            gyro_x = df['gyro_x'].to_numpy() 
-            gyro_y = df['gyro_y'].to_numpy() 
-            gyro_z = df['gyro_z'].to_numpy() 
-
-            data_vis_multiple_signals_subplots(
-                file_name, "Acceleration (X, Y, Z)", [acce_x, acce_y, acce_z],
-                ["Acceleration X", "Acceleration Y", "Acceleration Z"], time
-            )
-            data_vis_multiple_signals_subplots(
-                file_name, "Gyroscope (X, Y, Z)", [gyro_x, gyro_y, gyro_z],
-                ["Gyroscope X", "Gyroscope Y", "Gyroscope Z"], time
-            )
-
-            # data_vis_multiple_signals(file_name, "Acceleration (X, Y, Z)", [acce_x, acce_y, acce_z], 
-            #                             ["Acceleration X", "Acceleration Y", "Acceleration Z"], time)
-
-            # data_vis_multiple_signals(file_name, "Gyroscope (X, Y, Z)", [gyro_x, gyro_y, gyro_z], 
-            #                             ["Gyroscope X", "Gyroscope Y", "Gyroscope Z"], time)
+    main()
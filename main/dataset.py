@@ -0,0 +1,334 @@
+"""
+Cached, columnar loader for the data_new/<category>/<direction>/*.csv tree.
+
+The first load reads every CSV once and writes a single feature store to
+<data_root>/.cache/:
+
+    samples.npy  -- all recordings stacked row-wise, (total_rows, 7) float64
+                    (timestamp, acce_x, acce_y, acce_z, gyro_x, gyro_y, gyro_z)
+    index.json   -- per recording: path, label, row offset, length, mtime, size
+
+Later loads memory-map samples.npy and only rebuild when a CSV was added,
+removed or modified (mtime/size signature), so training runs start in
+milliseconds instead of re-parsing ~500 small CSV files.
+
+WindowedDataset cuts fixed-length windows out of the memory-mapped store.
+Windows are views, several window lengths/strides can share one store, and
+training matrices are assembled batch by batch through a `transform`
+(flatten by default) so only the transformed features are ever materialized.
+cached_matrix() additionally keeps the finished matrix in the cache directory,
+keyed by the store contents and window layout, so repeated training runs (and
+worker processes, through the memory map) reuse it.
+
+GestureDataset.resampled() puts every recording on a uniform time grid
+(resample.py) so window lengths mean the same duration in every recording.
+
+Which recordings exist, and who recorded each one (subject_groups(), for
+cross-validation that never tests on a subject it trained on), come from
+<data_root>/manifest.json (manifest.py) when it exists, else from walking
+the tree and the old mapping.txt.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+DATA_ROOT = "data_new"
+CACHE_DIRNAME = ".cache"
+MAPPING_FILE = "mapping.txt"
+STORE_VERSION = 1
+COLUMNS = ['timestamp', 'acce_x', 'acce_y', 'acce_z', 'gyro_x', 'gyro_y', 'gyro_z']
+
+categories = ["curved", "straight", "tilted", "rotate", "none"]
+normal_dirs = ["up", "down", "left", "right", "none"]
+rotate_dirs = ["cw", "ccw"]
+
+
+def get_label(category, direction):
+    return f"{category}_{direction}"
+
+
+def find_recordings(data_root=DATA_ROOT):
+    """Return [(file_path, label), ...] for every recording: from manifest.json when it exists, else the tree."""
+    from manifest import Manifest
+    manifest = Manifest.load(data_root)
+    if manifest.exists():
+        return [(path, label) for path, label in manifest.recordings() if os.path.exists(path)]
+    return walk_recordings(data_root)
+
+
+def walk_recordings(data_root=DATA_ROOT):
+    """Return [(file_path, label), ...] for every CSV in the category/direction tree."""
+    file_list = []
+    for cat in categories:
+        cat_dir = os.path.join(data_root, cat)
+        if not os.path.isdir(cat_dir):
+            continue
+        possible_dirs = rotate_dirs if cat == "rotate" else normal_dirs
+        for d in possible_dirs:
+            d_dir = os.path.join(cat_dir, d)
+            if not os.path.isdir(d_dir):
+                continue
+            for f in sorted(os.listdir(d_dir)):
+                if f.lower().endswith(".csv"):
+                    file_list.append((os.path.join(d_dir, f), get_label(cat, d)))
+    return file_list
+
+
+def file_signature(file_path):
+    st = os.stat(file_path)
+    return st.st_mtime_ns, st.st_size
+
+
+class GestureDataset:
+    """Memory-mapped recordings plus their labels and row ranges."""
+
+    def __init__(self, samples, index, cache_dir=None):
+        self.samples = samples
+        self.index = index
+        self.cache_dir = cache_dir
+        self.paths = [entry['path'] for entry in index]
+        self.labels = [entry['label'] for entry in index]
+        self.offsets = np.array([entry['offset'] for entry in index], dtype=np.int64)
+        self.lengths = np.array([entry['length'] for entry in index], dtype=np.int64)
+
+    def __len__(self):
+        return len(self.index)
+
+    def recording(self, i, with_timestamp=False):
+        """Rows of recording i as a view into the store (no copy)."""
+        rows = self.samples[self.offsets[i]:self.offsets[i] + self.lengths[i]]
+        return rows if with_timestamp else rows[:, 1:]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.recording(i), self.labels[i]
+
+    def resampled(self, rate):
+        """A new in-memory dataset with every recording resampled to `rate` Hz."""
+        from resample import resample_recording
+        arrays, index, offset = [], [], 0
+        for i, entry in enumerate(self.index):
+            rows = resample_recording(self.recording(i, with_timestamp=True), rate)
+            index.append(dict(entry, offset=offset, length=len(rows), sample_rate=rate))
+            arrays.append(rows)
+            offset += len(rows)
+        return GestureDataset(np.concatenate(arrays), index, self.cache_dir)
+
+    def label_ids(self, class_list):
+        """Map labels to indices in class_list; recordings with unknown labels get -1."""
+        label_to_id = {label: idx for idx, label in enumerate(class_list)}
+        return np.array([label_to_id.get(label, -1) for label in self.labels], dtype=np.int64)
+
+
+def load_subjects(data_root=DATA_ROOT):
+    """{recording path: subject} from manifest.json, or from mapping.txt lines like
+
+        data\\lbw\\curved\\down_0.csv -> data_new\\curved\\down\\down_0.csv
+
+    Only sources under a collector directory (data/<subject>/...) name a
+    subject; files copied from data/<category>/ directly are left out.
+    """
+    from manifest import Manifest
+    manifest = Manifest.load(data_root)
+    if manifest.exists():
+        return manifest.subjects()
+    subjects = {}
+    mapping_path = os.path.join(data_root, MAPPING_FILE)
+    if not os.path.exists(mapping_path):
+        return subjects
+    with open(mapping_path, encoding="utf-8") as f:
+        for line in f:
+            if '->' not in line:
+                continue
+            source, target = (part.strip().replace('\\', '/').split('/') for part in line.split('->'))
+            if len(source) >= 4 and source[1] not in categories:
+                subjects[os.path.join(*target[1:])] = source[1]
+    return subjects
+
+
+def subject_groups(dataset, data_root=DATA_ROOT):
+    """Group name per recording: its subject, or the recording's own path when unknown.
+
+    Recordings of unknown origin become singleton groups, so grouped splits
+    can still spread them (e.g. every none_none take) across folds.
+    """
+    subjects = load_subjects(data_root)
+    return np.array([subjects.get(os.path.normpath(path), path) for path in dataset.paths])
+
+
+def _read_recording(file_path):
+    df = pd.read_csv(file_path, header=0)
+    if df.shape[1] != 7:
+        print(f"Warning: {file_path} does not have 7 columns after reading header, skipping.")
+        return None
+    return df.to_numpy(dtype=np.float64)
+
+
+def build_store(data_root=DATA_ROOT, cache_dir=None):
+    """Ingest every recording under data_root into the columnar store."""
+    cache_dir = cache_dir or os.path.join(data_root, CACHE_DIRNAME)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    arrays = []
+    index = []
+    skipped = {}  # invalid files are remembered too, so they do not force a rebuild every time
+    offset = 0
+    for file_path, label in find_recordings(data_root):
+        mtime_ns, size = file_signature(file_path)
+        data = _read_recording(file_path)
+        if data is None:
+            skipped[os.path.relpath(file_path, data_root)] = [mtime_ns, size]
+            continue
+        index.append({
+            'path': os.path.relpath(file_path, data_root),
+            'label': label,
+            'offset': offset,
+            'length': len(data),
+            'mtime_ns': mtime_ns,
+            'size': size,
+        })
+        arrays.append(data)
+        offset += len(data)
+
+    if not arrays:
+        raise ValueError("No valid files found.")
+
+    # write-then-rename so an interrupted build never leaves a half-written store
+    samples_path = os.path.join(cache_dir, "samples.npy")
+    index_path = os.path.join(cache_dir, "index.json")
+    np.save(samples_path + ".tmp.npy", np.concatenate(arrays))
+    os.replace(samples_path + ".tmp.npy", samples_path)
+    with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({'version': STORE_VERSION, 'columns': COLUMNS, 'recordings': index,
+                   'skipped': skipped}, f)
+    os.replace(index_path + ".tmp", index_path)
+    print(f"Built dataset store with {len(index)} recordings ({offset} rows) in {cache_dir}")
+
+
+def _store_is_current(data_root, index_path):
+    try:
+        with open(index_path, encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if meta.get('version') != STORE_VERSION:
+        return False
+    cached = {entry['path']: (entry['mtime_ns'], entry['size']) for entry in meta['recordings']}
+    cached.update(meta.get('skipped', {}))
+    current = find_recordings(data_root)
+    if len(current) != len(cached):
+        return False
+    for file_path, _ in current:
+        signature = cached.get(os.path.relpath(file_path, data_root))
+        if signature is None or tuple(signature) != file_signature(file_path):
+            return False
+    return True
+
+
+def load_dataset(data_root=DATA_ROOT, cache_dir=None, rebuild=False):
+    """Load the store, (re)building it first if it is missing or stale."""
+    cache_dir = cache_dir or os.path.join(data_root, CACHE_DIRNAME)
+    index_path = os.path.join(cache_dir, "index.json")
+    if rebuild or not _store_is_current(data_root, index_path):
+        build_store(data_root, cache_dir)
+
+    with open(index_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    samples = np.load(os.path.join(cache_dir, "samples.npy"), mmap_mode='r')
+    return GestureDataset(samples, meta['recordings'], cache_dir)
+
+
+def flatten_windows(windows):
+    """Default transform: (batch, window, 6) -> (batch, window * 6), row-major like arr.flatten()."""
+    return windows.reshape(len(windows), -1)
+
+
+class WindowedDataset:
+    """(window, label) pairs over a GestureDataset without copying the samples.
+
+    window      -- rows per window
+    stride      -- rows between consecutive windows of a recording; None takes
+                   only the first window of each recording
+    recordings  -- optional subset of recording indices (e.g. a train split)
+    labels      -- per-recording label ids (e.g. dataset.label_ids(class_list));
+                   recordings with a negative id are skipped
+    """
+
+    def __init__(self, dataset, window, stride=None, recordings=None, labels=None):
+        self.dataset = dataset
+        self.window = window
+        self.stride = stride
+        if recordings is None:
+            recordings = np.arange(len(dataset))
+        if labels is None:
+            labels = np.zeros(len(dataset), dtype=np.int64)
+
+        rec_ids, starts = [], []
+        for i in recordings:
+            length = dataset.lengths[i]
+            if labels[i] < 0 or length < window:
+                continue
+            if stride is None:
+                offsets = np.zeros(1, dtype=np.int64)
+            else:
+                offsets = np.arange(0, length - window + 1, stride, dtype=np.int64)
+            rec_ids.append(np.full(len(offsets), i, dtype=np.int64))
+            starts.append(dataset.offsets[i] + offsets)
+
+        self.recording_ids = np.concatenate(rec_ids) if rec_ids else np.zeros(0, dtype=np.int64)
+        self.starts = np.concatenate(starts) if starts else np.zeros(0, dtype=np.int64)
+        self.labels = np.asarray(labels)[self.recording_ids]
+        # (rows - window + 1, 6, window) strided view over the IMU columns; indexing it gathers a batch
+        self._windows = np.lib.stride_tricks.sliding_window_view(dataset.samples[:, 1:], window, axis=0)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, i):
+        start = self.starts[i]
+        return self.dataset.samples[start:start + self.window, 1:], self.labels[i]
+
+    def windows(self, idx):
+        """Gather windows idx into a (len(idx), window, 6) array."""
+        return self._windows[self.starts[idx]].transpose(0, 2, 1)
+
+    def batches(self, batch_size=256, transform=flatten_windows, shuffle=False, seed=None):
+        """Yield (features, labels) batches, applying `transform` to each batch of windows."""
+        order = np.arange(len(self))
+        if shuffle:
+            np.random.default_rng(seed).shuffle(order)
+        for i in range(0, len(order), batch_size):
+            idx = order[i:i + batch_size]
+            yield transform(self.windows(idx)), self.labels[idx]
+
+    def to_matrix(self, transform=flatten_windows, batch_size=256):
+        """Build the full (n_windows, n_features) training matrix batch by batch."""
+        X, y = None, self.labels
+        for i, (features, _) in enumerate(self.batches(batch_size, transform)):
+            if X is None:
+                X = np.empty((len(self),) + features.shape[1:], dtype=features.dtype)
+            X[i * batch_size:i * batch_size + len(features)] = features
+        if X is None:
+            raise ValueError("No windows: every recording is shorter than the window.")
+        return X, y
+
+    def cached_matrix(self, transform=flatten_windows, name=None, batch_size=256):
+        """to_matrix(), memory-mapped from <cache_dir>/matrix_<key>.npy when already built.
+
+        The key covers the recordings (paths, sizes, mtimes), the window layout
+        and `name`, which must change whenever `transform` does.
+        """
+        if self.dataset.cache_dir is None:
+            return self.to_matrix(transform, batch_size)
+        key = hashlib.sha1(json.dumps([self.dataset.index, self.window, name or transform.__name__])
+                           .encode("utf-8"))
+        key.update(self.starts.tobytes())
+        path = os.path.join(self.dataset.cache_dir, f"matrix_{key.hexdigest()[:16]}.npy")
+        if not os.path.exists(path):
+            X, _ = self.to_matrix(transform, batch_size)
+            np.save(path + ".tmp.npy", X)
+            os.replace(path + ".tmp.npy", path)
+        return np.load(path, mmap_mode='r'), self.labels
@@ -0,0 +1,72 @@
+"""
+Vectorized hand-crafted features for IMU windows.
+
+extract_features takes a whole batch of windows, shape (batch, window, 6),
+and computes everything in a few NumPy passes over the batch:
+
+    per axis (x6):  mean, std, min, max, energy, zero-crossing rate,
+                    jerk mean/std, FFT band powers (N_BANDS)
+    per sensor:     pairwise axis correlations (xy, xz, yz for acce and gyro)
+
+That is 6 * (8 + N_BANDS) + 6 = 84 features instead of the 1026 raw values.
+The same function is used for training (svm.py, lgbm.py) and at inference
+(tello_realtime.py, real_time_window.py), so both sides agree by construction.
+"""
+import numpy as np
+
+AXES = ['acce_x', 'acce_y', 'acce_z', 'gyro_x', 'gyro_y', 'gyro_z']
+# band edges as fractions of the Nyquist frequency; low bands are narrow because gestures are slow
+BAND_EDGES = [0.0, 0.05, 0.1, 0.2, 0.4, 1.0]
+N_BANDS = len(BAND_EDGES) - 1
+AXIS_STATS = ['mean', 'std', 'min', 'max', 'energy', 'zcr', 'jerk_mean', 'jerk_std'] + \
+             [f'band{i}' for i in range(N_BANDS)]
+CORR_PAIRS = [(0, 1), (0, 2), (1, 2), (3, 4), (3, 5), (4, 5)]
+EPS = 1e-12
+
+
+def feature_names():
+    names = [f"{axis}_{stat}" for stat in AXIS_STATS for axis in AXES]
+    names += [f"corr_{AXES[i]}_{AXES[j]}" for i, j in CORR_PAIRS]
+    return names
+
+
+def num_features():
+    return len(AXIS_STATS) * len(AXES) + len(CORR_PAIRS)
+
+
+def band_slices(n_bins):
+    # bin 0 (DC) is skipped since the signal is centred
+    edges = np.clip(np.round(np.array(BAND_EDGES) * (n_bins - 1)).astype(int), 1, n_bins)
+    edges[-1] = n_bins
+    return [slice(lo, max(hi, lo + 1)) for lo, hi in zip(edges[:-1], edges[1:])]
+
+
+def extract_features(windows):
+    """Features for a (batch, window, 6) array (or one (window, 6) window) -> (batch, num_features())."""
+    x = np.asarray(windows, dtype=np.float64)
+    if x.ndim == 2:
+        x = x[None]
+    n = x.shape[1]
+
+    mean = x.mean(axis=1)
+    centred = x - mean[:, None, :]
+    std = centred.std(axis=1)
+    energy = (x ** 2).mean(axis=1)
+
+    signs = np.signbit(centred)
+    zcr = (signs[:, 1:] != signs[:, :-1]).sum(axis=1) / max(n - 1, 1)
+
+    jerk = np.diff(x, axis=1) if n > 1 else np.zeros_like(x)
+    jerk_mean = np.abs(jerk).mean(axis=1)
+    jerk_std = jerk.std(axis=1)
+
+    power = np.abs(np.fft.rfft(centred, axis=1)) ** 2 / n
+    bands = [power[:, band].sum(axis=1) for band in band_slices(power.shape[1])]
+
+    # correlations from the centred signals: cov / (std_i * std_j)
+    i, j = np.array(CORR_PAIRS).T
+    cov = (centred[:, :, i] * centred[:, :, j]).mean(axis=1)
+    corr = cov / (std[:, i] * std[:, j] + EPS)
+
+    per_axis = [mean, std, x.min(axis=1), x.max(axis=1), energy, zcr, jerk_mean, jerk_std] + bands
+    return np.concatenate(per_axis + [corr], axis=1)
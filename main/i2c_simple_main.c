@@ -20,6 +20,11 @@ Reference githubs:
 #define I2C_MASTER_SDA_IO 18      /*!< gpio number for I2C master data  */
 #define I2C_MASTER_NUM I2C_NUM_0  /*!< I2C port number for master dev */
 #define I2C_MASTER_FREQ_HZ 100000 /*!< I2C master clock frequency */
+#define IMU_BINARY_FRAMES 0       /*!< 1: packed binary frames instead of text logs (see imu_parser.py) */
+/* stdout on the console UART ends lines with CRLF by default, which would turn every 0x0A byte of a
+ * binary frame into 0x0D 0x0A and break its checksum. With IMU_BINARY_FRAMES app_main switches the
+ * console to LF (bytes are written untranslated); CONFIG_NEWLIB_STDOUT_LINE_ENDING_LF does the same
+ * for the whole build. */
 
 static const char *TAG = "mpu6050 test";
 static mpu6050_handle_t mpu6050 = NULL;
@@ -132,8 +137,57 @@ void log_status()
     ESP_LOGI(TAG, "gyro_x:%.2f, gyro_y:%.2f, gyro_z:%.2f \n", gyro.gyro_x, gyro.gyro_y, gyro.gyro_z);
 }
 
+#if IMU_BINARY_FRAMES
+#include "esp_vfs_dev.h"
+
+/* 34-byte little-endian frame, must match FRAME_DTYPE in imu_parser.py */
+typedef struct __attribute__((packed))
+{
+    uint8_t magic[2];
+    uint16_t seq;
+    uint32_t time_ms;
+    float acce[3];
+    float gyro[3];
+    uint16_t checksum;
+} imu_frame_t;
+
+static uint16_t frame_seq = 0;
+
+static uint16_t fletcher16(const uint8_t *data, size_t len)
+{
+    uint16_t sum1 = 0, sum2 = 0;
+    for (size_t i = 0; i < len; i++)
+    {
+        sum1 = (sum1 + data[i]) % 255;
+        sum2 = (sum2 + sum1) % 255;
+    }
+    return (sum2 << 8) | sum1;
+}
+
+void write_frame()
+{
+    imu_frame_t frame;
+    frame.magic[0] = 0xA5;
+    frame.magic[1] = 0x5A;
+    frame.seq = frame_seq++;
+    frame.time_ms = (uint32_t)((esp_timer_get_time() - start_time_us) / 1000);
+    frame.acce[0] = acce.acce_x;
+    frame.acce[1] = acce.acce_y;
+    frame.acce[2] = acce.acce_z;
+    frame.gyro[0] = gyro.gyro_x;
+    frame.gyro[1] = gyro.gyro_y;
+    frame.gyro[2] = gyro.gyro_z;
+    frame.checksum = fletcher16((const uint8_t *)&frame, sizeof(frame) - sizeof(frame.checksum));
+    fwrite(&frame, sizeof(frame), 1, stdout);
+    fflush(stdout);
+}
+#endif
+
 void app_main()
 {
+#if IMU_BINARY_FRAMES
+    esp_vfs_dev_uart_port_set_tx_line_endings(CONFIG_ESP_CONSOLE_UART_NUM, ESP_LINE_ENDINGS_LF);
+#endif
     i2c_sensor_mpu6050_init();
 
     if (ret == ESP_OK)
@@ -141,7 +195,11 @@ void app_main()
         while (true)
         {
             get_status(); 
+#if IMU_BINARY_FRAMES
+            write_frame();
+#else
             log_status();
+#endif
             vTaskDelay(10 / portTICK_PERIOD_MS);
         }
     }
@@ -0,0 +1,252 @@
+"""
+Shared parser for the ESP32/MPU6050 serial stream.
+
+Two wire formats are supported (see make_parser). By default the firmware
+(i2c_simple_main.c) logs three text lines per sample:
+
+    I (1234) mpu6050 test: time:1.234
+    I (1234) mpu6050 test: acce_x:0.29, acce_y:0.95, acce_z:0.15
+    I (1234) mpu6050 test: gyro_x:6.24, gyro_y:3.63, gyro_z:-3.97
+
+StreamParser takes whatever bytes are available on the port, matches all
+complete three-line frames with one compiled regex and converts them to a
+fixed-layout NumPy record array in a single vectorized step. Incomplete
+frames at the end of a chunk are carried over to the next feed(); frames that
+cannot be parsed are counted, not printed.
+
+With IMU_BINARY_FRAMES enabled in the firmware each sample is one packed
+little-endian frame instead (FRAME_DTYPE, 34 bytes):
+
+    magic 0xA5 0x5A | seq uint16 | time_ms uint32 | 6 x float32 | fletcher16 uint16
+
+BinaryStreamParser decodes runs of frames with np.frombuffer directly over the
+received bytes, validates all checksums in one vectorized pass, resyncs on the
+magic after corruption and counts samples lost in transit from sequence gaps.
+"""
+import re
+
+import numpy as np
+
+COLUMNS = ['timestamp', 'acce_x', 'acce_y', 'acce_z', 'gyro_x', 'gyro_y', 'gyro_z']
+IMU_COLUMNS = COLUMNS[1:]
+SAMPLE_DTYPE = np.dtype([(name, np.float64) for name in COLUMNS])
+
+_NUM = rb'\s*(-?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)'
+# ESP_LOGI adds its own newline (and colour codes) after the "\n" in the format
+# string, so up to two filler lines may sit between the lines of a frame
+_NEXT_LINE = rb'[^\n]*\n(?:[^\n]*\n){0,2}?[^\n]*?'
+FRAME_RE = re.compile(
+    rb'time:' + _NUM + _NEXT_LINE +
+    rb'acce_x:' + _NUM + rb',\s*acce_y:' + _NUM + rb',\s*acce_z:' + _NUM + _NEXT_LINE +
+    rb'gyro_x:' + _NUM + rb',\s*gyro_y:' + _NUM + rb',\s*gyro_z:' + _NUM
+)
+MAX_PENDING = 4096  # bytes kept between feeds; more than this without a newline is garbage
+
+MAGIC = b'\xa5\x5a'
+FRAME_DTYPE = np.dtype([
+    ('magic', '<u2'), ('seq', '<u2'), ('time_ms', '<u4'),
+    ('acce', '<f4', (3,)), ('gyro', '<f4', (3,)), ('checksum', '<u2'),
+])
+FRAME_SIZE = FRAME_DTYPE.itemsize
+_MAGIC_U16 = int.from_bytes(MAGIC, 'little')
+# Fletcher-16 over the first FRAME_SIZE - 2 bytes in closed form: sum2 weights byte i by (n - i)
+_CHECKSUM_WEIGHTS = np.arange(FRAME_SIZE - 2, 0, -1, dtype=np.int64)
+
+
+def as_array(records):
+    """View a record array as a (n, 7) float array without copying."""
+    return records.view(np.float64).reshape(len(records), len(COLUMNS))
+
+
+def imu_values(records):
+    """(n, 6) view of the accelerometer/gyro columns (drops the timestamp)."""
+    return as_array(records)[:, 1:]
+
+
+def _to_records(rows):
+    records = np.empty(len(rows), dtype=SAMPLE_DTYPE)
+    if rows:
+        as_array(records)[:] = np.array(rows, dtype=np.bytes_).astype(np.float64)
+    return records
+
+
+class StreamParser:
+    """Incrementally parse the text stream into SAMPLE_DTYPE records."""
+
+    def __init__(self):
+        self._pending = b''
+        self.bytes = 0
+        self.frames = 0
+        self.malformed = 0
+
+    def feed(self, data):
+        """Parse a chunk of raw bytes; return the complete samples it finished."""
+        self.bytes += len(data)
+        return self._parse(self._pending + data)
+
+    def _parse(self, buf):
+        cut = buf.rfind(b'\n') + 1
+        complete, self._pending = buf[:cut], buf[cut:]
+        if len(self._pending) > MAX_PENDING:
+            self._pending = b''
+            self.malformed += 1
+
+        # hold back a frame whose gyro line has not arrived yet
+        last_time = complete.rfind(b'time:')
+        if last_time >= 0 and complete.find(b'gyro_x', last_time) < 0:
+            line_start = complete.rfind(b'\n', 0, last_time) + 1
+            if len(complete) - line_start <= MAX_PENDING:
+                self._pending = complete[line_start:] + self._pending
+                complete = complete[:line_start]
+
+        rows = FRAME_RE.findall(complete)
+        self.frames += len(rows)
+        self.malformed += max(0, complete.count(b'time:') - len(rows))
+        return _to_records(rows)
+
+    def flush(self):
+        """Parse anything still pending (e.g. at end of a log file)."""
+        pending, self._pending = self._pending, b''
+        return self._parse(pending + b'\n') if pending else _to_records([])
+
+    def stats(self):
+        return {'bytes': self.bytes, 'frames': self.frames, 'malformed': self.malformed}
+
+
+def fletcher16(frame_bytes):
+    """Checksum of one or more frames given as a (n, FRAME_SIZE) uint8 array."""
+    body = frame_bytes[:, :FRAME_SIZE - 2].astype(np.int64)
+    sum1 = body.sum(axis=1) % 255
+    sum2 = (body @ _CHECKSUM_WEIGHTS) % 255
+    return (sum2 << 8 | sum1).astype(np.uint16)
+
+
+def frames_to_records(frames):
+    """Convert FRAME_DTYPE frames to SAMPLE_DTYPE records."""
+    records = np.empty(len(frames), dtype=SAMPLE_DTYPE)
+    values = as_array(records)
+    values[:, 0] = frames['time_ms'] / 1000.0
+    values[:, 1:4] = frames['acce']
+    values[:, 4:7] = frames['gyro']
+    return records
+
+
+class BinaryStreamParser:
+    """Incrementally decode packed binary frames into SAMPLE_DTYPE records."""
+
+    def __init__(self):
+        self._pending = b''
+        self._last_seq = None
+        self.bytes = 0
+        self.frames = 0
+        self.malformed = 0
+        self.dropped = 0  # samples missing according to sequence numbers
+
+    def feed(self, data):
+        """Decode a chunk of raw bytes; return the complete samples it finished."""
+        self.bytes += len(data)
+        buf = self._pending + data
+        self._pending = b''
+        good_runs = []
+        pos = 0
+        resyncing = False
+        while True:
+            start = buf.find(MAGIC, pos)
+            if start < 0:
+                # a trailing first magic byte may be the start of the next frame
+                self._pending = buf[-1:] if buf[-1:] == MAGIC[:1] else b''
+                break
+            if start > pos and not resyncing:
+                self.malformed += 1  # garbage between frames
+            resyncing = False
+            n = (len(buf) - start) // FRAME_SIZE
+            if n == 0:
+                self._pending = buf[start:]
+                break
+            frames = np.frombuffer(buf, FRAME_DTYPE, count=n, offset=start)
+            raw = np.frombuffer(buf, np.uint8, count=n * FRAME_SIZE, offset=start).reshape(n, FRAME_SIZE)
+            ok = (frames['magic'] == _MAGIC_U16) & (fletcher16(raw) == frames['checksum'])
+            bad = np.flatnonzero(~ok)
+            good = n if len(bad) == 0 else int(bad[0])
+            if good:
+                good_runs.append(frames[:good])
+            pos = start + good * FRAME_SIZE
+            if good < n:
+                self.malformed += 1
+                pos += 1  # skip this magic and resync on the next one
+                resyncing = True
+            else:
+                self._pending = buf[pos:]
+                break
+
+        if not good_runs:
+            return _to_records([])
+        frames = np.concatenate(good_runs) if len(good_runs) > 1 else good_runs[0]
+        self._count_gaps(frames['seq'])
+        self.frames += len(frames)
+        return frames_to_records(frames)
+
+    def _count_gaps(self, seq):
+        seq = seq.astype(np.int64)
+        if self._last_seq is not None:
+            seq = np.concatenate([[self._last_seq], seq])
+        if len(seq) > 1:
+            self.dropped += int(((np.diff(seq) - 1) % 65536).sum())
+        self._last_seq = int(seq[-1])
+
+    def flush(self):
+        self._pending = b''
+        return _to_records([])
+
+    def stats(self):
+        return {'bytes': self.bytes, 'frames': self.frames, 'malformed': self.malformed,
+                'dropped': self.dropped}
+
+
+def make_parser(fmt='text'):
+    """Return a stream parser for the 'text' or 'binary' serial format."""
+    if fmt == 'text':
+        return StreamParser()
+    if fmt == 'binary':
+        return BinaryStreamParser()
+    raise ValueError(f"Unknown serial format: {fmt}")
+
+
+def encode_text(records):
+    """Render records in the firmware's three-line text format."""
+    lines = []
+    for t, ax, ay, az, gx, gy, gz in as_array(records).tolist():
+        lines.append(f"I ({int(t * 1000)}) mpu6050 test: time:{t:.3f} \n"
+                     f"I ({int(t * 1000)}) mpu6050 test: acce_x:{ax:.2f}, acce_y:{ay:.2f}, acce_z:{az:.2f} \n"
+                     f"I ({int(t * 1000)}) mpu6050 test: gyro_x:{gx:.2f}, gyro_y:{gy:.2f}, gyro_z:{gz:.2f} \n")
+    return ''.join(lines).encode('utf-8')
+
+
+def encode_binary(records, first_seq=0):
+    """Pack records into binary frames (what the firmware sends with IMU_BINARY_FRAMES)."""
+    values = as_array(records)
+    frames = np.zeros(len(records), dtype=FRAME_DTYPE)
+    frames['magic'] = _MAGIC_U16
+    frames['seq'] = (first_seq + np.arange(len(records))) % 65536
+    frames['time_ms'] = np.round(values[:, 0] * 1000).astype(np.uint32)
+    frames['acce'] = values[:, 1:4]
+    frames['gyro'] = values[:, 4:7]
+    raw = frames.view(np.uint8).reshape(len(frames), FRAME_SIZE)
+    frames['checksum'] = fletcher16(raw)
+    return frames.tobytes()
+
+
+def parse_text(data, fmt='text'):
+    """Parse a complete captured log (bytes or str) in one go."""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    parser = make_parser(fmt)
+    records = parser.feed(data)
+    tail = parser.flush()
+    return np.concatenate([records, tail]) if len(tail) else records
+
+
+def read_available(ser, parser):
+    """Read everything waiting on a pyserial port (blocking up to its timeout for one byte)."""
+    data = ser.read(ser.in_waiting or 1)
+    return parser.feed(data) if data else _to_records([])
@@ -0,0 +1,320 @@
+"""
+Replay recorded IMU data as the byte stream the ESP32 would send.
+
+    for chunk in replay(load_csv('data_new/curved/up/up_0.csv'), fmt='binary'):
+        records = parser.feed(chunk)
+
+Both serial formats from imu_parser are supported, so the parsers and the
+real-time loops can be exercised without the board.
+
+Run as a script it becomes a hardware-free harness: the recordings (or a raw
+serial capture) are written to a pseudo-terminal at real-time or accelerated
+speed, optionally with a stub drone (tello_stub.py) and the controller under
+test started against both:
+
+    python imu_replay.py ../data_new/curved/up --idle 2 --stub --delay 0.05 --loss 0.1 \
+        --run "python tello_realtime.py --serial {serial} --drone {drone}"
+
+At the end it lists, per replayed recording, the first drone command that
+arrived while it played (or in the idle gap after it) with its latency from
+the recording's first and last sample -- the gesture-to-command latency of
+the whole chain: serial, parsing, classification, UDP and the drone's ACK.
+
+With --onsets the recordings are instead fed straight through the live
+resampler and an OnsetDetector, and every gesture recording must produce an
+onset while it plays; the idle gaps are where the detector has to re-arm:
+
+    python imu_replay.py ../data_new --onsets --idle 2
+"""
+import argparse
+import glob
+import os
+import pty
+import shlex
+import signal
+import subprocess
+import threading
+import time
+import tty
+
+import numpy as np
+import pandas as pd
+from imu_parser import COLUMNS, SAMPLE_DTYPE, as_array, encode_binary, encode_text
+from resample import SAMPLE_RATE_HZ, StreamResampler
+from sliding_window import OnsetDetector
+from tello_stub import BackgroundStub
+
+IDLE_RATE_HZ = 50.0
+IDLE_LABELS = ('none_none',)  # recordings that need not contain a motion onset
+BAUD_RATE = 115200
+
+ENCODERS = {
+    'text': lambda records, first_seq: encode_text(records),
+    'binary': encode_binary,
+}
+
+
+def load_csv(file_path):
+    """Read a recording (timestamp + 6 IMU columns) into SAMPLE_DTYPE records."""
+    df = pd.read_csv(file_path)
+    records = np.empty(len(df), dtype=SAMPLE_DTYPE)
+    as_array(records)[:] = df[COLUMNS].to_numpy(dtype=np.float64)
+    return records
+
+
+def replay(records, fmt='text', chunk_samples=1, speed=None, first_seq=0):
+    """Yield the encoded stream `chunk_samples` samples at a time.
+
+    speed -- None to yield as fast as possible, otherwise a multiple of real
+             time taken from the timestamp column (1.0 = original pace)
+    """
+    encode = ENCODERS[fmt]
+    timestamps = as_array(records)[:, 0]
+    start = time.monotonic()
+    for i in range(0, len(records), chunk_samples):
+        chunk = records[i:i + chunk_samples]
+        if speed:
+            due = start + (timestamps[i] - timestamps[0]) / speed
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        yield encode(chunk, first_seq + i)
+
+
+def idle_records(like, seconds, start_time, rate=IDLE_RATE_HZ, seed=0):
+    """A still sensor for `seconds`: the accel of `like` (a record) plus small noise, near-zero gyro."""
+    n = int(seconds * rate)
+    rng = np.random.default_rng(seed)
+    records = np.empty(n, dtype=SAMPLE_DTYPE)
+    rows = as_array(records)
+    rows[:, 0] = start_time + np.arange(n) / rate
+    rows[:, 1:4] = as_array(like[:1])[0, 1:4] + rng.normal(0, 0.01, (n, 3))
+    rows[:, 4:7] = rng.normal(0, 1.0, (n, 3))
+    return records
+
+
+def join_recordings(recordings, idle=0.0, rate=IDLE_RATE_HZ):
+    """Concatenate recordings into one stream with increasing timestamps.
+
+    recordings -- [(label, records), ...]; `idle` seconds of still sensor go
+    before each one. Returns (records, marks) with marks [(label, start, end)]
+    in stream time.
+    """
+    parts, marks, t = [], [], 0.0
+    for i, (label, records) in enumerate(recordings):
+        if idle > 0:
+            still = idle_records(records, idle, t, rate, seed=i)
+            parts.append(still)
+            t += len(still) / rate
+        shifted = records.copy()
+        times = as_array(shifted)[:, 0]
+        times += t - times[0]
+        parts.append(shifted)
+        marks.append((label, times[0], times[-1]))
+        t = times[-1] + 1.0 / rate
+    return np.concatenate(parts), marks
+
+
+def replay_raw(data, speed=1.0, chunk_bytes=64, baud=BAUD_RATE):
+    """Yield a captured raw serial log in chunks, paced at the port's byte rate times `speed`."""
+    byte_rate = baud / 10 * speed if speed else None  # 8N1: 10 bits per byte
+    start = time.monotonic()
+    for i in range(0, len(data), chunk_bytes):
+        if byte_rate:
+            delay = start + i / byte_rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        yield data[i:i + chunk_bytes]
+
+
+class PtyReplay(threading.Thread):
+    """Write a chunk stream to the master side of a pseudo-terminal.
+
+    Open `port` (the slave device) with pyserial like a USB serial adapter.
+    `started` is the monotonic time the first chunk was written.
+    """
+
+    def __init__(self, chunks):
+        super().__init__(name="pty-replay", daemon=True)
+        self.chunks = chunks
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)  # no echo or newline translation: bytes arrive exactly as written
+        self.port = os.ttyname(self.slave)
+        self.started = None
+        self.bytes_written = 0
+        self.error = None
+
+    def run(self):
+        try:
+            for chunk in self.chunks:
+                if self.started is None:
+                    self.started = time.monotonic()
+                view = memoryview(chunk)
+                while view:
+                    written = os.write(self.master, view)
+                    view = view[written:]
+                self.bytes_written += len(chunk)
+        except OSError as e:
+            self.error = e
+
+    def close(self):
+        for fd in (self.master, self.slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+def find_csvs(paths):
+    """Expand files, directories (recursively) and glob patterns into a sorted list of CSVs."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += glob.glob(os.path.join(path, '**', '*.csv'), recursive=True)
+        else:
+            files += glob.glob(path) or [path]
+    return sorted(files)
+
+
+def recording_label(file_path):
+    """'<category>_<direction>' for data_new/<category>/<direction>/x.csv, else the file name."""
+    parts = os.path.normpath(file_path).split(os.sep)
+    if len(parts) >= 3:
+        return f"{parts[-3]}_{parts[-2]}"
+    return os.path.splitext(parts[-1])[0]
+
+
+def latency_report(marks, commands, started, speed, settle=0.0):
+    """Match each recording to the first drone command received while it, or the gap after it, played.
+
+    Returns [(label, command or None, ms after the recording started, ms after it ended)];
+    'command' keep-alives and rc setpoints are not gesture commands and are skipped.
+    """
+    rows = []
+    for i, (label, start, end) in enumerate(marks):
+        start_wall = started + start / speed
+        end_wall = started + end / speed
+        next_wall = started + marks[i + 1][1] / speed if i + 1 < len(marks) else end_wall + settle
+        hits = [(t, command) for t, command in commands
+                if start_wall <= t < next_wall and command != 'command' and not command.startswith('rc ')]
+        if hits:
+            t, command = hits[0]
+            rows.append((label, command, round((t - start_wall) * 1000, 1), round((t - end_wall) * 1000, 1)))
+        else:
+            rows.append((label, None, None, None))
+    return rows
+
+
+def onset_check(recordings, idle=2.0, rate=SAMPLE_RATE_HZ, detector=None):
+    """Replay recordings through the live resampler and an OnsetDetector.
+
+    Returns [(label, onsets)]: the number of onsets detected while each
+    recording played, with `idle` seconds of still sensor before each one.
+    """
+    records, marks = join_recordings(recordings, idle=idle)
+    rows = as_array(records)
+    detector = OnsetDetector() if detector is None else detector
+    onset_times = []
+    for value in StreamResampler(rate).feed(rows):
+        onset = detector.update(value)
+        if onset is not None:  # sample count of the onset, on the grid starting at the first timestamp
+            onset_times.append(rows[0, 0] + (onset - 1) / rate)
+    onset_times = np.array(onset_times)
+    # the grid point before a recording's first sample is already interpolated towards it
+    return [(label, int(np.sum((onset_times >= start - 1.0 / rate) & (onset_times <= end))))
+            for label, start, end in marks]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay IMU recordings through a pseudo serial port")
+    parser.add_argument('paths', nargs='*', help="CSV files, directories or globs (e.g. ../data_new/curved)")
+    parser.add_argument('--raw', help="replay a captured raw serial log instead of CSVs")
+    parser.add_argument('--format', choices=list(ENCODERS), default='text')
+    parser.add_argument('--speed', type=float, default=1.0, help="multiple of real time (0 = as fast as possible)")
+    parser.add_argument('--chunk', type=int, default=1, help="samples per write")
+    parser.add_argument('--idle', type=float, default=0.0, help="seconds of still sensor before each recording")
+    parser.add_argument('--stub', action='store_true', help="start a stub drone (tello_stub.py)")
+    parser.add_argument('--drone-port', type=int, default=0, help="stub UDP port (default: any free port)")
+    parser.add_argument('--delay', type=float, default=0.0, help="stub ACK delay in seconds")
+    parser.add_argument('--loss', type=float, default=0.0, help="fraction of stub ACKs dropped")
+    parser.add_argument('--run', help="controller command; {serial} and {drone} are filled in")
+    parser.add_argument('--warmup', type=float, default=2.0, help="seconds for the controller to start")
+    parser.add_argument('--settle', type=float, default=2.0, help="seconds to wait after the replay")
+    parser.add_argument('--onsets', action='store_true',
+                        help="check that every gesture recording produces a motion onset (no pty, no drone)")
+    parser.add_argument('--rate', type=float, default=SAMPLE_RATE_HZ, help="resampling rate for --onsets (Hz)")
+    args = parser.parse_args()
+
+    if args.onsets:
+        files = find_csvs(args.paths)
+        if not files:
+            parser.error("no recordings given")
+        results = onset_check([(recording_label(f), load_csv(f)) for f in files], idle=args.idle, rate=args.rate)
+        missed = [(f, label) for f, (label, onsets) in zip(files, results)
+                  if not onsets and label not in IDLE_LABELS]
+        idle_hits = sum(1 for label, onsets in results if onsets and label in IDLE_LABELS)
+        idle_total = sum(1 for label, _ in results if label in IDLE_LABELS)
+        print(f"Onsets in {len(files) - idle_total - len(missed)} of {len(files) - idle_total} gesture recordings"
+              f" ({idle_hits} of {idle_total} idle recordings)")
+        for f, label in missed:
+            print(f"  no onset: {f}")
+        if missed:
+            raise SystemExit(1)
+        return
+
+    marks = []
+    if args.raw:
+        with open(args.raw, 'rb') as f:
+            chunks = replay_raw(f.read(), speed=args.speed)
+    else:
+        files = find_csvs(args.paths)
+        if not files:
+            parser.error("no recordings given")
+        records, marks = join_recordings([(recording_label(f), load_csv(f)) for f in files], idle=args.idle)
+        print(f"Replaying {len(files)} recordings, {len(records)} samples "
+              f"({as_array(records)[-1, 0]:.1f} s of stream time)")
+        chunks = replay(records, args.format, chunk_samples=args.chunk, speed=args.speed or None)
+
+    stub = BackgroundStub(port=args.drone_port, delay=args.delay, loss=args.loss) if args.stub else None
+    source = PtyReplay(chunks)
+    drone = f"{stub.address[0]}:{stub.address[1]}" if stub else "127.0.0.1:8889"
+    print(f"Serial device: {source.port}" + (f", stub drone: {drone}" if stub else ""))
+
+    controller = None
+    if args.run:
+        controller = subprocess.Popen(shlex.split(args.run.format(serial=source.port, drone=drone)))
+        time.sleep(args.warmup)
+    try:
+        source.start()
+        while source.is_alive():
+            source.join(0.5)
+            if controller is not None and controller.poll() is not None:
+                print(f"Controller exited with code {controller.returncode}")
+                break
+        time.sleep(args.settle)
+    except KeyboardInterrupt:
+        print("Exiting...")
+    finally:
+        if controller is not None and controller.poll() is None:
+            controller.send_signal(signal.SIGINT)
+            try:
+                controller.wait(10)
+            except subprocess.TimeoutExpired:
+                controller.kill()
+        source.close()
+        print(f"Replayed {source.bytes_written} bytes" + (f" (stopped: {source.error})" if source.error else ""))
+
+    if stub is not None:
+        received = list(stub.protocol.received)
+        stub.close()
+        print(f"Stub drone received {len(received)} commands, dropped {stub.protocol.dropped} ACKs")
+        if marks and source.started is not None and args.speed:
+            print("Gesture commands (ms after the recording started / ended):")
+            for label, command, from_start, from_end in latency_report(marks, received, source.started,
+                                                                        args.speed, args.settle):
+                result = f"{command!r} at {from_start} / {from_end} ms" if command else "no command"
+                print(f"  {label:16s} -> {result}")
+
+
+if __name__ == '__main__':
+    main()
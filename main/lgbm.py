@@ -1,77 +1,47 @@
 # Required packages
-import os
 import numpy as np
-import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import classification_report
 import lightgbm as lgb
-from glob import glob
-
-# Function to load and filter CSV data
-def load_and_filter_csv(file_path, max_timestamp=3):
-    df = pd.read_csv(file_path)
-    # Filter rows where the timestamp is <= max_timestamp
-    df_filtered = df[df['timestamp'] <= max_timestamp].iloc[:, 1:]  # Exclude the timestamp column
-    return df_filtered.values.flatten()  # Flatten the matrix into a single array
-
-# Function to add Gaussian noise to data
-def add_gaussian_noise(X, mean=0, std=0.01):
-    noise = np.random.normal(mean, std, X.shape)
-    return X + noise
+from dataset import load_dataset, WindowedDataset
+from features import extract_features
+from resample import SAMPLE_RATE_HZ
+from augment import Augmenter, augmented_matrix
+from serving import save_bundle
+from tree_export import export_bundle
 
 # Prepare data and labels with full class labels
-features_list = []
-labels_list = []
-label_mapping = {}
-label_counter = 0
-
-# Path to the extracted data folder
-extracted_folder_path = 'C:\\Users\\lenovo\\Downloads\\data'
-
-# Load data, filter by timestamp, and prepare for training with specific labels
-for file in glob(f"{extracted_folder_path}\\*\\*.csv"):
-    # Construct the full label using directory structure and file name
-    action_category = file.split("\\")[-2]  # e.g., 'tilted'
-    direction = file.split("\\")[-1].split('_')[0]  # e.g., 'up' from 'up_4.csv'
-    action_direction_label = f"{action_category}_{direction}"
-
-    # Assign a numerical label if not already present
-    if action_direction_label not in label_mapping:
-        label_mapping[action_direction_label] = label_counter
-        label_counter += 1
+data_root = "data_new"
+sample_rate = SAMPLE_RATE_HZ  # recordings are resampled onto a uniform grid (resample.py)
+window_length = 120  # first 120 grid samples (2.4 s at 50 Hz) of every recording, timestamp column excluded
 
-    # Load and process the CSV file
-    file_path = file
-    df = pd.read_csv(file_path)
-    df_filtered = df.iloc[:120, 1:]  # Truncate to the first 120 rows and exclude the timestamp column
-    features = df_filtered.values.flatten()  # Flatten the filtered matrix
+dataset = load_dataset(data_root).resampled(sample_rate)
+label_mapping = {}
+for label in dataset.labels:
+    # Assign a numerical label in order of first appearance
+    if label not in label_mapping:
+        label_mapping[label] = len(label_mapping)
+label_ids = np.array([label_mapping[label] for label in dataset.labels])
 
-    features_list.append(features)
-    labels_list.append(label_mapping[action_direction_label])
+# Cut windows from the memory-mapped store
+windows = WindowedDataset(dataset, window=window_length, labels=label_ids)
 
-# Convert to numpy arrays
-X = np.array(features_list)
-y = np.array(labels_list)
+# Split windows into training and test sets; augmentation only touches the training split
+train_idx, test_idx = train_test_split(np.arange(len(windows)), test_size=0.2, random_state=42)
+X_test, y_test = extract_features(windows.windows(test_idx)), windows.labels[test_idx]
 
-# Split data into training and test sets
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+# Augment training windows on the fly (optional, set flag to False to skip)
+augment_train = True
+augment_copies = 2 if augment_train else 0
+X_train_combined, y_train_combined = augmented_matrix(windows, train_idx, Augmenter(seed=42),
+                                                      copies=augment_copies, transform=extract_features)
 
 # Normalize features by subtracting mean and dividing by standard deviation
 scaler = StandardScaler()
-X_train = scaler.fit_transform(X_train)
+X_train_combined = scaler.fit_transform(X_train_combined)
 X_test = scaler.transform(X_test)
 
-# Augment training data (optional, set flag to False to skip)
-augment_train = True
-if augment_train:
-    X_train_augmented = add_gaussian_noise(X_train, std=0.01)
-    X_train_combined = np.vstack([X_train, X_train_augmented])
-    y_train_combined = np.hstack([y_train, y_train])
-else:
-    X_train_combined = X_train
-    y_train_combined = y_train
-
 # Train a LightGBM model
 lgb_train = lgb.Dataset(X_train_combined, label=y_train_combined)
 lgb_params = {
@@ -101,3 +71,7 @@ report = classification_report(
 # Display the report and label mapping
 print(report)
 print("Label Mapping:", label_mapping)
+
+bundle = save_bundle('./model/lgbm_bundle.pkl', lgb_model, list(label_mapping.keys()), window_rows=window_length,
+                     features='handcrafted', scaler=scaler, sample_rate=sample_rate)
+export_bundle(bundle, './model/lgbm_bundle.npz')
@@ -0,0 +1,361 @@
+"""
+Content-addressed index of the dataset, replacing the copy step of rename_csv.py.
+
+    python manifest.py                                    # index new or changed files from data/
+    python manifest.py --query subject=lbw category=curved
+
+<data_root>/manifest.json has one entry per recording in data_new:
+
+    path          -- file under data_root, e.g. curved/up/up_3.csv
+    source        -- where it came from, e.g. data/lbw/curved/up/up_3.csv
+                     (a segmented session is 'data/<subject>/.../session_...#k')
+    subject, category, direction, index
+    sha256        -- hash of the file contents
+    rows, sample_rate
+    origin        -- 'data' (organized from data/), 'segment' (segment.py) or
+                     'external' (found in data_root without a known source)
+
+organize() only stats the files under data/: a source whose (mtime_ns, size)
+signature is unchanged is skipped without reading the file, a new signature
+is hashed and only a changed hash re-links the recording. Signatures are
+specific to one checkout, so they are kept in the untracked
+<data_root>/.cache/source_signatures.json rather than in manifest.json; on a
+fresh clone the first run hashes every source once and leaves the manifest
+untouched. New recordings are hard-linked into
+data_root/<category>/<direction>/<direction>_<n>.csv, with n counting up from the highest
+index already used (existing files never get renumbered). A file whose
+contents are already indexed is skipped as a duplicate. Where hard links are not
+possible (another drive, FAT), organize() falls back to copying. Recordings whose source
+has disappeared are reported, and removed only with prune=True.
+
+The first run adopts an existing data_root. Pairs listed in the old
+mapping.txt keep their paths, and other files there become 'external' entries.
+dataset.find_recordings() and load_subjects() read the manifest when it
+exists, so training no longer walks the directory tree.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+
+import pandas as pd
+from dataset import CACHE_DIRNAME, DATA_ROOT, MAPPING_FILE, categories, get_label, normal_dirs, rotate_dirs, walk_recordings
+
+ORIGINAL_ROOT = "data"
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+SIGNATURES_FILE = "source_signatures.json"  # in <data_root>/.cache/
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def subject_of(source):
+    """The collector directory of a source path (data/<subject>/...), or None."""
+    parts = source.split('/') if source else []
+    if len(parts) >= 4 and parts[1] not in categories:
+        return parts[1]
+    return None
+
+
+def recording_stats(path):
+    """(rows, sample rate in Hz from the median timestamp step) of a recording CSV."""
+    times = pd.read_csv(path, usecols=[0]).iloc[:, 0].to_numpy(dtype=float)
+    steps = times[1:] - times[:-1]
+    steps = steps[steps > 0]
+    return len(times), (round(1.0 / float(pd.Series(steps).median()), 2) if len(steps) else None)
+
+
+def link_or_copy(source, target):
+    """Hard-link source to target (replacing target), copying where links are not possible."""
+    temp = target + '.tmp'
+    if os.path.exists(temp):
+        os.remove(temp)
+    try:
+        os.link(source, temp)
+    except OSError:
+        shutil.copy2(source, temp)
+    os.replace(temp, target)
+
+
+def _posix(path):
+    return path.replace('\\', '/')
+
+
+def _sort_key(entry):
+    """The order find_recordings() walks the tree in."""
+    dirs = rotate_dirs if entry['category'] == 'rotate' else normal_dirs
+    return (categories.index(entry['category']), dirs.index(entry['direction']), os.path.basename(entry['path']))
+
+
+class Manifest:
+    """The manifest.json entries of one data root."""
+
+    def __init__(self, data_root=DATA_ROOT, entries=None):
+        self.data_root = data_root
+        self.entries = list(entries or [])
+        self.changed = False
+        self.signatures = {}  # source -> [mtime_ns, size] when it was last hashed (this checkout only)
+        self.signatures_changed = False
+
+    @classmethod
+    def load(cls, data_root=DATA_ROOT):
+        path = os.path.join(data_root, MANIFEST_FILE)
+        if not os.path.exists(path):
+            return cls(data_root)
+        with open(path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get('version') != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported manifest version {meta.get('version')} in {path}")
+        manifest = cls(data_root, meta['recordings'])
+        for entry in manifest.entries:
+            if entry.pop('source_signature', None) is not None:  # kept in the manifest by older versions
+                manifest.changed = True
+        try:
+            with open(manifest._signatures_path(), encoding="utf-8") as f:
+                manifest.signatures = json.load(f)
+        except (OSError, ValueError):
+            pass
+        return manifest
+
+    def _signatures_path(self):
+        return os.path.join(self.data_root, CACHE_DIRNAME, SIGNATURES_FILE)
+
+    def exists(self):
+        return os.path.exists(os.path.join(self.data_root, MANIFEST_FILE))
+
+    def save(self):
+        """Write manifest.json and the signature cache, each only when it changed."""
+        if self.changed:
+            path = os.path.join(self.data_root, MANIFEST_FILE)
+            self.entries.sort(key=lambda e: (e['category'], e['direction'], e['index']))
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump({'version': MANIFEST_VERSION, 'recordings': self.entries}, f, indent=1)
+            os.replace(path + ".tmp", path)
+            self.changed = False
+        if self.signatures_changed:
+            path = self._signatures_path()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(self.signatures, f)
+            os.replace(path + ".tmp", path)
+            self.signatures_changed = False
+
+    def set_signature(self, source, signature):
+        if self.signatures.get(source) != signature:
+            self.signatures[source] = signature
+            self.signatures_changed = True
+
+    def query(self, **filters):
+        """Entries whose fields equal every given value, e.g. query(subject='lbw', category='curved')."""
+        return [e for e in self.entries if all(str(e.get(k)) == str(v) for k, v in filters.items())]
+
+    def recordings(self, **filters):
+        """[(file_path, label), ...] like dataset.find_recordings(), from the index instead of the tree."""
+        entries = [e for e in self.query(**filters)
+                   if e['category'] in categories and e['direction'] in normal_dirs + rotate_dirs]
+        return [(os.path.join(self.data_root, *e['path'].split('/')), get_label(e['category'], e['direction']))
+                for e in sorted(entries, key=_sort_key)]
+
+    def subjects(self):
+        """{recording path (OS separators): subject} for the recordings with a known subject."""
+        return {os.path.normpath(e['path']): e['subject'] for e in self.entries if e.get('subject')}
+
+    def next_index(self, category, direction):
+        used = [e['index'] for e in self.entries if e['category'] == category and e['direction'] == direction]
+        directory = os.path.join(self.data_root, category, direction)
+        if os.path.isdir(directory):  # files that are not indexed (yet) keep their names too
+            used += [int(f[len(direction) + 1:-4]) for f in os.listdir(directory)
+                     if f.startswith(direction + '_') and f.endswith('.csv') and f[len(direction) + 1:-4].isdigit()]
+        return max(used, default=-1) + 1
+
+    def add(self, path, category, direction, index, source=None, origin='data', sha256=None, source_sha256=None):
+        rows, sample_rate = recording_stats(path)
+        entry = {
+            'path': _posix(os.path.relpath(path, self.data_root)),
+            'source': source,
+            'subject': subject_of(source),
+            'category': category,
+            'direction': direction,
+            'index': index,
+            'sha256': sha256 or file_sha256(path),
+            'source_sha256': source_sha256,
+            'rows': rows,
+            'sample_rate': sample_rate,
+            'origin': origin,
+        }
+        self.entries.append(entry)
+        self.changed = True
+        return entry
+
+    def remove(self, entry):
+        self.entries.remove(entry)
+        self.changed = True
+
+
+def _signature(path):
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def adopt_existing(manifest, base):
+    """Index a data_root built by the old rename_csv.py: mapping.txt pairs plus untracked files."""
+    adopted = 0
+    mapping_path = os.path.join(manifest.data_root, MAPPING_FILE)
+    if os.path.exists(mapping_path):
+        with open(mapping_path, encoding="utf-8") as f:
+            for line in f:
+                if '->' not in line:
+                    continue
+                source, target = (_posix(part.strip()) for part in line.split('->'))
+                target_path = os.path.join(base, target)
+                if not os.path.exists(target_path):
+                    continue
+                parts = target.split('/')
+                source_path = os.path.join(base, source.split('#')[0])
+                known = os.path.exists(source_path) and '#' not in source
+                origin = 'data' if known else 'segment' if '#' in source else 'external'
+                manifest.add(target_path, parts[-3], parts[-2], int(parts[-1][len(parts[-2]) + 1:-4]),
+                             source=source, origin=origin,
+                             source_sha256=file_sha256(source_path) if known else None)
+                if known:
+                    manifest.set_signature(source, _signature(source_path))
+                adopted += 1
+    indexed = {e['path'] for e in manifest.entries}
+    for file_path, label in walk_recordings(manifest.data_root):
+        relative = _posix(os.path.relpath(file_path, manifest.data_root))
+        if relative in indexed:
+            continue
+        category, direction, name = relative.split('/')
+        suffix = name[len(direction) + 1:-4]
+        manifest.add(file_path, category, direction, int(suffix) if suffix.isdigit() else manifest.next_index(
+            category, direction), origin='external')
+        adopted += 1
+    return adopted
+
+
+def open_manifest(data_root=DATA_ROOT):
+    """The manifest of data_root, adopting the files already there when it has none yet."""
+    manifest = Manifest.load(data_root)
+    if not manifest.exists():
+        adopt_existing(manifest, os.path.dirname(os.path.abspath(data_root)))
+    return manifest
+
+
+def organize(original_root=ORIGINAL_ROOT, data_root=DATA_ROOT, prune=False, verbose=True):
+    """Bring data_root and its manifest up to date with original_root; returns counts per outcome."""
+    from rename_csv import find_category_in_path, find_direction
+
+    manifest = open_manifest(data_root)
+    base = os.path.dirname(os.path.abspath(data_root))
+    counts = dict.fromkeys(['adopted', 'new', 'changed', 'unchanged', 'duplicate', 'skipped', 'missing',
+                            'pruned'], 0)
+    counts['adopted'] = 0 if manifest.exists() else len(manifest.entries)
+
+    by_source = {e['source']: e for e in manifest.entries if e['origin'] == 'data'}
+    known_hashes = {e['source_sha256'] for e in manifest.entries if e.get('source_sha256')}
+    known_hashes |= {e['sha256'] for e in manifest.entries}
+    seen = set()
+    for root, dirs, files in os.walk(original_root):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.lower().endswith('.csv'):
+                continue
+            full_path = os.path.join(root, name)
+            source = _posix(os.path.relpath(full_path, base))
+            seen.add(source)
+            signature = _signature(full_path)
+            entry = by_source.get(source)
+            if entry is not None:
+                if manifest.signatures.get(source) == signature:
+                    counts['unchanged'] += 1
+                    continue
+                digest = file_sha256(full_path)
+                manifest.set_signature(source, signature)
+                if digest == entry['source_sha256']:  # touched, not modified
+                    counts['unchanged'] += 1
+                    continue
+                target = os.path.join(data_root, *entry['path'].split('/'))
+                link_or_copy(full_path, target)
+                rows, sample_rate = recording_stats(target)
+                entry.update(sha256=digest, source_sha256=digest, rows=rows, sample_rate=sample_rate)
+                manifest.changed = True
+                counts['changed'] += 1
+                if verbose:
+                    print(f"Updated {full_path} -> {target}")
+                continue
+
+            path_parts = os.path.relpath(full_path, original_root).split(os.sep)
+            category = find_category_in_path(path_parts)
+            direction = find_direction(category, path_parts, name) if category else None
+            if category is None or direction is None:
+                counts['skipped'] += 1
+                if verbose:
+                    print(f"Skipped file {full_path}: cannot determine {'direction' if category else 'category'}")
+                continue
+            digest = file_sha256(full_path)
+            if digest in known_hashes:
+                counts['duplicate'] += 1
+                if verbose:
+                    print(f"Skipped file {full_path}: same contents as an indexed recording")
+                continue
+            index = manifest.next_index(category, direction)
+            target = os.path.join(data_root, category, direction, f"{direction}_{index}.csv")
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            link_or_copy(full_path, target)
+            by_source[source] = manifest.add(target, category, direction, index, source=source,
+                                             sha256=digest, source_sha256=digest)
+            manifest.set_signature(source, signature)
+            known_hashes.add(digest)
+            counts['new'] += 1
+            if verbose:
+                print(f"Linked {full_path} -> {target}")
+
+    for source, entry in by_source.items():
+        if source in seen:
+            continue
+        counts['missing'] += 1
+        if prune:
+            target = os.path.join(data_root, *entry['path'].split('/'))
+            if os.path.exists(target) and file_sha256(target) == entry['sha256']:
+                os.remove(target)
+            manifest.remove(entry)
+            if manifest.signatures.pop(source, None) is not None:
+                manifest.signatures_changed = True
+            counts['pruned'] += 1
+        elif verbose:
+            print(f"Source of {entry['path']} is gone: {source} (prune to remove it)")
+
+    manifest.save()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index recordings from data/ into data_new/ (manifest.json)")
+    parser.add_argument('--original-root', default=ORIGINAL_ROOT)
+    parser.add_argument('--data-root', default=DATA_ROOT)
+    parser.add_argument('--prune', action='store_true', help="remove recordings whose source file is gone")
+    parser.add_argument('--query', nargs='*', metavar='FIELD=VALUE',
+                        help="list indexed recordings matching all filters instead of organizing")
+    args = parser.parse_args()
+
+    if args.query is not None:
+        filters = dict(item.split('=', 1) for item in args.query)
+        entries = Manifest.load(args.data_root).query(**filters)
+        for e in entries:
+            print(f"{e['path']}\t{e['subject'] or '-'}\t{e['rows']} rows\t{e['sample_rate']} Hz\t{e['source'] or '-'}")
+        print(f"{len(entries)} recordings")
+        return
+
+    counts = organize(args.original_root, args.data_root, prune=args.prune)
+    print(", ".join(f"{key} {value}" for key, value in counts.items() if value) or "nothing to do")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+"""
+Producer/consumer pipeline for the real-time controller.
+
+    serial port -> SerialReader -> sample batch queue -> InferenceWorker -> command queue -> CommandSender -> drone
+
+Each stage runs in its own thread so reading the sensor never waits on the
+model or on drone ACKs. The reader pulls all available bytes at once and
+queues the parsed samples as one (n, 6) batch, first resampled onto the
+model's time grid when a StreamResampler is given. Both queues are bounded: when
+the sample queue is full the oldest batch is dropped, when the command queue is full the oldest
+pending command is dropped (a stale drone command is worse than none). Every
+drop is counted in PipelineStats, together with the latency histograms
+(time batches and commands wait in the queues, inference and ACK times) and
+per-class gesture counts that telemetry.py exports.
+
+The drone replies to takeoff, land and moves only once they have finished,
+so the sender waits up to tello_client.command_timeout(command) for each
+ACK, and first discards replies already queued on the socket (the late ACK
+of a command that timed out) so they are not taken for the next command's.
+
+A stage that fails (serial error, model error, socket error) keeps the
+exception in its `error` attribute and sets the shared stop event, so the
+whole pipeline stops and the caller can re-raise Pipeline.error().
+"""
+import queue
+import socket
+import threading
+import time
+from imu_parser import as_array, imu_values, read_available
+from telemetry import RateLimitedLog, Telemetry
+from tello_client import command_timeout
+
+SAMPLE_QUEUE_SIZE = 256  # batches
+COMMAND_QUEUE_SIZE = 4
+POLL_INTERVAL = 0.1  # s; how often a thread waiting on a queue or an ACK checks the stop event
+
+
+class PipelineStats(Telemetry):
+    """Telemetry shared by the pipeline stages; snapshot() is the flat summary printed periodically."""
+
+    FIELDS = [
+        'bytes_read', 'malformed_frames', 'samples_lost', 'samples_read', 'samples_dropped', 'sample_queue_peak',
+        'windows_classified', 'gestures', 'commands_sent', 'commands_dropped',
+        'acks_received', 'ack_timeouts', 'stale_replies',
+    ]
+    GAUGES = ['sample_queue_peak']
+
+    def __init__(self):
+        super().__init__()
+        for name in self.FIELDS:  # report zeros rather than missing series
+            (self._gauges if name in self.GAUGES else self._counters)[(name, ())] = 0
+
+    def snapshot(self):
+        with self._lock:
+            counts = {name: self._gauges[(name, ())] if name in self.GAUGES else self._counters[(name, ())]
+                      for name in self.FIELDS}
+        elapsed = time.monotonic() - self.started
+        counts['elapsed'] = round(elapsed, 3)
+        counts['sample_rate'] = round(counts['samples_read'] / elapsed, 1) if elapsed > 0 else 0.0
+        return counts
+
+    def __str__(self):
+        return ", ".join(f"{k}={v}" for k, v in self.snapshot().items())
+
+
+def put_drop_oldest(q, item):
+    """Put without blocking; evict the oldest item if full. Return the evicted item (or None)."""
+    try:
+        q.put_nowait(item)
+        return None
+    except queue.Full:
+        pass
+    try:
+        evicted = q.get_nowait()
+    except queue.Empty:
+        evicted = None
+    try:
+        q.put_nowait(item)
+    except queue.Full:
+        evicted = item
+    return evicted
+
+
+def drain(sock):
+    """Discard the datagrams already queued on a UDP socket; return how many there were."""
+    sock.setblocking(False)
+    count = 0
+    try:
+        while True:
+            sock.recvfrom(1024)
+            count += 1
+    except BlockingIOError:
+        return count
+    finally:
+        sock.setblocking(True)
+
+
+def receive(sock, timeout, stop_event=None):
+    """Wait up to `timeout` s for one datagram; None on timeout or once stop_event is set."""
+    deadline = time.monotonic() + timeout
+    while stop_event is None or not stop_event.is_set():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        sock.settimeout(min(remaining, POLL_INTERVAL))
+        try:
+            return sock.recvfrom(1024)[0]
+        except socket.timeout:
+            continue
+    return None
+
+
+class SerialReader(threading.Thread):
+    """Read all available bytes from the serial port, parse them and queue the sample batch."""
+
+    def __init__(self, ser, samples, parser, stats, stop_event, resampler=None):
+        super().__init__(name="serial-reader", daemon=True)
+        self.ser = ser
+        self.samples = samples
+        self.parser = parser
+        self.resampler = resampler
+        self.stats = stats
+        self.stop_event = stop_event
+        self.error = None
+
+    def run(self):
+        try:
+            self._read_loop()
+        except Exception as e:
+            # e.g. serial.SerialException when the port disappears
+            self.error = e
+            self.stop_event.set()
+
+    def _read_loop(self):
+        while not self.stop_event.is_set():
+            bytes_before = self.parser.bytes
+            malformed_before = self.parser.malformed
+            lost_before = getattr(self.parser, 'dropped', 0)  # binary frames carry sequence numbers
+            records = read_available(self.ser, self.parser)  # returns early on the port's read timeout
+            self.stats.incr('bytes_read', self.parser.bytes - bytes_before)
+            self.stats.incr('malformed_frames', self.parser.malformed - malformed_before)
+            self.stats.incr('samples_lost', getattr(self.parser, 'dropped', 0) - lost_before)
+            if not len(records):
+                continue
+            self.stats.incr('samples_read', len(records))
+            values = imu_values(records) if self.resampler is None else self.resampler.feed(as_array(records))
+            if not len(values):
+                continue
+            evicted = put_drop_oldest(self.samples, (time.monotonic(), values))
+            if evicted is not None:
+                self.stats.incr('samples_dropped', len(evicted[1]))
+            depth = self.samples.qsize()
+            self.stats.gauge('sample_queue_depth', depth)
+            self.stats.peak('sample_queue_peak', depth)
+
+
+class InferenceWorker(threading.Thread):
+    """Feed queued samples to a StreamingClassifier and turn gestures into commands."""
+
+    def __init__(self, samples, commands, classifier, on_gesture, stats, stop_event):
+        super().__init__(name="inference", daemon=True)
+        self.samples = samples
+        self.commands = commands
+        self.classifier = classifier
+        self.on_gesture = on_gesture
+        self.stats = stats
+        self.stop_event = stop_event
+        self.error = None
+
+    def run(self):
+        try:
+            self._work_loop()
+        except Exception as e:
+            # e.g. a model that rejects its input; nothing would classify gestures any more
+            self.error = e
+            self.stop_event.set()
+
+    def _work_loop(self):
+        while not self.stop_event.is_set():
+            try:
+                queued_at, batch = self.samples.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            self.stats.observe('sample_queue_ms', time.monotonic() - queued_at)
+            for sample in batch:
+                predictions = self.classifier.predictions
+                start = time.perf_counter()
+                gesture = self.classifier.push(sample)
+                if self.classifier.predictions != predictions:
+                    self.stats.observe('inference_ms', time.perf_counter() - start)
+                    self.stats.incr('windows_classified')
+                    self.stats.incr('predictions', label=self.classifier.last_prediction)
+                if gesture is not None:
+                    self.handle(gesture)
+
+    def handle(self, gesture):
+        self.stats.incr('gestures')
+        self.stats.incr('gestures_by_class', gesture=gesture)
+        command = self.on_gesture(gesture)
+        if command is None:
+            return
+        if put_drop_oldest(self.commands, (command, time.monotonic())) is not None:
+            self.stats.incr('commands_dropped')
+
+
+class CommandSender(threading.Thread):
+    """Send queued commands over UDP and wait (bounded) for each ACK.
+
+    ack_timeout overrides the per-command timeouts of tello_client.command_timeout().
+    """
+
+    def __init__(self, sock, address, commands, stats, stop_event, ack_timeout=None, log=None):
+        super().__init__(name="command-sender", daemon=True)
+        self.log = log or RateLimitedLog()
+        self.sock = sock
+        self.address = address
+        self.commands = commands
+        self.stats = stats
+        self.stop_event = stop_event
+        self.ack_timeout = ack_timeout
+        self.error = None
+
+    def run(self):
+        try:
+            self._send_loop()
+        except Exception as e:
+            # e.g. OSError from the socket; commands would silently pile up otherwise
+            self.error = e
+            self.stop_event.set()
+
+    def _send_loop(self):
+        while not self.stop_event.is_set():
+            try:
+                command, queued_at = self.commands.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            self.stats.observe('command_queue_ms', time.monotonic() - queued_at)
+            self.send(command)
+
+    def send(self, command):
+        timeout = command_timeout(command) if self.ack_timeout is None else self.ack_timeout
+        self.stats.incr('stale_replies', drain(self.sock))
+        print(command)
+        start = time.monotonic()
+        self.sock.sendto(command.encode(), self.address)
+        self.stats.incr('commands_sent')
+        response = receive(self.sock, timeout, self.stop_event)
+        if response is None:
+            if not self.stop_event.is_set():
+                self.stats.incr('ack_timeouts')
+                self.log('ack_timeout', f"No response to '{command}' within {timeout}s")
+            return
+        self.stats.observe('ack_ms', time.monotonic() - start)
+        self.stats.incr('acks_received')
+        print(f"Response: {response.decode('utf-8', errors='replace')}")
+
+
+class Pipeline:
+    """Wire the three stages together; start() launches them, stop() joins them."""
+
+    def __init__(self, ser, parser, classifier, on_gesture, sock, address,
+                 sample_queue_size=SAMPLE_QUEUE_SIZE, command_queue_size=COMMAND_QUEUE_SIZE,
+                 ack_timeout=None, resampler=None, log=None):
+        self.stats = PipelineStats()
+        self.stop_event = threading.Event()
+        self.samples = queue.Queue(maxsize=sample_queue_size)
+        self.commands = queue.Queue(maxsize=command_queue_size)
+        self.reader = SerialReader(ser, self.samples, parser, self.stats, self.stop_event, resampler)
+        self.worker = InferenceWorker(self.samples, self.commands, classifier, on_gesture,
+                                      self.stats, self.stop_event)
+        self.sender = CommandSender(sock, address, self.commands, self.stats, self.stop_event,
+                                    ack_timeout=ack_timeout, log=log)
+        self.threads = [self.reader, self.worker, self.sender]
+
+    def start(self):
+        self.stats.started = time.monotonic()
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self, timeout=2.0):
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join(timeout)
+
+    def is_alive(self):
+        return all(thread.is_alive() for thread in self.threads)
+
+    def error(self):
+        """The exception that stopped the first failed stage, or None."""
+        return next((thread.error for thread in self.threads if thread.error is not None), None)
@@ -0,0 +1,138 @@
+"""
+Continuous rc-stream control mode.
+
+Instead of one blocking `up 40` per gesture, RcStreamer sends `rc a b c d`
+setpoints at a fixed rate from its own thread; the classifier only changes the
+target velocity. A target expires after `hold` seconds so the drone returns to
+hover when gestures stop coming in.
+
+    a = left/right, b = forward/backward, c = up/down, d = yaw   (each -100..100)
+"""
+import math
+import threading
+import time
+
+RC_RATE_HZ = 30
+RC_HOLD = 1.0  # seconds a gesture's velocity is held before falling back to hover
+RC_SPEED = 40
+RC_YAW_SPEED = 60
+
+# gesture -> (a, b, c, d) target; gestures not listed here (takeoff/land) stay discrete commands
+GESTURE_VELOCITIES = {
+    "straight_up": (0, 0, RC_SPEED, 0),
+    "straight_down": (0, 0, -RC_SPEED, 0),
+    "straight_left": (-RC_SPEED, 0, 0, 0),
+    "straight_right": (RC_SPEED, 0, 0, 0),
+    "curved_left": (0, 0, 0, -RC_YAW_SPEED),
+    "curved_right": (0, 0, 0, RC_YAW_SPEED),
+    "none_none": (0, 0, 0, 0),
+}
+HOVER = (0, 0, 0, 0)
+
+
+def clamp_rc(value):
+    return max(-100, min(100, int(round(value))))
+
+
+def format_rc(vector):
+    return "rc " + " ".join(str(clamp_rc(v)) for v in vector)
+
+
+class JitterStats:
+    """Running mean/std/max of the interval between consecutive events."""
+
+    def __init__(self, period):
+        self.period = period
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.max_interval = 0.0
+        self.late = 0  # intervals more than 50% over the period
+        self._last = None
+
+    def tick(self, now):
+        if self._last is not None:
+            interval = now - self._last
+            self.count += 1
+            delta = interval - self.mean
+            self.mean += delta / self.count
+            self._m2 += delta * (interval - self.mean)
+            self.max_interval = max(self.max_interval, interval)
+            if interval > 1.5 * self.period:
+                self.late += 1
+        self._last = now
+
+    def std(self):
+        return math.sqrt(self._m2 / self.count) if self.count > 1 else 0.0
+
+    def as_dict(self):
+        return {
+            'intervals': self.count,
+            'period_ms': round(self.period * 1000, 2),
+            'mean_ms': round(self.mean * 1000, 2),
+            'std_ms': round(self.std() * 1000, 2),
+            'max_ms': round(self.max_interval * 1000, 2),
+            'late': self.late,
+        }
+
+    def __str__(self):
+        return ", ".join(f"{k}={v}" for k, v in self.as_dict().items())
+
+
+class RcStreamer(threading.Thread):
+    """Stream `rc` setpoints to the drone at a fixed rate."""
+
+    def __init__(self, sock, address, rate_hz=RC_RATE_HZ, hold=RC_HOLD):
+        super().__init__(name="rc-streamer", daemon=True)
+        self.sock = sock
+        self.address = address
+        self.period = 1.0 / rate_hz
+        self.hold = hold
+        self.jitter = JitterStats(self.period)
+        self.sent = 0
+        self._target = (HOVER, 0.0)  # (vector, expiry time); replaced atomically
+        self._stop_event = threading.Event()
+
+    def set_target(self, vector, hold=None):
+        """Set the velocity to stream for the next `hold` seconds."""
+        hold = self.hold if hold is None else hold
+        self._target = (tuple(vector), time.monotonic() + hold)
+
+    def set_gesture(self, gesture):
+        """Update the target from a gesture; return False if the gesture has no rc mapping."""
+        vector = GESTURE_VELOCITIES.get(gesture)
+        if vector is None:
+            return False
+        self.set_target(vector)
+        return True
+
+    def hover(self):
+        self._target = (HOVER, 0.0)
+
+    def current_setpoint(self, now):
+        vector, expiry = self._target
+        return vector if now < expiry else HOVER
+
+    def run(self):
+        # absolute deadlines so scheduling error does not accumulate
+        next_send = time.monotonic()
+        while not self._stop_event.is_set():
+            now = time.monotonic()
+            self.sock.sendto(format_rc(self.current_setpoint(now)).encode(), self.address)
+            self.sent += 1
+            self.jitter.tick(now)
+
+            next_send += self.period
+            delay = next_send - time.monotonic()
+            if delay < 0:
+                # fell behind (e.g. GC pause); skip missed slots instead of bursting
+                next_send = time.monotonic()
+                delay = 0
+            self._stop_event.wait(delay)
+
+    def stop(self, timeout=1.0):
+        """Stop streaming and leave the drone with a final hover setpoint."""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+        self.sock.sendto(format_rc(HOVER).encode(), self.address)
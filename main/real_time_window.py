@@ -1,93 +1,81 @@
 ###
 # - wait for a period of time for first prediction to come up 
-# - suggestions: use activation window and (for example) take two seconds before and two seconds after 
+# - activation window: OnsetDetector gates classification on detected motion (sliding_window.py)
+# - --dashboard: live plot of the stream and class probabilities in another process (dashboard.py)
 ###
 
+import argparse
+from startup import StartupTimer
+
+startup = StartupTimer()  # started before the heavy imports below
+
 import serial
-import time
-import numpy as np
-import joblib 
-from sklearn.preprocessing import StandardScaler
-from collections import deque
+from serving import ModelServer, streaming_classifier
+from sliding_window import OnsetDetector
+from imu_parser import make_parser, as_array, imu_values, read_available
 
 SERIAL_PORT = '/dev/tty.usbserial-110'
 BAUD_RATE = 115200
-TRUNCATE_LENGTH = 240
-GESTURES = [
-    "curved_up", "curved_down", "curved_left", "curved_right",
-    "straight_up", "straight_down", "straight_left", "straight_right", "none_none"
-]
-
-svm_model = joblib.load('../model/model.pkl')
-# scaler = joblib.load('../model/scaler.pkl')
+SERIAL_FORMAT = 'text'  # 'binary' when the firmware is built with IMU_BINARY_FRAMES
+MODEL_BUNDLE = '../model/bundle.npz'  # compiled trees written by svm.py (tree_export.py)
+HOP_LENGTH = 5  # classify every HOP_LENGTH new samples (features are updated per sample)
+VOTES = 3  # consecutive agreeing windows before a gesture is reported
+ONSET_GATING = True  # only classify windows around a detected motion onset
 
-# sliding window for real-time gesture prediction
-data_buffer = deque(maxlen=TRUNCATE_LENGTH)
+startup.mark('imports')
 
-def preprocess_data(buffer):
-    data = np.array(buffer)
-    flattened_data = data.flatten()
-
-    expected_length = 1026
-    if len(flattened_data) < expected_length:
-        flattened_data = np.pad(flattened_data, (0, expected_length - len(flattened_data)))
-    elif len(flattened_data) > expected_length:
-        flattened_data = flattened_data[:expected_length]
-
-    # return scaler.transform(flattened_data.reshape(1, -1))
-    return flattened_data.reshape(1, -1)
-
-def parse_line(line, line_data):
-    try:
-        if "time" in line:
-            time_value = float(line.split("time:")[1].strip())
-            line_data['timestamp'] = time_value
-        elif "acce_x" in line:
-            acce_values = [float(val.split(":")[1].strip()) for val in line.split("mpu6050 test: ")[1].split(",")]
-            line_data.update({'acce_x': acce_values[0], 'acce_y': acce_values[1], 'acce_z': acce_values[2]})
-        elif "gyro_x" in line:
-            gyro_values = [float(val.split(":")[1].strip()) for val in line.split("mpu6050 test: ")[1].split(",")]
-            line_data.update({'gyro_x': gyro_values[0], 'gyro_y': gyro_values[1], 'gyro_z': gyro_values[2]})
-    except Exception as e:
-        line_data = {} 
-        print(f"Skipping malformed data: {line}, error: {e}")
-
-    required_keys = ['timestamp', 'acce_x', 'acce_y', 'acce_z', 'gyro_x', 'gyro_y', 'gyro_z']
-    return all(key in line_data for key in required_keys)
-
-def predict_gesture(model, data):
-    prediction = model.predict(data)
-    return GESTURES[prediction[0]]
+# validated model + preprocessing contract; fails here rather than mid-flight on a mismatch
+server = ModelServer.load(MODEL_BUNDLE)
+# overlapping sliding window, features maintained incrementally as samples arrive
+gate = OnsetDetector() if ONSET_GATING else None
+classifier = streaming_classifier(server, hop=HOP_LENGTH, votes=VOTES, gate=gate)
+# samples onto the model's time grid, as in training (None for models trained on raw rows)
+resampler = server.resampler()
+startup.mark('model')
 
 
 if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="Print gestures recognized from the IMU stream")
+    arg_parser.add_argument('--serial', default=SERIAL_PORT, help="IMU serial device (imu_replay.py prints a pty)")
+    arg_parser.add_argument('--dashboard', action='store_true', help="plot the stream and class probabilities live")
+    args = arg_parser.parse_args()
+    ser = None
+    feed = None
+    parser = make_parser(SERIAL_FORMAT)
     try:
-        ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=1)
-        line_data = {} 
+        if args.dashboard:
+            from dashboard import LiveFeed
+            from resample import SAMPLE_RATE_HZ
+            feed = LiveFeed(server.class_list, server.sample_rate or SAMPLE_RATE_HZ).start()
+            published = 0
+        ser = serial.Serial(args.serial, BAUD_RATE, timeout=0.1)
+        startup.mark('serial')
+        print(f"Startup: {startup}")
 
         while True:
-            if ser.in_waiting > 0:
-                line = ser.readline().decode('utf-8').strip()
-
-                if parse_line(line, line_data):
-                    data_point = [
-                        line_data['acce_x'], line_data['acce_y'], line_data['acce_z'],
-                        line_data['gyro_x'], line_data['gyro_y'], line_data['gyro_z']
-                    ]
-                    data_buffer.append(data_point)
-                    line_data.clear()
-
-                    if len(data_buffer) == TRUNCATE_LENGTH:
-                        preprocessed_data = preprocess_data(data_buffer)
-                        gesture = predict_gesture(svm_model, preprocessed_data)
-                        data_buffer = []
-                        print(f"Predicted Gesture: {gesture}")
+            records = read_available(ser, parser)
+            values = imu_values(records) if resampler is None else resampler.feed(as_array(records))
+            for data_point in values:
+                gesture = classifier.push(data_point)
+                if gesture is not None:
+                    print(f"Predicted Gesture: {gesture}")
+            if feed:
+                feed.push(values)
+                if classifier.predictions != published:
+                    published = classifier.predictions
+                    feed.proba(server.last_proba)
 
     except KeyboardInterrupt:
         print("Exiting...")
     except serial.SerialException as e:
         print(f"Serial error: {e}")
     finally:
+        print(f"Parser: {parser.stats()}")
+        print(f"Model: {server.stats()}")
+        if gate:
+            print(f"Onsets detected: {gate.onsets}")
+        if feed:
+            feed.close()
         if ser:
             ser.close()
             print("Serial connection closed.")
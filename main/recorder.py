@@ -0,0 +1,171 @@
+"""
+Background session recorder for data collection.
+
+    with SessionRecorder(ser, 'data/zixin/curved/up_0', csv_path='data/zixin/curved/up_0.csv'):
+        time.sleep(4)
+
+One thread only reads the serial port and queues the bytes; a writer thread
+appends them unchanged to `<stem>.raw` (a lossless capture that can be
+re-parsed later), parses them and appends the samples to `<stem>.imu`, a
+packed SAMPLE_DTYPE log (np.fromfile(path, SAMPLE_DTYPE) reads it back).
+Every sample keeps the sensor's own timestamp from its frame, never the host
+time of the read that delivered it.
+Files are flushed every FLUSH_INTERVAL seconds and a one-line rate summary is
+printed every SUMMARY_INTERVAL seconds instead of echoing the stream. On
+close the log is exported to CSV (time relative to the first sample), the
+format the dataset loaders read. Should the stamps still repeat or step back
+(firmware restart, a capture from older firmware), export_csv() spreads them
+with resample.repair_timestamps(), so a written CSV is always strictly increasing.
+
+Re-export a capture with another parser or after a parser fix:
+
+    python recorder.py data/zixin/curved/up_0.raw --format text --csv up_0.csv
+"""
+import argparse
+import csv
+import queue
+import threading
+import time
+
+import numpy as np
+from imu_parser import COLUMNS, SAMPLE_DTYPE, as_array, make_parser, parse_text
+from resample import repair_timestamps
+
+FLUSH_INTERVAL = 1.0  # seconds between flushes of the raw and sample logs
+SUMMARY_INTERVAL = 2.0  # seconds between rate summaries (0 = silent)
+
+
+def load_log(path):
+    """Samples from a `.imu` log as a SAMPLE_DTYPE record array."""
+    return np.fromfile(path, dtype=SAMPLE_DTYPE)
+
+
+def export_csv(records, csv_path):
+    """Write records as a dataset CSV, time relative to the first sample and strictly increasing."""
+    rows = as_array(records).copy()
+    if len(rows):
+        times = rows[:, 0]
+        if len(rows) > 1 and (np.diff(np.round(times, 3)) <= 0).any():
+            times = repair_timestamps(times)
+        rows[:, 0] = np.round(times - times[0], 3)
+    with open(csv_path, mode='w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(COLUMNS)
+        writer.writerows(rows.tolist())
+    return len(rows)
+
+
+class SessionRecorder:
+    """Read serial bytes on one thread, log raw bytes and parsed samples on another."""
+
+    def __init__(self, ser, stem, fmt='text', csv_path=None, flush_interval=FLUSH_INTERVAL,
+                 summary_interval=SUMMARY_INTERVAL):
+        self.ser = ser
+        self.raw_path = stem + '.raw'
+        self.log_path = stem + '.imu'
+        self.csv_path = csv_path
+        self.parser = make_parser(fmt)
+        self.flush_interval = flush_interval
+        self.summary_interval = summary_interval
+        self.chunks = queue.Queue()  # unbounded: the reader never waits on the disk
+        self.stop_event = threading.Event()
+        self.reader = threading.Thread(target=self._read_loop, name="recorder-reader", daemon=True)
+        self.writer = threading.Thread(target=self._write_loop, name="recorder-writer", daemon=True)
+        self.bytes = 0
+        self.samples = 0
+        self.error = None
+        self.started = None
+
+    def start(self):
+        self._raw = open(self.raw_path, 'wb')
+        self._log = open(self.log_path, 'wb')
+        self.started = time.monotonic()
+        self.writer.start()
+        self.reader.start()
+        return self
+
+    def _read_loop(self):
+        try:
+            while not self.stop_event.is_set():
+                data = self.ser.read(self.ser.in_waiting or 1)  # returns early on the port's timeout
+                if data:
+                    self.chunks.put(data)
+        except Exception as e:
+            # e.g. serial.SerialException when the board is unplugged; keep what was read
+            self.error = e
+        finally:
+            self.chunks.put(None)
+
+    def _write_loop(self):
+        next_flush = time.monotonic() + self.flush_interval
+        next_summary = time.monotonic() + self.summary_interval
+        while True:
+            try:
+                data = self.chunks.get(timeout=self.flush_interval)
+            except queue.Empty:
+                data = b''
+            if data is None:
+                break
+            self._write(data)
+            now = time.monotonic()
+            if now >= next_flush:
+                self._raw.flush()
+                self._log.flush()
+                next_flush = now + self.flush_interval
+            if self.summary_interval and now >= next_summary:
+                print(f"Recording: {self.summary()}")
+                next_summary = now + self.summary_interval
+
+    def _write(self, data):
+        if not data:
+            return
+        self._raw.write(data)
+        self.bytes += len(data)
+        records = self.parser.feed(data)
+        if len(records):
+            self._log.write(records.tobytes())
+            self.samples += len(records)
+
+    def summary(self):
+        elapsed = time.monotonic() - self.started
+        rate = self.samples / elapsed if elapsed > 0 else 0.0
+        return (f"{elapsed:.1f}s, {self.samples} samples ({rate:.1f}/s), {self.bytes} bytes, "
+                f"malformed {self.parser.malformed}, backlog {self.chunks.qsize()}")
+
+    def close(self):
+        """Stop reading, drain and close the logs, export the CSV; returns the recorded samples."""
+        self.stop_event.set()
+        self.reader.join()
+        self.writer.join()
+        tail = self.parser.flush()
+        if len(tail):
+            self._log.write(tail.tobytes())
+            self.samples += len(tail)
+        self._raw.close()
+        self._log.close()
+        records = load_log(self.log_path)
+        if self.csv_path:
+            export_csv(records, self.csv_path)
+        return records
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-parse a raw serial capture into a dataset CSV")
+    parser.add_argument('raw', help="a .raw capture written by SessionRecorder")
+    parser.add_argument('--format', choices=['text', 'binary'], default='text')
+    parser.add_argument('--csv', required=True, help="output CSV")
+    args = parser.parse_args()
+
+    with open(args.raw, 'rb') as f:
+        records = parse_text(f.read(), args.format)
+    print(f"{export_csv(records, args.csv)} samples written to {args.csv}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,3 @@
-import os
-import re
-import shutil
-
 original_root = "data" 
 new_root = "data_new" 
 
@@ -53,49 +49,11 @@ def find_direction(category, path_parts, filename):
                     return d
         return None
 
-def extract_index_from_filename(filename):
-    m = re.search(r'_(\d+)\.csv$', filename)
-    if m:
-        return int(m.group(1))
-    return None
-
-files_dict = {}  # (category, direction): [(old_file_full_path, old_index), ...]
-
-for root, dirs, files in os.walk(original_root):
-    for f in files:
-        if f.lower().endswith(".csv"):
-            full_path = os.path.join(root, f)
-            rel_path = os.path.relpath(full_path, original_root)
-            path_parts = rel_path.split(os.sep)
-            
-            category = find_category_in_path(path_parts)
-            if category is None:
-                print(f"Skipped file {full_path}: cannot determine category")
-                continue
-            
-            direction = find_direction(category, path_parts, f)
-            if direction is None:
-                print(f"Skipped file {full_path}: cannot determine direction")
-                continue
-            
-            old_index = extract_index_from_filename(f)
-            key = (category, direction)
-            if key not in files_dict:
-                files_dict[key] = []
-            files_dict[key].append((full_path, old_index))
-
-os.makedirs(new_root, exist_ok=True)
+def main():
+    """Index new or changed recordings from data/ into data_new/ (hard links + manifest.json)."""
+    from manifest import organize
+    counts = organize(original_root, new_root)
+    print(", ".join(f"{key} {value}" for key, value in counts.items() if value) or "nothing to do")
 
-mapping_file_path = os.path.join(new_root, "mapping.txt")
-with open(mapping_file_path, "w", encoding="utf-8") as mapping_file:
-    for (cat, dirc), file_list in files_dict.items():
-        file_list.sort(key=lambda x: x[0]) 
-        out_dir = os.path.join(new_root, cat, dirc)
-        os.makedirs(out_dir, exist_ok=True)
-        
-        for new_index, (old_file, _) in enumerate(file_list):
-            new_filename = f"{dirc}_{new_index}.csv"
-            new_path = os.path.join(out_dir, new_filename)
-            shutil.copy2(old_file, new_path)
-            print(f"Copied {old_file} -> {new_path}")
-            mapping_file.write(f"{old_file} -> {new_path}\n")
+if __name__ == '__main__':
+    main()
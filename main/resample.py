@@ -0,0 +1,108 @@
+"""
+Resampling IMU samples onto a uniform time grid, offline and online.
+
+Rows use the dataset/parser layout (timestamp, acce_x .. gyro_z) with the
+timestamp in seconds. Both paths go through interpolate(), one vectorized
+linear interpolation of all channels at the grid times:
+
+    resample_recording(rows, rate)   -- a whole recording, grid starting at its first sample
+    StreamResampler(rate).feed(rows) -- live chunks; returns the grid samples that
+                                        became available, continuing the same grid
+
+so a model trained on resampled recordings sees windows with the same spacing
+at runtime, whatever the serial jitter or the sensor's own output rate.
+
+Recorded timestamps are not always strictly increasing: they can repeat
+(stamps rounded to the millisecond) or step back (a firmware restart).
+repair_timestamps() runs before resampling and returns strictly increasing
+times: a backward step is raised to the latest stamp, which makes it a
+repeat; each run of repeated stamps is spread evenly so that it ends at its
+stamp; a recording with a single distinct stamp gets a uniform
+SAMPLE_RATE_HZ grid.
+"""
+import numpy as np
+
+SAMPLE_RATE_HZ = 50.0  # the MPU6050 loop in i2c_simple_main.c runs at ~50 Hz
+
+
+def repair_timestamps(times):
+    """Make timestamps strictly increasing by spreading runs of repeated stamps evenly.
+
+    Each stamp is taken as the time of the last sample in its run; samples
+    before it are placed linearly between anchors.
+    """
+    t = np.maximum.accumulate(np.asarray(times, dtype=np.float64))
+    n = len(t)
+    anchors = np.flatnonzero(np.diff(t, append=np.inf) > 0)  # last index of each distinct stamp
+    if len(anchors) < 2:
+        return t[0] + np.arange(n) / SAMPLE_RATE_HZ if n else t
+    index = np.arange(n)
+    repaired = np.interp(index, anchors, t[anchors])
+    step = (t[anchors[-1]] - t[anchors[0]]) / (anchors[-1] - anchors[0])
+    head, tail = index < anchors[0], index > anchors[-1]
+    repaired[head] = t[anchors[0]] - (anchors[0] - index[head]) * step
+    repaired[tail] = t[anchors[-1]] + (index[tail] - anchors[-1]) * step
+    return repaired
+
+
+def interpolate(times, values, grid):
+    """Linearly interpolate (n, channels) values sampled at increasing `times` onto `grid`."""
+    right = np.clip(np.searchsorted(times, grid, side='right'), 1, len(times) - 1)
+    left = right - 1
+    span = times[right] - times[left]
+    frac = np.clip((grid - times[left]) / np.where(span > 0, span, 1.0), 0.0, 1.0)[:, None]
+    return values[left] * (1 - frac) + values[right] * frac
+
+
+def resample_recording(rows, rate=SAMPLE_RATE_HZ, repair=True):
+    """(n, 7) rows -> (m, 7) rows on a uniform grid from the first timestamp at `rate` Hz."""
+    rows = np.asarray(rows, dtype=np.float64)
+    if len(rows) < 2:
+        return rows.copy()
+    times = repair_timestamps(rows[:, 0]) if repair else rows[:, 0]
+    n_out = int(np.floor((times[-1] - times[0]) * rate + 1e-9)) + 1
+    grid = times[0] + np.arange(n_out) / rate
+    return np.column_stack([grid, interpolate(times, rows[:, 1:], grid)])
+
+
+class StreamResampler:
+    """Incremental resample_recording() for live (n, 7) row chunks."""
+
+    def __init__(self, rate=SAMPLE_RATE_HZ, channels=6):
+        self.rate = rate
+        self.channels = channels
+        self.reset()
+
+    def reset(self):
+        self._last = None  # last accepted input row, the left edge for the next chunk
+        self._start = None  # grid origin
+        self._next = 0  # index of the next grid point to emit
+        self.discarded = 0  # input rows dropped for non-increasing timestamps
+
+    def feed(self, rows):
+        """Return the (k, channels) grid samples covered by the input received so far."""
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, self.channels + 1)
+        if self._last is not None and len(rows) and rows[0, 0] < self._last[0] - 1.0:
+            self.reset()  # clock went backwards by more than a second: sensor restarted
+        if self._last is not None:
+            rows = np.vstack([self._last[None], rows])
+        if not len(rows):
+            return np.empty((0, self.channels))
+
+        increasing = np.concatenate([[True], rows[1:, 0] > np.maximum.accumulate(rows[:-1, 0])])
+        self.discarded += int((~increasing).sum())
+        rows = rows[increasing]
+        self._last = rows[-1].copy()
+        if self._start is None:
+            self._start = rows[0, 0]
+        if len(rows) < 2:
+            return rows[:0, 1:] if self._next else self._emit_first(rows)
+
+        last_index = int(np.floor((rows[-1, 0] - self._start) * self.rate + 1e-9))
+        grid = self._start + np.arange(self._next, last_index + 1) / self.rate
+        self._next = last_index + 1
+        return interpolate(rows[:, 0], rows[:, 1:], grid)
+
+    def _emit_first(self, rows):
+        self._next = 1
+        return rows[:1, 1:].copy()
@@ -0,0 +1,153 @@
+"""
+Incremental feature engine for the real-time ring buffer.
+
+RunningFeatures is a RingBuffer that also keeps, per axis, running sums and
+sums of squares, sums over the sample-to-sample differences, cross-products
+for the axis correlations, monotonic min/max deques and a sliding DFT. Each
+new sample updates all of them in constant time (with respect to the window
+length), so features() is cheap enough to classify at every sample.
+
+features() returns the same vector as features.extract_features on the
+current window. The one exception to O(1) updates is the zero-crossing rate:
+it is measured around the window mean, which moves with every sample, so it
+is computed from the buffer (one vectorized pass) when features() is called.
+Running sums and the DFT drift slowly in floating point, so they are
+recomputed exactly from the buffer every `resync_every` samples.
+"""
+from collections import deque
+
+import numpy as np
+from features import CORR_PAIRS, EPS, band_slices
+from sliding_window import NUM_CHANNELS, RingBuffer
+
+_PAIR_I, _PAIR_J = np.array(CORR_PAIRS).T
+
+
+class RunningFeatures(RingBuffer):
+    """Ring buffer that maintains extract_features() incrementally."""
+
+    def __init__(self, size, channels=NUM_CHANNELS, resync_every=None):
+        if size < 2:
+            raise ValueError("window must hold at least 2 samples")
+        super().__init__(size, channels)
+        self.resync_every = size if resync_every is None else resync_every
+        n_bins = size // 2 + 1
+        # sliding DFT: X_k <- (X_k - x_oldest + x_new) * e^{+j 2 pi k / N}
+        self._twiddle = np.exp(2j * np.pi * np.arange(n_bins) / size)[:, None]
+        self._bands = band_slices(n_bins)
+        self._since_resync = 0
+        self._reset_state()
+
+    def _reset_state(self):
+        channels = self.channels
+        self._dft = np.zeros((len(self._twiddle), channels), dtype=np.complex128)
+        self._sum = np.zeros(channels)
+        self._sumsq = np.zeros(channels)
+        self._cross = np.zeros(len(CORR_PAIRS))
+        self._dsum = np.zeros(channels)
+        self._dsq = np.zeros(channels)
+        self._dabs = np.zeros(channels)
+        self._min = [deque() for _ in range(channels)]  # (sample index, value), increasing values
+        self._max = [deque() for _ in range(channels)]  # (sample index, value), decreasing values
+
+    def reset(self):
+        super().reset()
+        self._since_resync = 0
+        self._reset_state()
+
+    def append(self, sample):
+        if not self.is_full():
+            super().append(sample)
+            if self.is_full():
+                self.resync()
+            return
+
+        sample = np.asarray(sample, dtype=np.float64)
+        oldest = self._data[self._head].copy()
+        second = self._data[self._head + 1]  # the mirror half makes head + 1 always valid
+        newest = self._data[self._head + self.size - 1]
+        removed_diff = second - oldest
+        added_diff = sample - newest
+
+        self._sum += sample - oldest
+        self._sumsq += sample * sample - oldest * oldest
+        self._cross += sample[_PAIR_I] * sample[_PAIR_J] - oldest[_PAIR_I] * oldest[_PAIR_J]
+        self._dsum += added_diff - removed_diff
+        self._dsq += added_diff * added_diff - removed_diff * removed_diff
+        self._dabs += np.abs(added_diff) - np.abs(removed_diff)
+        self._dft += sample - oldest
+        self._dft *= self._twiddle
+
+        super().append(sample)
+        self._push_extrema(self.count - 1, sample)
+
+        self._since_resync += 1
+        if self._since_resync >= self.resync_every:
+            self.resync()
+
+    def extend(self, samples):
+        for sample in np.asarray(samples, dtype=np.float64).reshape(-1, self.channels):
+            self.append(sample)
+
+    def _push_extrema(self, index, sample):
+        expired = index - self.size
+        for c in range(self.channels):
+            value = sample[c]
+            lows, highs = self._min[c], self._max[c]
+            while lows and lows[-1][1] >= value:
+                lows.pop()
+            lows.append((index, value))
+            while lows[0][0] <= expired:
+                lows.popleft()
+            while highs and highs[-1][1] <= value:
+                highs.pop()
+            highs.append((index, value))
+            while highs[0][0] <= expired:
+                highs.popleft()
+
+    def resync(self):
+        """Recompute every running quantity exactly from the current window."""
+        x = self.window()
+        diffs = np.diff(x, axis=0)
+        self._sum = x.sum(axis=0)
+        self._sumsq = (x * x).sum(axis=0)
+        self._cross = (x[:, _PAIR_I] * x[:, _PAIR_J]).sum(axis=0)
+        self._dsum = diffs.sum(axis=0)
+        self._dsq = (diffs * diffs).sum(axis=0)
+        self._dabs = np.abs(diffs).sum(axis=0)
+        self._dft = np.fft.rfft(x, axis=0)
+
+        first = self.count - self.size
+        self._min = [deque() for _ in range(self.channels)]
+        self._max = [deque() for _ in range(self.channels)]
+        for offset, sample in enumerate(x):
+            self._push_extrema(first + offset, sample)
+        self._since_resync = 0
+
+    def features(self):
+        """extract_features() of the current window as a (1, n_features) array."""
+        if not self.is_full():
+            raise ValueError("window is not full yet")
+        n = self.size
+        mean = self._sum / n
+        energy = self._sumsq / n
+        std = np.sqrt(np.maximum(energy - mean * mean, 0.0))
+        lows = np.array([q[0][1] for q in self._min])
+        highs = np.array([q[0][1] for q in self._max])
+
+        signs = np.signbit(self.window() - mean)
+        zcr = (signs[1:] != signs[:-1]).sum(axis=0) / (n - 1)
+
+        jerk_mean = self._dabs / (n - 1)
+        jerk_avg = self._dsum / (n - 1)
+        jerk_std = np.sqrt(np.maximum(self._dsq / (n - 1) - jerk_avg * jerk_avg, 0.0))
+
+        # bin 0 is the only one affected by centring, and band_slices skips it
+        power = (self._dft.real ** 2 + self._dft.imag ** 2) / n
+        bands = [power[band].sum(axis=0) for band in self._bands]
+
+        cov = self._cross / n - mean[_PAIR_I] * mean[_PAIR_J]
+        corr = cov / (std[_PAIR_I] * std[_PAIR_J] + EPS)
+
+        per_axis = [mean, std, lows, highs, energy, zcr, jerk_mean, jerk_std] + bands
+        return np.concatenate(per_axis + [corr])[None, :]
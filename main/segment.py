@@ -0,0 +1,185 @@
+"""
+Split a continuous collection session into single-repetition recordings.
+
+    python segment.py data/zixin/curved/session_up_20261018-101500.imu --category curved --direction up
+
+A session is one long recording of the same gesture repeated with short
+pauses in between. The OnsetDetector used to gate the real-time classifier
+finds where each repetition starts and ends (on the session resampled to
+SAMPLE_RATE_HZ); every repetition becomes a segment of the same duration,
+`length` seconds starting `pre_roll` seconds before its onset, cut from the
+raw samples. Like the gated classifier (sliding_window.py), segments start at
+the onset instead of being centred on the motion, so they line up with the
+existing takes, which begin just before the gesture. Repetitions that do not
+fit that frame (too close to the previous one, cut off by the session edges,
+with a gap in the samples, or moving for longer than `max_motion` seconds when
+that is set) are rejected rather than truncated.
+
+Segments are written as <direction>_<n>.csv into data_new/<category>/<direction>/ (cw/ccw for rotate),
+numbered after the files already there, and indexed in manifest.json with
+the session as their source so subject_groups() knows who recorded them.
+Sessions of the no-gesture class (category 'none') are simply cut into
+consecutive segments of the same length.
+
+`length` defaults to the median duration of the takes already in the
+dataset (take_seconds(), about 4 s for data_new). svm.py truncates every
+recording to the shortest one, so shorter segments would silently shrink the
+training window of the whole dataset.
+"""
+import argparse
+import os
+
+import numpy as np
+from dataset import DATA_ROOT, find_recordings, load_dataset, normal_dirs, rotate_dirs
+from imu_parser import as_array, parse_text
+from manifest import open_manifest
+from recorder import export_csv, load_log
+from rename_csv import unify_rotate_direction
+from resample import SAMPLE_RATE_HZ, resample_recording
+from sliding_window import OnsetDetector
+
+SEGMENT_SECONDS = 4.0  # take length when the dataset has none yet (data_collect.py records 4 s takes)
+PRE_ROLL_SECONDS = 0.3  # kept before the detected onset
+
+
+def take_seconds(data_root=DATA_ROOT):
+    """Median duration of the recordings already in data_root; SEGMENT_SECONDS when there are none."""
+    if not os.path.isdir(data_root) or not find_recordings(data_root):
+        return SEGMENT_SECONDS
+    dataset = load_dataset(data_root)
+    times = dataset.samples[:, 0]
+    durations = times[dataset.offsets + dataset.lengths - 1] - times[dataset.offsets]
+    return round(float(np.median(durations)), 3)
+
+
+def motion_spans(values, detector=None):
+    """[(onset, offset), ...] sample indices of each detected motion in (n, 6) values."""
+    detector = detector or OnsetDetector()
+    spans, onset = [], None
+    for i, sample in enumerate(values):
+        started = detector.update(sample)
+        if started is not None:
+            onset = started - 1  # update() counts samples from 1
+        elif onset is not None and not detector.active:
+            spans.append((onset, i - detector.hold + 1))  # the detector re-arms `hold` quiet samples late
+            onset = None
+    if onset is not None:
+        spans.append((onset, len(values)))
+    return spans
+
+
+def segment_session(records, length=SEGMENT_SECONDS, pre_roll=PRE_ROLL_SECONDS, max_motion=None,
+                    rate=SAMPLE_RATE_HZ, detector=None):
+    """Cut SAMPLE_DTYPE session records into repetitions.
+
+    Returns (segments, rejected): a list of record arrays and a list of
+    (session time of the onset, reason) for the repetitions left out.
+    """
+    grid = resample_recording(as_array(records), rate)
+    times = as_array(records)[:, 0]
+    segments, rejected, last_end = [], [], -np.inf
+    for onset, offset in motion_spans(grid[:, 1:], detector):
+        onset_time, motion = grid[onset, 0], (offset - onset) / rate
+        start = onset_time - pre_roll
+        end = start + length
+        if max_motion is not None and motion > max_motion:
+            rejected.append((onset_time, f"moved for {motion:.2f}s"))
+        elif start < last_end:
+            rejected.append((onset_time, "starts inside the previous repetition"))
+        elif start < times[0] or end > times[-1]:
+            rejected.append((onset_time, "cut off by the start or end of the session"))
+        else:
+            segment = records[(times >= start) & (times < end)]
+            covered = as_array(segment)[-1, 0] - as_array(segment)[0, 0] if len(segment) else 0.0
+            if covered < length - 2.0 / rate:
+                rejected.append((onset_time, f"samples cover only {covered:.2f}s"))
+                continue
+            segments.append(segment)
+            last_end = end
+    return segments, rejected
+
+
+def split_evenly(records, length=SEGMENT_SECONDS):
+    """Consecutive `length`-second pieces of a session, for the no-gesture class that has no onsets."""
+    times = as_array(records)[:, 0]
+    starts = np.arange(times[0], times[-1] - length + 1e-9, length) if len(times) else []
+    return [records[(times >= start) & (times < start + length)] for start in starts]
+
+
+def load_session(path, fmt='text'):
+    """Session samples from a recorder .imu log, a .raw capture or a CSV."""
+    if path.endswith('.imu'):
+        return load_log(path)
+    if path.endswith('.raw'):
+        with open(path, 'rb') as f:
+            return parse_text(f.read(), fmt)
+    from imu_replay import load_csv
+    return load_csv(path)
+
+
+def write_segments(segments, category, direction, source, data_root=DATA_ROOT):
+    """Write segments as the next <direction>_<n>.csv files and index them in manifest.json.
+
+    `source` is the session path; in the manifest it is relative to the
+    directory holding data_root (data/<subject>/...), which names the subject.
+    Rotate directions are stored as cw/ccw whatever they were collected as.
+    """
+    if category == 'rotate':
+        direction = unify_rotate_direction(direction) or direction
+    if direction not in (rotate_dirs if category == 'rotate' else normal_dirs):
+        raise ValueError(f"Unknown direction '{direction}' for {category}; the dataset would never load it")
+    manifest = open_manifest(data_root)
+    directory = os.path.join(data_root, category, direction)
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.dirname(os.path.abspath(data_root))
+    source = os.path.splitext(os.path.relpath(source, base))[0].replace('\\', '/')
+    first = manifest.next_index(category, direction)
+    paths = []
+    for k, segment in enumerate(segments):
+        path = os.path.join(directory, f"{direction}_{first + k}.csv")
+        export_csv(segment, path)
+        manifest.add(path, category, direction, first + k, source=f"{source}#{k}", origin='segment')
+        paths.append(path)
+    manifest.save()
+    return paths
+
+
+def report(segments, rejected):
+    lengths = [len(s) for s in segments]
+    print(f"{len(segments)} repetitions kept, {len(rejected)} rejected"
+          + (f"; {min(lengths)}-{max(lengths)} samples each" if lengths else ""))
+    for onset_time, reason in rejected:
+        print(f"  rejected repetition at {onset_time:.2f}s: {reason}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Split a collection session into single-repetition recordings")
+    parser.add_argument('session', help="recorder .imu log, .raw capture or CSV of one gesture class")
+    parser.add_argument('--category', required=True, help="e.g. curved")
+    parser.add_argument('--direction', required=True, help="e.g. up")
+    parser.add_argument('--format', choices=['text', 'binary'], default='text', help="format of a .raw capture")
+    parser.add_argument('--length', type=float, default=None,
+                        help="seconds per repetition (default: median length of the takes in --data-root)")
+    parser.add_argument('--pre-roll', type=float, default=PRE_ROLL_SECONDS, help="seconds kept before the onset")
+    parser.add_argument('--max-motion', type=float, default=None,
+                        help="reject repetitions that keep moving for longer than this many seconds")
+    parser.add_argument('--data-root', default=os.path.join('..', DATA_ROOT))
+    parser.add_argument('--dry-run', action='store_true', help="only report what would be written")
+    args = parser.parse_args()
+
+    records = load_session(args.session, args.format)
+    if args.length is None:
+        args.length = take_seconds(args.data_root)
+        print(f"Segment length: {args.length}s (median take in {args.data_root})")
+    if args.category == 'none':
+        segments, rejected = split_evenly(records, args.length), []
+    else:
+        segments, rejected = segment_session(records, args.length, args.pre_roll, args.max_motion)
+    report(segments, rejected)
+    if segments and not args.dry_run:
+        for path in write_segments(segments, args.category, args.direction, args.session, args.data_root):
+            print(f"  {path}")
+
+
+if __name__ == '__main__':
+    main()
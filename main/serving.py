@@ -0,0 +1,198 @@
+"""
+Model serving with a single preprocessing contract.
+
+Training scripts save a versioned bundle with save_bundle():
+
+    model        -- fitted sklearn classifier or LightGBM Booster
+    scaler       -- optional fitted scaler applied after feature extraction
+    features     -- 'handcrafted' (features.extract_features) or 'raw' (flattened window)
+    feature_names, n_features
+    class_list   -- label string for every class id
+    window_rows  -- samples per window the model was trained on
+    sample_rate  -- Hz of the uniform grid the windows were resampled to (resample.py),
+                    or None when the model was trained on raw rows
+
+ModelServer.load() reads the bundle once, checks that model, scaler, feature
+spec and class list agree, runs a warm-up prediction, and then serves
+predict_batch / predict_proba for windows or precomputed feature rows, keeping
+timing metrics. A bundle that does not match the running code fails at
+startup instead of producing mis-sized inputs mid-flight.
+
+Tree models can also be served from a compiled .npz (tree_export.py), which
+ModelServer.load() reads without sklearn or lightgbm installed. joblib is only
+imported for .pkl bundles, whose arrays are memory-mapped rather than copied,
+so the real-time scripts start without paying for either.
+"""
+import time
+
+import numpy as np
+from features import extract_features, feature_names
+from running_features import RunningFeatures
+from sliding_window import StreamingClassifier
+
+BUNDLE_VERSION = 1
+FEATURE_SPECS = ['handcrafted', 'raw']
+
+
+def expected_features(features, window_rows, channels=6):
+    if features == 'handcrafted':
+        return feature_names()
+    if features == 'raw':
+        return [f"r{row}_c{c}" for row in range(window_rows) for c in range(channels)]
+    raise ValueError(f"Unknown feature spec '{features}', expected one of {FEATURE_SPECS}")
+
+
+def save_bundle(path, model, class_list, window_rows, features='handcrafted', scaler=None, sample_rate=None,
+                **metadata):
+    """Write a model bundle that ModelServer can load; returns the bundle dict."""
+    names = expected_features(features, window_rows)
+    bundle = {
+        'version': BUNDLE_VERSION,
+        'model': model,
+        'scaler': scaler,
+        'features': features,
+        'feature_names': names,
+        'n_features': len(names),
+        'class_list': list(class_list),
+        'window_rows': int(window_rows),
+        'sample_rate': sample_rate,
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'metadata': metadata,
+    }
+    import joblib
+    joblib.dump(bundle, path)
+    print(f"Model bundle saved to {path}")
+    return bundle
+
+
+def _model_n_features(model):
+    if hasattr(model, 'n_features_in_'):
+        return model.n_features_in_
+    if hasattr(model, 'num_feature'):  # lightgbm.Booster
+        return model.num_feature()
+    return None
+
+
+class ModelServer:
+    """Validated, warm-loaded model bundle with batched prediction and timing."""
+
+    def __init__(self, bundle):
+        if bundle.get('version') != BUNDLE_VERSION:
+            raise ValueError(f"Unsupported bundle version {bundle.get('version')}, expected {BUNDLE_VERSION}")
+        self.model = bundle['model']
+        self.scaler = bundle['scaler']
+        self.features = bundle['features']
+        self.class_list = bundle['class_list']
+        self.window_rows = bundle['window_rows']
+        self.sample_rate = bundle.get('sample_rate')  # bundles from before resampling have none
+        self.n_features = bundle['n_features']
+        self.metadata = bundle.get('metadata', {})
+        self.last_proba = None  # class probabilities of the most recent window (e.g. for dashboard.py)
+        self._validate(bundle)
+        self._warm_up()
+
+    @classmethod
+    def load(cls, path):
+        if str(path).endswith('.npz'):
+            from tree_export import load_compiled
+            return cls(load_compiled(path))
+        import joblib
+        return cls(joblib.load(path, mmap_mode='r'))
+
+    def _validate(self, bundle):
+        names = expected_features(self.features, self.window_rows)
+        if names != bundle['feature_names']:
+            raise ValueError("Bundle was trained with a different feature set than features.py provides; retrain it.")
+        model_features = _model_n_features(self.model)
+        if model_features is not None and model_features != self.n_features:
+            raise ValueError(f"Model expects {model_features} features, bundle declares {self.n_features}")
+        if self.scaler is not None and getattr(self.scaler, 'n_features_in_', self.n_features) != self.n_features:
+            raise ValueError(f"Scaler expects {self.scaler.n_features_in_} features, bundle declares {self.n_features}")
+        classes = getattr(self.model, 'classes_', None)
+        if classes is not None and (np.min(classes) < 0 or np.max(classes) >= len(self.class_list)):
+            raise ValueError(f"Model classes {list(classes)} do not fit class_list of {len(self.class_list)}")
+
+    def _warm_up(self):
+        # first calls pay for lazy initialisation inside sklearn/lightgbm; do it before flying
+        self.reset_timing()
+        self.predict_batch(np.zeros((1, self.window_rows, 6)))
+        self.reset_timing()
+
+    def reset_timing(self):
+        self.timing = {'calls': 0, 'windows': 0, 'total_s': 0.0, 'max_s': 0.0, 'last_s': 0.0}
+
+    def transform(self, windows):
+        """(batch, window_rows, 6) windows -> (batch, n_features) model input (before scaling)."""
+        windows = np.asarray(windows, dtype=np.float64)
+        if windows.ndim == 2:
+            windows = windows[None]
+        if windows.shape[1:] != (self.window_rows, 6):
+            raise ValueError(f"Expected windows of shape (batch, {self.window_rows}, 6), got {windows.shape}")
+        if self.features == 'handcrafted':
+            return extract_features(windows)
+        return windows.reshape(len(windows), -1)
+
+    def _scores(self, X):
+        """Class scores for a feature matrix: (batch, n_classes) probabilities."""
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+        if self.scaler is not None:
+            X = self.scaler.transform(X)
+        start = time.perf_counter()
+        if hasattr(self.model, 'predict_proba'):
+            proba = np.zeros((len(X), len(self.class_list)))
+            proba[:, self.model.classes_] = self.model.predict_proba(X)
+        elif hasattr(self.model, 'classes_'):  # sklearn model without probabilities, e.g. SVC()
+            proba = np.zeros((len(X), len(self.class_list)))
+            proba[np.arange(len(X)), self.model.predict(X)] = 1.0
+        else:  # lightgbm.Booster returns probabilities from predict()
+            proba = np.asarray(self.model.predict(X)).reshape(len(X), -1)
+        elapsed = time.perf_counter() - start
+        self.timing['calls'] += 1
+        self.timing['windows'] += len(X)
+        self.timing['total_s'] += elapsed
+        self.timing['last_s'] = elapsed
+        self.timing['max_s'] = max(self.timing['max_s'], elapsed)
+        self.last_proba = proba[-1]
+        return proba
+
+    def predict_proba(self, windows):
+        return self._scores(self.transform(windows))
+
+    def predict_batch(self, windows):
+        """Class labels (strings) for a batch of windows."""
+        return self.labels(self.predict_proba(windows))
+
+    def predict_features(self, X):
+        """Class labels for precomputed feature rows (e.g. RunningFeatures.features())."""
+        return self.labels(self._scores(np.asarray(X, dtype=np.float64).reshape(-1, self.n_features)))
+
+    def resampler(self):
+        """StreamResampler onto the model's time grid, or None for raw-row models.
+
+        Feed it (n, 7) rows with timestamps (imu_parser.as_array(records)) and
+        push its output to the classifier instead of imu_values(records).
+        """
+        if self.sample_rate is None:
+            return None
+        from resample import StreamResampler
+        return StreamResampler(self.sample_rate)
+
+    def labels(self, proba):
+        return [self.class_list[i] for i in np.argmax(proba, axis=1)]
+
+    def stats(self):
+        calls = self.timing['calls']
+        mean_ms = self.timing['total_s'] / calls * 1000 if calls else 0.0
+        return {'calls': calls, 'windows': self.timing['windows'], 'mean_ms': round(mean_ms, 3),
+                'max_ms': round(self.timing['max_s'] * 1000, 3), 'last_ms': round(self.timing['last_s'] * 1000, 3)}
+
+
+def streaming_classifier(server, hop, votes, **kwargs):
+    """StreamingClassifier wired to a ModelServer, with incremental features when the bundle allows it."""
+    if server.features == 'handcrafted':
+        feature_buffer = RunningFeatures(server.window_rows)
+        predict = lambda window: server.predict_features(feature_buffer.features())[0]
+        return StreamingClassifier(predict, hop=hop, votes=votes, buffer=feature_buffer, **kwargs)
+    predict = lambda window: server.predict_batch(window)[0]
+    return StreamingClassifier(predict, window=server.window_rows, hop=hop, votes=votes, **kwargs)
@@ -0,0 +1,266 @@
+"""
+Overlapping sliding-window inference for the real-time IMU stream.
+The last N samples live in a preallocated ring buffer and the classifier runs
+every `hop` new samples; a vote/debounce stage turns the stream of per-window
+predictions into one event per gesture.
+
+With an OnsetDetector as `gate` the classifier stays idle until motion
+starts: the detector watches the smoothed gyro magnitude against an adaptive
+noise floor, and each onset schedules a short burst of `votes` classifications
+on windows that begin `pre_roll` samples before the onset. The ring buffer
+already holds the pre-roll, so nothing extra is buffered.
+
+The windows are anchored at the onset rather than centred on the motion.
+Every training recording starts just before its gesture (median onset 0.08 s
+into a ~4 s take; the motion and its settling fill the rest), so a window
+that starts at the onset shows the model what it was trained on. A centred
+window would put half a window of idle signal in front of the gesture and cut
+its end off. It would also have to wait for the motion to end before it
+could classify.
+"""
+from collections import deque
+
+import numpy as np
+
+NUM_CHANNELS = 6  # acce_x, acce_y, acce_z, gyro_x, gyro_y, gyro_z
+
+
+class RingBuffer:
+    """Fixed-size buffer of the last `size` samples, oldest first.
+
+    Every sample is written twice (at i and i + size) so the current window is
+    always one contiguous slice and `window()` never has to copy or reorder.
+    """
+
+    def __init__(self, size, channels=NUM_CHANNELS, dtype=np.float64):
+        self.size = size
+        self.channels = channels
+        self._data = np.zeros((2 * size, channels), dtype=dtype)
+        self._head = 0
+        self.count = 0  # total samples seen since the last reset
+
+    def append(self, sample):
+        self._data[self._head] = sample
+        self._data[self._head + self.size] = sample
+        self._head = (self._head + 1) % self.size
+        self.count += 1
+
+    def extend(self, samples):
+        samples = np.asarray(samples, dtype=self._data.dtype).reshape(-1, self.channels)
+        n = len(samples)
+        if n == 0:
+            return
+        kept = samples[-self.size:]
+        idx = (self._head + np.arange(n - len(kept), n)) % self.size
+        self._data[idx] = kept
+        self._data[idx + self.size] = kept
+        self._head = (self._head + n) % self.size
+        self.count += n
+
+    def is_full(self):
+        return self.count >= self.size
+
+    def window(self):
+        """Return a read-only view of the last `size` samples (oldest first)."""
+        view = self._data[self._head:self._head + self.size]
+        view.flags.writeable = False
+        return view
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def reset(self):
+        self._data[:] = 0
+        self._head = 0
+        self.count = 0
+
+
+class OnsetDetector:
+    """Energy-based motion onset detection with hysteresis.
+
+    Activity is the gyro magnitude (deg/s) plus `accel_weight` times how far the
+    accelerometer magnitude is from gravity (g, orientation-independent), smoothed over ~`smooth`
+    samples; the accelerometer term catches straight, mostly translational
+    gestures. A sample is active when activity exceeds both `ratio` times the
+    noise floor and `min_level`; `min_active` active samples in a row make an
+    onset, and the detector re-arms after `hold` quiet samples. The noise floor
+    follows the signal slowly while idle (rising at `floor_rise` of the speed
+    it falls, so the slow start of a gentle gesture does not lift the floor out
+    of its reach), so hand tremor does not trigger. The gravity estimate
+    follows the accelerometer magnitude the same way, idle or active: with
+    per-axis bias the resting magnitude changes with the board's orientation,
+    and a gesture that ends in a new one would otherwise stay loud and never
+    re-arm. After `max_active` samples (about `hold` plus one window) the
+    detector re-arms anyway and takes the current signal as its new baseline.
+    """
+
+    def __init__(self, smooth=5, ratio=2.5, min_level=8.0, min_active=3, hold=50, max_active=250,
+                 floor_alpha=0.02, floor_rise=0.5, accel_weight=100.0, accel=slice(0, 3), gyro=slice(3, 6)):
+        self.alpha = 2.0 / (smooth + 1)
+        self.accel_weight = accel_weight
+        self.accel = accel
+        self.ratio = ratio
+        self.min_level = min_level
+        self.min_active = min_active
+        self.hold = hold
+        self.max_active = max_active
+        self.floor_alpha = floor_alpha
+        self.floor_rise = floor_rise
+        self.gyro = gyro
+        self.onsets = 0
+        self.reset()
+
+    def reset(self):
+        self.level = None
+        self.floor = None
+        self.gravity = None
+        self.active = False
+        self.count = 0
+        self._run = 0  # consecutive active samples while idle
+        self._quiet = 0  # consecutive quiet samples while active
+        self._active_for = 0  # samples since the onset
+
+    def update(self, sample):
+        """Feed one sample; return the sample count at which motion began on an onset, else None."""
+        sample = np.asarray(sample, dtype=np.float64)
+        self.count += 1
+        accel = np.sqrt(np.sum(np.square(sample[self.accel])))
+        if self.gravity is None:
+            self.gravity = accel
+        deviation = accel - self.gravity
+        magnitude = np.sqrt(np.sum(np.square(sample[self.gyro]))) + self.accel_weight * abs(deviation)
+        if self.level is None:
+            self.level = self.floor = magnitude
+            return None
+        self.level += self.alpha * (magnitude - self.level)
+        self.gravity += self.floor_alpha * deviation
+        loud = self.level > max(self.ratio * self.floor, self.min_level)
+
+        if self.active:
+            self._quiet = 0 if loud else self._quiet + 1
+            self._active_for += 1
+            if self._quiet >= self.hold:
+                self.active = False
+                self._run = 0
+            elif self._active_for >= self.max_active:
+                self.active = False
+                self._run = 0
+                self.level = self.floor = self.gravity = None  # re-baseline on the next sample
+            return None
+
+        if not loud:
+            rate = self.floor_alpha * (self.floor_rise if self.level > self.floor else 1.0)
+            self.floor += rate * (self.level - self.floor)
+            self._run = 0
+            return None
+        self._run += 1
+        if self._run < self.min_active:
+            return None
+        self.active = True
+        self._quiet = 0
+        self._active_for = 0
+        self.onsets += 1
+        return self.count - self.min_active + 1
+
+
+class StreamingClassifier:
+    """Run `predict_fn` on overlapping windows and debounce the results.
+
+    predict_fn   -- callable taking a (window, channels) array, returning a label
+    window       -- number of samples per classification window
+    hop          -- classify once every `hop` new samples
+    votes        -- consecutive agreeing predictions needed to fire a gesture
+    refractory   -- samples after a fired gesture during which nothing fires
+                    (defaults to one window, so one motion gives one command)
+    idle_labels  -- labels that are never fired (e.g. the "no gesture" class)
+    buffer       -- RingBuffer to fill instead of a fresh one, e.g. a
+                    RunningFeatures engine that predict_fn reads features from
+    gate         -- optional OnsetDetector; when set, windows are only classified
+                    after an onset (`votes` windows, `hop` apart)
+    pre_roll     -- samples before the onset that the first gated window starts with
+    """
+
+    def __init__(self, predict_fn, window=240, hop=20, votes=2, refractory=None,
+                 idle_labels=("none_none",), channels=NUM_CHANNELS, buffer=None, gate=None, pre_roll=10):
+        if hop < 1:
+            raise ValueError("hop must be >= 1")
+        if votes < 1:
+            raise ValueError("votes must be >= 1")
+        self.predict_fn = predict_fn
+        self.buffer = RingBuffer(window, channels) if buffer is None else buffer
+        window = self.buffer.size
+        self.hop = hop
+        self.votes = votes
+        self.refractory = window if refractory is None else refractory
+        self.idle_labels = set(idle_labels)
+        self._recent = deque(maxlen=votes)
+        self._since_predict = 0
+        self._last_fired_at = None
+        self.gate = gate
+        self.pre_roll = min(pre_roll, window)
+        self._due = None  # sample count at which the next gated window is complete
+        self._burst = 0  # gated windows left to classify
+        self.predictions = 0
+        self.last_prediction = None
+
+    def push(self, sample):
+        """Add one sample; return a gesture label when one fires, else None."""
+        self.buffer.append(sample)
+        if self.gate is not None:
+            return self._gated(sample)
+        self._since_predict += 1
+        if not self.buffer.is_full() or self._since_predict < self.hop:
+            return None
+        self._since_predict = 0
+        return self._classify()
+
+    def push_many(self, samples):
+        """Add a batch of samples; return the list of gestures fired."""
+        fired = []
+        for sample in np.asarray(samples).reshape(-1, self.buffer.channels):
+            gesture = self.push(sample)
+            if gesture is not None:
+                fired.append(gesture)
+        return fired
+
+    def reset(self):
+        self.buffer.reset()
+        self._recent.clear()
+        self._since_predict = 0
+        self._last_fired_at = None
+        self._due = None
+        self._burst = 0
+        if self.gate is not None:
+            self.gate.reset()
+
+    def _gated(self, sample):
+        onset = self.gate.update(sample)
+        if onset is not None:
+            # the window [onset - pre_roll, onset - pre_roll + size) is complete at this count
+            self._due = onset - self.pre_roll + self.buffer.size - 1
+            self._burst = self.votes
+            self._recent.clear()
+        if not self._burst or self.buffer.count < self._due or not self.buffer.is_full():
+            return None
+        self._burst -= 1
+        self._due += self.hop
+        return self._classify()
+
+    def _classify(self):
+        label = self.predict_fn(self.buffer.window())
+        self.predictions += 1
+        self.last_prediction = label
+        self._recent.append(label)
+
+        if label in self.idle_labels:
+            return None
+        if len(self._recent) < self.votes or any(l != label for l in self._recent):
+            return None
+
+        now = self.buffer.count
+        if self._last_fired_at is not None and now - self._last_fired_at < self.refractory:
+            return None
+
+        self._last_fired_at = now
+        self._recent.clear()
+        return label
@@ -0,0 +1,33 @@
+"""
+Startup-time breakdown for the real-time scripts.
+
+Create the timer before the heavy imports and mark() each stage as it
+finishes; printing it gives e.g.
+
+    imports 0.182s | command sent 0.001s | model 0.021s | ... | total 0.240s
+"""
+import time
+
+
+class StartupTimer:
+    """Wall-clock time spent in each named startup stage."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self._last = self.start
+        self.stages = []  # [(stage, seconds)]
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.stages.append((stage, now - self._last))
+        self._last = now
+
+    def total(self):
+        return self._last - self.start
+
+    def as_dict(self):
+        return dict(self.stages, total=self.total())
+
+    def __str__(self):
+        parts = [f"{stage} {seconds:.3f}s" for stage, seconds in self.stages]
+        return " | ".join(parts + [f"total {self.total():.3f}s"])
@@ -0,0 +1,227 @@
+"""
+Counters, gauges and latency histograms for the real-time controller.
+
+    telemetry = Telemetry()
+    telemetry.incr('gestures', gesture='curved_up')
+    telemetry.observe('inference_ms', seconds)
+    MetricsServer(telemetry, port=9100).start()       # curl localhost:9100/metrics
+    JsonLogger(telemetry, 'flight.jsonl', 5.0).start()  # one JSON line every 5 s
+
+Updates on the hot path are a dict lookup and an add under one lock; nothing
+is formatted until the metrics are read. Histograms are the fixed-bucket
+LatencyHistogram from tello_client. Values that already live elsewhere (the
+ModelServer timing, onset count, rc jitter) are pulled at read time through
+add_collector() instead of being copied on every sample.
+
+RateLimitedLog replaces per-event prints on error paths: it prints a message
+at most once per interval per key and reports how many were suppressed.
+"""
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from tello_client import LatencyHistogram
+
+# bucket bounds (ms) per histogram; anything else uses LatencyHistogram.BOUNDS_MS
+HISTOGRAM_BOUNDS_MS = {
+    'inference_ms': [0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100],
+    'sample_queue_ms': [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000],
+    'command_queue_ms': [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000],
+}
+METRIC_PREFIX = 'gesture_'
+
+
+def _label_text(labels):
+    return ",".join(f'{key}="{value}"' for key, value in labels)
+
+
+class Telemetry:
+    """Thread-safe counters, gauges and histograms, optionally labelled."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}  # (name, ((label, value), ...)) -> count
+        self._gauges = {}
+        self._histograms = {}
+        self._collectors = []
+        self.started = time.monotonic()
+
+    @staticmethod
+    def _key(name, labels):
+        return (name, tuple(sorted(labels.items()))) if labels else (name, ())
+
+    def incr(self, name, n=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + n
+
+    def gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges[self._key(name, labels)] = value
+
+    def peak(self, name, value, **labels):
+        """Gauge that only ever goes up (e.g. the deepest a queue has been)."""
+        key = self._key(name, labels)
+        with self._lock:
+            if value > self._gauges.get(key, 0):
+                self._gauges[key] = value
+
+    def observe(self, name, seconds):
+        """Add a duration to the `name` histogram (reported in milliseconds)."""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = LatencyHistogram(HISTOGRAM_BOUNDS_MS.get(name))
+            histogram.record(seconds)
+
+    def add_collector(self, collect):
+        """Register a callable returning {gauge name: number}, evaluated whenever metrics are read."""
+        self._collectors.append(collect)
+
+    def report(self):
+        """Everything as plain data: counters, gauges and histograms, keyed 'name{label="value"}'."""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {name: h.as_dict() for name, h in self._histograms.items()}
+        for collect in self._collectors:
+            gauges.update(((name, ()), value) for name, value in collect().items())
+        text = lambda key: f"{key[0]}{{{_label_text(key[1])}}}" if key[1] else key[0]
+        return {
+            'uptime_s': round(time.monotonic() - self.started, 3),
+            'counters': {text(key): value for key, value in counters.items()},
+            'gauges': {text(key): value for key, value in gauges.items()},
+            'histograms': histograms,
+        }
+
+    def latency_summary(self):
+        """One 'name: n=.. mean=.. p50<=..' line per histogram."""
+        with self._lock:
+            return "\n".join(f"{name}: {h}" for name, h in sorted(self._histograms.items()))
+
+    def prometheus(self):
+        """The metrics in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = dict(self._gauges)
+            histograms = [(name, list(h.bounds), list(h.buckets), h.count, h.total_ms)
+                          for name, h in sorted(self._histograms.items())]
+        for collect in self._collectors:
+            gauges.update(((name, ()), value) for name, value in collect().items())
+
+        lines, typed = [], set()
+        def sample(name, kind, labels, value):
+            metric = METRIC_PREFIX + name
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} {kind}")
+            lines.append(f"{metric}{{{_label_text(labels)}}} {value}" if labels else f"{metric} {value}")
+
+        for (name, labels), value in counters:
+            sample(name + '_total', 'counter', labels, value)
+        for (name, labels), value in sorted(gauges.items()):
+            sample(name, 'gauge', labels, value)
+        for name, bounds, buckets, count, total_ms in histograms:
+            metric = METRIC_PREFIX + name
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, n in zip(bounds + ['+Inf'], buckets):
+                cumulative += n
+                lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f"{metric}_sum {total_ms}")
+            lines.append(f"{metric}_count {count}")
+        lines.append(f"{METRIC_PREFIX}uptime_seconds {time.monotonic() - self.started:.3f}")
+        return "\n".join(lines) + "\n"
+
+
+class RateLimitedLog:
+    """print() at most once per `interval` seconds per key, counting what was suppressed."""
+
+    def __init__(self, interval=5.0, out=None):
+        self.interval = interval
+        self.out = out
+        self._last = {}
+        self._suppressed = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, key, message):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last.get(key, -self.interval) < self.interval:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return
+            self._last[key] = now
+            suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            message += f" ({suppressed} similar messages suppressed)"
+        print(message, file=self.out or sys.stdout)
+
+
+class MetricsServer(threading.Thread):
+    """Serve /metrics (Prometheus text) and /metrics.json on a local port."""
+
+    def __init__(self, telemetry, port=9100, host='127.0.0.1'):
+        super().__init__(name="metrics-http", daemon=True)
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body, kind = telemetry.prometheus().encode(), 'text/plain; version=0.0.4'
+                elif self.path == '/metrics.json':
+                    body, kind = json.dumps(telemetry.report()).encode(), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', kind)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # no line per scrape
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.address = self.httpd.server_address
+
+    def run(self):
+        self.httpd.serve_forever()
+
+    def stop(self):
+        """Stop serving; safe to call whether or not start() was called."""
+        if self.is_alive():
+            self.httpd.shutdown()  # waits for serve_forever(), which never returns if it never ran
+        self.httpd.server_close()
+
+
+class JsonLogger(threading.Thread):
+    """Append telemetry.report() as one JSON line every `interval` seconds ('-' writes to stdout)."""
+
+    def __init__(self, telemetry, path, interval=5.0):
+        super().__init__(name="metrics-log", daemon=True)
+        self.telemetry = telemetry
+        self.path = path
+        self.interval = interval
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.write()
+
+    def write(self):
+        line = json.dumps({'time': time.time(), **self.telemetry.report()})
+        if self.path == '-':
+            print(line, flush=True)
+            return
+        with open(self.path, 'a') as f:
+            f.write(line + "\n")
+
+    def stop(self):
+        """Stop logging and write the final state once; a logger that was never started writes nothing."""
+        running = self.ident is not None and not self.stop_event.is_set()
+        self.stop_event.set()
+        if not running:
+            return
+        self.join(1.0)
+        self.write()  # final state on shutdown
@@ -1,119 +1,57 @@
-import socket
-import time
+import argparse
+import asyncio
+from tello_client import TelloClient, TelloError, TelloTimeout, TELLO_ADDRESS
 
-# create socket
-sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-tello_address = ('192.168.10.1', 8889)
+HOVER_SECONDS = 5
 
 
-def receive_response():
-    try:
-        response, _ = sock.recvfrom(1024)
-        print(response)
-        print(f"Response: {response.decode('utf-8')}")
-    except Exception as e:
-        print(f"Error receiving response: {e}")
+async def fly(address):
+    async with TelloClient(address) as tello:
+        try:
+            # SDK mode
+            await tello.command()
 
+            # takeoff
+            await tello.takeoff()
 
-if __name__ == "__main__":
-    # SDK mode
-    print('command')
-    sock.sendto('command'.encode(), tello_address)
-    time.sleep(1)
-    receive_response()
-
-    # takeoff
-    print('takeoff')
-    sock.sendto('takeoff'.encode(), tello_address)
-    time.sleep(5)
-    receive_response()
-
-    # hover
-    print('hover')
-    sock.sendto('command'.encode(), tello_address)
-    time.sleep(5)
-    receive_response()
-    print('hover')
-    sock.sendto('command'.encode(), tello_address)
-    time.sleep(5)
-    receive_response()
-    print('hover')
-    sock.sendto('command'.encode(), tello_address)
-    time.sleep(5)
-    receive_response()
+            # hover
+            await asyncio.sleep(HOVER_SECONDS)
 
-    # up
-    print('up')
-    sock.sendto('up 40'.encode(), tello_address)
-    time.sleep(3)
-    receive_response()
+            # up / down
+            await tello.move('up', 40)
+            await tello.move('down', 40)
 
-    # down
-    print('down')
-    sock.sendto('down 40'.encode(), tello_address)
-    time.sleep(3)
-    receive_response()
+            # left / right
+            await tello.move('left', 20)
+            await tello.move('right', 20)
 
-    # left
-    print('left')
-    sock.sendto('left 20'.encode(), tello_address)
-    time.sleep(3)
-    receive_response()
+            # # forward / back
+            # await tello.move('forward', 20)
+            # await tello.move('back', 20)
 
-    # right
-    print('right')
-    sock.sendto('right 20'.encode(), tello_address)
-    time.sleep(3)
-    receive_response()
+            # rotate clockwise / counterclockwise
+            await tello.rotate(30)
+            await tello.rotate(-30)
 
-    # # forward
-    # print('forward')
-    # sock.sendto('forward 20'.encode(), tello_address)
-    # time.sleep(3)
-    # receive_response()
-    #
-    # # back
-    # print('back')
-    # sock.sendto('back 20'.encode(), tello_address)
-    # time.sleep(3)
-    # receive_response()
+            # # flips
+            # for direction in 'lrfb':
+            #     await tello.send(f'flip {direction}')
 
-    # rotate clockwise
-    print('rotate clockwise')
-    sock.sendto('cw 30'.encode(), tello_address)
-    time.sleep(3)
-    receive_response()
+        except (TelloTimeout, TelloError) as e:
+            print(f"Error receiving response: {e}")
 
-    # rotate counterclockwise
-    print('rotate counterclockwise')
-    sock.sendto('ccw 30'.encode(), tello_address)
-    time.sleep(3)
-    receive_response()
+        finally:
+            # land
+            try:
+                await tello.land()
+            except (TelloTimeout, TelloError) as e:
+                print(f"Error receiving response: {e}")
+            print(f"ACK latency: {tello.latency}")
 
-    # # flip left
-    # sock.sendto('flip l'.encode(), tello_address)
-    # time.sleep(3)
-    # receive_response()
-    #
-    # # flip right
-    # sock.sendto('flip r'.encode(), tello_address)
-    # time.sleep(3)
-    # receive_response()
-    #
-    # # flip forward
-    # sock.sendto('flip f'.encode(), tello_address)
-    # time.sleep(3)
-    # receive_response()
-    #
-    # # flip backward
-    # sock.sendto('flip b'.encode(), tello_address)
-    # time.sleep(3)
-    # receive_response()
 
-    # land
-    print('land')
-    sock.sendto('land'.encode(), tello_address)
-    time.sleep(3)
-    receive_response()
-
-    sock.close()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fly a fixed test pattern")
+    parser.add_argument('--host', default=TELLO_ADDRESS[0], help="use 127.0.0.1 with tello_stub.py")
+    parser.add_argument('--port', type=int, default=TELLO_ADDRESS[1])
+    args = parser.parse_args()
+    asyncio.run(fly((args.host, args.port)))
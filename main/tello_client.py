@@ -0,0 +1,240 @@
+"""
+asyncio client for the Tello SDK (UDP text commands on port 8889).
+
+    async with TelloClient() as tello:
+        await tello.command()
+        await tello.takeoff()
+        await tello.send('up 40')
+        print(tello.latency)
+
+Commands are awaitable and resolve as soon as the drone ACKs, with a
+per-command timeout and a retry policy. The Tello answers one command at a
+time and its replies carry no id, so commands are serialized; each send gets a
+sequence number and replies that arrive while nothing is in flight are counted
+as stale instead of being matched to the next command. Before every send the
+event loop gets one turn to deliver replies already waiting on the socket
+(e.g. a late ACK of a timed-out command), so those are counted as stale too.
+A socket error (e.g. ICMP port unreachable while the drone is not listening)
+fails the attempt like a timeout: it is retried, then raised as TelloError.
+"""
+import asyncio
+import bisect
+import time
+
+TELLO_ADDRESS = ('192.168.10.1', 8889)
+
+DEFAULT_TIMEOUT = 7.0
+# motion commands are ACKed only once the move has finished
+COMMAND_TIMEOUTS = {
+    'command': 1.0,
+    'takeoff': 20.0,
+    'land': 20.0,
+    'emergency': 1.0,
+}
+# resending these is harmless; resending e.g. 'up 40' could move the drone twice
+RETRY_SAFE = {'command', 'land', 'emergency', 'streamon', 'streamoff'}
+DEFAULT_RETRIES = 2
+
+
+def command_timeout(command):
+    """Seconds to wait for the drone's reply to `command`."""
+    return COMMAND_TIMEOUTS.get(command.split()[0], DEFAULT_TIMEOUT)
+
+
+class TelloTimeout(Exception):
+    """Raised when a command gets no reply after all retries."""
+
+
+class TelloError(Exception):
+    """Raised when the drone replies with 'error ...', or the socket fails on every attempt."""
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram of ACK latencies in milliseconds."""
+
+    BOUNDS_MS = [5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000]
+
+    def __init__(self, bounds_ms=None):
+        self.bounds = list(bounds_ms or self.BOUNDS_MS)
+        self.buckets = [0] * (len(self.bounds) + 1)  # last bucket is overflow
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, seconds):
+        ms = seconds * 1000.0
+        self.buckets[bisect.bisect_left(self.bounds, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def mean(self):
+        return self.total_ms / self.count if self.count else 0.0
+
+    def percentile(self, p):
+        """Upper bound (ms) of the bucket holding the p-th percentile."""
+        if not self.count:
+            return 0.0
+        rank = p / 100.0 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n:
+                return self.bounds[i] if i < len(self.bounds) else self.max_ms
+        return self.max_ms
+
+    def as_dict(self):
+        labels = [f"<={b}" for b in self.bounds] + [f">{self.bounds[-1]}"]
+        return {
+            'count': self.count,
+            'mean_ms': round(self.mean(), 2),
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'max_ms': round(self.max_ms, 2),
+            'buckets': dict(zip(labels, self.buckets)),
+        }
+
+    def __str__(self):
+        return (f"n={self.count} mean={self.mean():.1f}ms p50<={self.percentile(50)}ms "
+                f"p95<={self.percentile(95)}ms max={self.max_ms:.1f}ms")
+
+
+class _TelloProtocol(asyncio.DatagramProtocol):
+
+    def __init__(self, client):
+        self.client = client
+
+    def datagram_received(self, data, addr):
+        self.client._on_reply(data.decode('utf-8', errors='replace').strip())
+
+    def error_received(self, exc):
+        self.client._on_error(exc)
+
+
+class TelloClient:
+    """Awaitable Tello command client with timeouts, retries and ACK latency tracking."""
+
+    def __init__(self, address=TELLO_ADDRESS, local_addr=('0.0.0.0', 0),
+                 timeout=None, retries=None, verbose=True):
+        self.address = address
+        self.local_addr = local_addr
+        self.timeout = timeout
+        self.retries = retries
+        self.verbose = verbose
+        self.latency = LatencyHistogram()
+        self.seq = 0
+        self.in_flight = None  # (seq, command, attempt, sent_at, future)
+        self.stats = {'sent': 0, 'acked': 0, 'errors': 0, 'timeouts': 0, 'retries': 0, 'stale': 0,
+                      'socket_errors': 0}
+        self._transport = None
+        self._lock = None
+
+    async def connect(self):
+        loop = asyncio.get_running_loop()
+        self._lock = asyncio.Lock()
+        self._transport, _ = await loop.create_datagram_endpoint(
+            lambda: _TelloProtocol(self), local_addr=self.local_addr)
+        return self
+
+    def close(self):
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+    async def __aenter__(self):
+        return await self.connect()
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+    def timeout_for(self, command):
+        if self.timeout is not None:
+            return self.timeout
+        return command_timeout(command)
+
+    def retries_for(self, command):
+        if self.retries is not None:
+            return self.retries
+        if command in RETRY_SAFE or command.endswith('?'):
+            return DEFAULT_RETRIES
+        return 0
+
+    async def send(self, command, timeout=None, retries=None):
+        """Send a command and return the drone's reply once it arrives."""
+        if self._transport is None:
+            raise RuntimeError("TelloClient is not connected")
+        timeout = self.timeout_for(command) if timeout is None else timeout
+        retries = self.retries_for(command) if retries is None else retries
+
+        async with self._lock:
+            self.seq += 1
+            seq = self.seq
+            loop = asyncio.get_running_loop()
+            failure = None
+            for attempt in range(retries + 1):
+                await asyncio.sleep(0)  # deliver replies already received, while nothing is in flight
+                future = loop.create_future()
+                sent_at = time.monotonic()
+                self.in_flight = (seq, command, attempt, sent_at, future)
+                if attempt:
+                    self.stats['retries'] += 1
+                if self.verbose:
+                    print(f"[{seq}] {command}" + (f" (retry {attempt})" if attempt else ""))
+                try:
+                    self._transport.sendto(command.encode(), self.address)
+                    self.stats['sent'] += 1
+                    reply = await asyncio.wait_for(future, timeout)
+                except asyncio.TimeoutError:
+                    self.stats['timeouts'] += 1
+                    failure = None
+                    continue
+                except OSError as e:
+                    self.stats['socket_errors'] += 1
+                    failure = e
+                    if self.verbose:
+                        print(f"[{seq}] Socket error: {e}")
+                    continue
+                finally:
+                    self.in_flight = None
+
+                self.latency.record(time.monotonic() - sent_at)
+                self.stats['acked'] += 1
+                if self.verbose:
+                    print(f"[{seq}] Response: {reply}")
+                if reply.startswith('error'):
+                    self.stats['errors'] += 1
+                    raise TelloError(f"'{command}' failed: {reply}")
+                return reply
+
+        if failure is not None:
+            raise TelloError(f"'{command}' failed after {retries + 1} attempt(s): {failure}") from failure
+        raise TelloTimeout(f"No response to '{command}' after {retries + 1} attempt(s) of {timeout}s")
+
+    def _on_reply(self, reply):
+        if self.in_flight is None or self.in_flight[4].done():
+            self.stats['stale'] += 1
+            return
+        self.in_flight[4].set_result(reply)
+
+    def _on_error(self, exc):
+        if self.in_flight is not None and not self.in_flight[4].done():
+            self.in_flight[4].set_exception(exc)
+
+    # SDK shortcuts
+    async def command(self):
+        return await self.send('command')
+
+    async def takeoff(self):
+        return await self.send('takeoff')
+
+    async def land(self):
+        return await self.send('land')
+
+    async def move(self, direction, cm):
+        return await self.send(f"{direction} {cm}")
+
+    async def rotate(self, degrees):
+        return await self.send(f"cw {degrees}" if degrees >= 0 else f"ccw {-degrees}")
+
+    async def battery(self):
+        return int(await self.send('battery?'))
@@ -1,9 +1,13 @@
-import socket
-from collections import deque
-import numpy as np
-import serial
-import joblib
 import time
+from startup import StartupTimer
+
+startup = StartupTimer()  # started before the imports below (the heavy ones are deferred to __main__)
+
+import argparse
+import socket
+from rc_control import RcStreamer, RC_RATE_HZ, format_rc
+# serial, numpy (model, pipeline) and telemetry (asyncio, http.server) are imported in
+# __main__ only after 'command' is sent, so the drone answers while they load
 
 # create socket
 sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -12,184 +16,183 @@ tello_address = ('192.168.10.1', 8889)
 # define classification details 
 SERIAL_PORT = '/dev/tty.usbserial-110'
 BAUD_RATE = 115200
-TRUNCATE_LENGTH = 240
-GESTURES = [
-    "curved_up", "curved_down", "curved_left", "curved_right",
-    "straight_up", "straight_down", "straight_left", "straight_right", "none_none"
-]
-
-svm_model = joblib.load('../model/model.pkl') 
-# scaler = joblib.load('../model/scaler.pkl')
-data_buffer = deque(maxlen=TRUNCATE_LENGTH)
-
-def preprocess_data(buffer):
-    data = np.array(buffer)
-    flattened_data = data.flatten()
-
-    expected_length = 1026
-    if len(flattened_data) < expected_length:
-        flattened_data = np.pad(flattened_data, (0, expected_length - len(flattened_data)))
-    elif len(flattened_data) > expected_length:
-        flattened_data = flattened_data[:expected_length]
-
-    # return scaler.transform(flattened_data.reshape(1, -1))
-    return flattened_data.reshape(1, -1)
-
-
-def parse_line(line, line_data):
+MODEL_BUNDLE = '../model/bundle.npz'  # compiled trees written by svm.py (tree_export.py)
+HOP_LENGTH = 5  # classify every HOP_LENGTH new samples (features are updated per sample)
+VOTES = 3  # consecutive agreeing windows before a gesture triggers a command
+STATS_INTERVAL = 5  # seconds between pipeline counter reports (and --metrics-log lines)
+
+startup.mark('imports')
+
+# gesture -> (description, Tello SDK command) once the drone is airborne
+GESTURE_COMMANDS = {
+    "curved_down": ('land', 'land'),
+    "curved_left": ('rotate counterclockwise', 'ccw 90'),
+    "curved_right": ('rotate clockwise', 'cw 90'),
+    "straight_up": ('up', 'up 40'),
+    "straight_down": ('down', 'down 20'),
+    "straight_left": ('left', 'left 40'),
+    "straight_right": ('right', 'right 40'),
+}
+taken_off = False
+rc_streamer = None  # set in rc mode: motion gestures update the streamed setpoint instead
+
+def gesture_to_command(gesture):
+    """Map a fired gesture to a drone command (None = send nothing)."""
+    global taken_off
+    print(f"Predicted Gesture: {gesture}")
+    if not taken_off:
+        if gesture == "curved_up":
+            taken_off = True
+            print('takeoff')
+            return 'takeoff'
+        print("please takeoff")
+        return None
+
+    if rc_streamer is not None:
+        if rc_streamer.set_gesture(gesture):
+            print(format_rc(rc_streamer.current_setpoint(time.monotonic())))
+            return None
+        if gesture == "curved_down":
+            rc_streamer.hover()
+
+    description, command = GESTURE_COMMANDS.get(gesture, ('hover', 'command'))
+    print(description)
+    return command
+
+def receive_response(command):
+    """Wait for the reply to `command`; takeoff, land and moves are answered only once finished."""
+    timeout = command_timeout(command)
     try:
-        if "time" in line:
-            time_value = float(line.split("time:")[1].strip())
-            line_data['timestamp'] = time_value
-        elif "acce_x" in line:
-            acce_values = [float(val.split(":")[1].strip()) for val in line.split("mpu6050 test: ")[1].split(",")]
-            line_data.update({'acce_x': acce_values[0], 'acce_y': acce_values[1], 'acce_z': acce_values[2]})
-        elif "gyro_x" in line:
-            gyro_values = [float(val.split(":")[1].strip()) for val in line.split("mpu6050 test: ")[1].split(",")]
-            line_data.update({'gyro_x': gyro_values[0], 'gyro_y': gyro_values[1], 'gyro_z': gyro_values[2]})
-    except Exception as e:
-        line_data = {} 
-        print(f"Skipping malformed data: {line}, error: {e}")
-
-    required_keys = ['timestamp', 'acce_x', 'acce_y', 'acce_z', 'gyro_x', 'gyro_y', 'gyro_z']
-    return all(key in line_data for key in required_keys)
-
-def predict_gesture(model, data):
-    prediction = model.predict(data)
-    return GESTURES[prediction[0]]
-
-def receive_response():
+        response = receive(sock, timeout)
+    except OSError as e:
+        log('receive', f"Error receiving response: {e}")
+        return
+    if response is None:
+        log('receive', f"No response to '{command}' within {timeout}s")
+        return
+    print(f"Response: {response.decode('utf-8', errors='replace')}")
+
+def land():
+    """Send 'land' on every way out; a socket error here must not skip the rest of the shutdown."""
+    print('land')
     try:
-        response, _ = sock.recvfrom(1024)
-        print(response)
-        print(f"Response: {response.decode('utf-8')}")
-    except Exception as e:
-        print(f"Error receiving response: {e}")
+        drain(sock)  # a late ACK of an earlier command is not the answer to 'land'
+        sock.sendto('land'.encode(), tello_address)
+    except OSError as e:
+        print(f"Error sending land: {e}")
+        return
+    receive_response('land')
+
+def model_gauges(server, gate, rc_streamer):
+    """Pull-based gauges read whenever metrics are exported (nothing on the hot path)."""
+    def collect():
+        stats = server.stats()
+        gauges = {'model_mean_ms': stats['mean_ms'], 'model_max_ms': stats['max_ms']}
+        if gate:
+            gauges['onsets'] = gate.onsets
+        if rc_streamer:
+            gauges['rc_late_intervals'] = rc_streamer.jitter.late
+        return gauges
+    return collect
+
+log = None  # RateLimitedLog, created with the deferred imports
 
 if __name__ == "__main__":
-    # SDK mode
+    parser = argparse.ArgumentParser(description="Gesture-controlled Tello flight")
+    parser.add_argument('--rc', action='store_true',
+                        help="stream continuous rc setpoints instead of discrete move commands")
+    parser.add_argument('--format', choices=['text', 'binary'], default='text',
+                        help="serial format sent by the firmware (IMU_BINARY_FRAMES)")
+    parser.add_argument('--rc-rate', type=float, default=RC_RATE_HZ, help="rc setpoints per second")
+    parser.add_argument('--no-gate', action='store_true',
+                        help="classify every hop instead of only after a detected motion onset")
+    parser.add_argument('--serial', default=SERIAL_PORT, help="IMU serial device (imu_replay.py prints a pty)")
+    parser.add_argument('--drone', default=f"{tello_address[0]}:{tello_address[1]}",
+                        help="Tello HOST:PORT (tello_stub.py for bench runs)")
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help="serve Prometheus text on http://127.0.0.1:PORT/metrics (and /metrics.json)")
+    parser.add_argument('--metrics-log', default=None,
+                        help="append a JSON metrics line to this file every STATS_INTERVAL s ('-' for stdout)")
+    args = parser.parse_args()
+    host, port = args.drone.rsplit(':', 1)
+    tello_address = (host, int(port))
+
+    # SDK mode; the model loads while the drone answers
     print('command')
     sock.sendto('command'.encode(), tello_address)
-    receive_response()
-    # time.sleep(3)
-
-    taken_off = False
-
+    startup.mark('command sent')
+
+    import serial
+    from serving import ModelServer, streaming_classifier
+    from sliding_window import OnsetDetector
+    from pipeline import Pipeline, drain, receive
+    from imu_parser import make_parser
+    from telemetry import JsonLogger, MetricsServer, RateLimitedLog
+    from tello_client import command_timeout
+    log = RateLimitedLog()
+    startup.mark('deferred imports')
+
+    # validated model + preprocessing contract; fails here rather than mid-flight on a mismatch
+    server = ModelServer.load(MODEL_BUNDLE)
+    # overlapping sliding window, features maintained incrementally as samples arrive;
+    # the onset detector keeps the model idle (and silent) until the hand moves
+    gate = None if args.no_gate else OnsetDetector()
+    classifier = streaming_classifier(server, hop=HOP_LENGTH, votes=VOTES, gate=gate)
+    startup.mark('model')
+    receive_response('command')
+    startup.mark('command ack')
+
+    ser = None
+    pipeline = None
+    exporters = []
     try:
+        ser = serial.Serial(args.serial, BAUD_RATE, timeout=0.1)
+        startup.mark('serial')
+        pipeline = Pipeline(ser, make_parser(args.format), classifier, gesture_to_command, sock, tello_address,
+                            resampler=server.resampler(), log=log)
+        if args.rc:
+            rc_streamer = RcStreamer(sock, tello_address, rate_hz=args.rc_rate)
+            rc_streamer.start()
+        pipeline.stats.add_collector(model_gauges(server, gate, rc_streamer))
+        if args.metrics_port is not None:
+            exporters.append(MetricsServer(pipeline.stats, port=args.metrics_port))
+            print(f"Metrics on http://{exporters[-1].address[0]}:{exporters[-1].address[1]}/metrics")
+        if args.metrics_log:
+            exporters.append(JsonLogger(pipeline.stats, args.metrics_log, STATS_INTERVAL))
+        for exporter in exporters:
+            exporter.start()
+        pipeline.start()
+        startup.mark('pipeline')
+        print(f"Startup: {startup}")
         print('start gesture')
-        ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=1)
-        line_data = {}
-
-        while not taken_off:
-            if ser.in_waiting > 0:
-                line = ser.readline().decode('utf-8').strip()
-
-                if parse_line(line, line_data):
-                    data_point = [
-                        line_data['acce_x'], line_data['acce_y'], line_data['acce_z'],
-                        line_data['gyro_x'], line_data['gyro_y'], line_data['gyro_z']
-                    ]
-                    data_buffer.append(data_point)
-                    line_data.clear()
-
-                    if len(data_buffer) == TRUNCATE_LENGTH:
-                        preprocessed_data = preprocess_data(data_buffer)
-                        gesture = predict_gesture(svm_model, preprocessed_data)
-                        print(f"Predicted Gesture: {gesture}")
-
-                        if gesture == "curved_up":
-                            taken_off = True
-                            print('takeoff')
-                            sock.sendto('takeoff'.encode(), tello_address)
-                            receive_response()
-                            # time.sleep(3)
-
-                        else:
-                            # sock.sendto('rc 0 0 0 0'.encode(), tello_address)
-                            # receive_response()
-                            print("please takeoff")
-                            # time.sleep(3)
-
-                        time.sleep(1)
-                        print('start gesture')
-                        data_buffer = []
-
-
-        while taken_off:
-            if ser.in_waiting > 0:
-                line = ser.readline().decode('utf-8').strip()
-
-                if parse_line(line, line_data):
-                    data_point = [
-                        line_data['acce_x'], line_data['acce_y'], line_data['acce_z'],
-                        line_data['gyro_x'], line_data['gyro_y'], line_data['gyro_z']
-                    ]
-                    data_buffer.append(data_point)
-                    line_data.clear()
-
-                    if len(data_buffer) == TRUNCATE_LENGTH:
-                        preprocessed_data = preprocess_data(data_buffer)
-                        gesture = predict_gesture(svm_model, preprocessed_data)
-                        print(f"Predicted Gesture: {gesture}")
-
-                        # if gesture == "curved_up":
-                        #     print('takeoff')
-                        #     sock.sendto('takeoff'.encode(), tello_address)
-                        #     receive_response()
-                        if gesture == "curved_down":
-                            print('land')
-                            sock.sendto('land'.encode(), tello_address)
-                            receive_response()
-                            # time.sleep(3)
-                        elif gesture == "curved_left":
-                            print('rotate counterclockwise')
-                            sock.sendto('ccw 90'.encode(), tello_address)
-                            receive_response()
-                            # time.sleep(3)
-                        elif gesture == "curved_right":
-                            print('rotate clockwise')
-                            sock.sendto('cw 90'.encode(), tello_address)
-                            receive_response()
-                            # time.sleep(3)
-                        elif gesture == "straight_up":
-                            print('up')
-                            sock.sendto('up 40'.encode(), tello_address)
-                            receive_response()
-                            # time.sleep(3)
-                        elif gesture == "straight_down":
-                            print('down')
-                            sock.sendto('down 20'.encode(), tello_address)
-                            receive_response()
-                            # time.sleep(3)
-                        elif gesture == "straight_left":
-                            print('left')
-                            sock.sendto('left 40'.encode(), tello_address)
-                            receive_response()
-                            # time.sleep(3)
-                        elif gesture == "straight_right":
-                            print('right')
-                            sock.sendto('right 40'.encode(), tello_address)
-                            receive_response()
-                            # time.sleep(3)
-                        else:
-                            print('hover')
-                            sock.sendto('command'.encode(), tello_address)
-                            receive_response()
-                            # time.sleep(3)
-
-                        time.sleep(1)
-                        print('start gesture')
-                        data_buffer = []
+
+        while not pipeline.stop_event.wait(STATS_INTERVAL):
+            print(f"Pipeline: {pipeline.stats}")
+
+        # a stage failed (serial, model or socket error): land, then re-raise it
+        if pipeline.error() is not None:
+            raise pipeline.error()
 
     except KeyboardInterrupt:
         print("Exiting...")
-        sock.sendto('land'.encode(), tello_address)
-        receive_response()
     except serial.SerialException as e:
         print(f"Serial error: {e}")
-        sock.sendto('land'.encode(), tello_address)
-        receive_response()
     finally:
+        if rc_streamer:
+            rc_streamer.stop()
+        if pipeline:
+            pipeline.stop()
+        land()
+        for exporter in exporters:
+            exporter.stop()
+        if pipeline:
+            print(f"Pipeline: {pipeline.stats}")
+            print(pipeline.stats.latency_summary())
+        print(f"Model: {server.stats()}")
+        if gate:
+            print(f"Onsets detected: {gate.onsets}")
+        if rc_streamer:
+            print(f"rc jitter: {rc_streamer.jitter}")
         if ser:
             ser.close()
             print("Serial connection closed.")
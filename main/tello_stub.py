@@ -0,0 +1,128 @@
+"""
+Local stand-in for a Tello drone: a UDP server that ACKs SDK commands.
+
+    python tello_stub.py --port 8889 --delay 0.05 --loss 0.1
+
+Point TelloClient (or tello_realtime.py) at ('127.0.0.1', port) to exercise
+the control code without hardware. Every received command is recorded with
+its arrival time so tests can inspect what was sent; `rc` setpoints are not
+ACKed (like the real drone) and their arrival jitter can be inspected with
+rc_jitter().
+"""
+import argparse
+import asyncio
+import random
+import threading
+import time
+from rc_control import JitterStats, RC_RATE_HZ
+
+QUERY_REPLIES = {
+    'battery?': '87',
+    'speed?': '100.0',
+    'time?': '0s',
+    'height?': '0dm',
+    'wifi?': '90',
+}
+
+
+class TelloStubProtocol(asyncio.DatagramProtocol):
+    """Reply 'ok' (or a canned value for '?' queries) after `delay` seconds, dropping `loss` of replies."""
+
+    def __init__(self, delay=0.0, loss=0.0, seed=None, verbose=False):
+        self.delay = delay
+        self.loss = loss
+        self.verbose = verbose
+        self.rng = random.Random(seed)
+        self.received = []  # (monotonic time, command)
+        self.dropped = 0
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        command = data.decode('utf-8', errors='replace').strip()
+        self.received.append((time.monotonic(), command))
+        if self.verbose:
+            print(f"{addr}: {command}")
+        if self.rng.random() < self.loss:
+            self.dropped += 1
+            return
+        reply = self.reply_for(command)
+        if reply is None:
+            return
+        if self.delay > 0:
+            asyncio.get_running_loop().call_later(self.delay, self._reply, reply, addr)
+        else:
+            self._reply(reply, addr)
+
+    def reply_for(self, command):
+        if command.startswith('rc '):
+            return None  # the real drone does not ACK rc setpoints
+        if command.endswith('?'):
+            return QUERY_REPLIES.get(command, 'ok')
+        return 'ok'
+
+    def _reply(self, reply, addr):
+        if self.transport is not None:
+            self.transport.sendto(reply.encode(), addr)
+
+    def commands(self):
+        return [command for _, command in self.received]
+
+    def rc_setpoints(self):
+        """Return [(arrival time, (a, b, c, d)), ...] for every rc command received."""
+        return [(t, tuple(int(v) for v in command.split()[1:5]))
+                for t, command in self.received if command.startswith('rc ')]
+
+    def rc_jitter(self, rate_hz=RC_RATE_HZ):
+        jitter = JitterStats(1.0 / rate_hz)
+        for t, _ in self.rc_setpoints():
+            jitter.tick(t)
+        return jitter
+
+
+async def start_stub(host='127.0.0.1', port=0, **kwargs):
+    """Start a stub drone on the running loop; return (transport, protocol)."""
+    loop = asyncio.get_running_loop()
+    return await loop.create_datagram_endpoint(
+        lambda: TelloStubProtocol(**kwargs), local_addr=(host, port))
+
+
+class BackgroundStub:
+    """A stub drone on its own event loop thread, for harnesses that are not asyncio programs."""
+
+    def __init__(self, host='127.0.0.1', port=0, **kwargs):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="tello-stub", daemon=True)
+        self.thread.start()
+        future = asyncio.run_coroutine_threadsafe(start_stub(host, port, **kwargs), self.loop)
+        self.transport, self.protocol = future.result()
+        self.address = self.transport.get_extra_info('sockname')
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.transport.close)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(1.0)
+
+
+async def serve(host, port, delay, loss):
+    transport, _ = await start_stub(host, port, delay=delay, loss=loss, verbose=True)
+    print(f"Tello stub listening on {transport.get_extra_info('sockname')}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        transport.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Fake Tello drone for testing without hardware")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8889)
+    parser.add_argument('--delay', type=float, default=0.0, help="seconds before each ACK")
+    parser.add_argument('--loss', type=float, default=0.0, help="fraction of ACKs to drop")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.delay, args.loss))
+    except KeyboardInterrupt:
+        print("Exiting...")
@@ -0,0 +1,247 @@
+"""
+Cross-validated hyperparameter search for the gesture classifiers.
+
+    python train.py --models rf svm lgbm --folds 3 --jobs 4 --save ../model/bundle.pkl
+
+Windows are cut from the dataset store and turned into a feature matrix once;
+the matrix is cached next to the store (WindowedDataset.cached_matrix) and
+memory-mapped by every worker. Folds are stratified by class and grouped by
+subject (lbw, ll, zixin from manifest.json), so every score is measured on a
+person the model never saw. Each (model, params, fold) fit runs as one task in
+a process pool. With --augment N, the worker adds N augmented passes over the
+fold's training windows (augment.py); test windows are never augmented.
+
+The leaderboard reports mean accuracy / macro-F1 over the folds together with
+the per-window prediction latency, both for the native model and, for tree
+models, the compiled arrays from tree_export.py. --save refits the best row
+(or the best of --save-model) on all data and writes a serving bundle.
+"""
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from augment import Augmenter, augmented_matrix
+from dataset import DATA_ROOT, WindowedDataset, flatten_windows, load_dataset, subject_groups
+from features import extract_features
+from resample import SAMPLE_RATE_HZ
+
+CLASS_LIST = [
+    "curved_up", "curved_down", "curved_left", "curved_right",
+    "straight_up", "straight_down", "straight_left", "straight_right", "none_none"
+]
+PARAM_GRID = {
+    'rf': {'n_estimators': [50, 100, 200], 'max_depth': [None, 12], 'min_samples_leaf': [1, 2]},
+    'svm': {'C': [1, 10, 100], 'gamma': ['scale', 0.01]},
+    'lgbm': {'num_leaves': [7, 15, 31], 'learning_rate': [0.05, 0.1], 'num_boost_round': [100, 200]},
+}
+TREE_MODELS = ['rf', 'lgbm']
+TRANSFORMS = {'handcrafted': extract_features, 'raw': flatten_windows}
+LATENCY_WINDOWS = 100  # single-window predictions timed per fold
+
+
+def param_grid(name):
+    grid = PARAM_GRID[name]
+    return [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+
+
+def format_params(params):
+    return ", ".join(f"{key}={value}" for key, value in params.items())
+
+
+def fit_model(name, params, X, y, n_classes):
+    """Fit one configuration on (X, y); returns (model, scaler or None)."""
+    scaler = None
+    if name in ('svm', 'lgbm'):  # SVC needs standardized inputs; lgbm.py standardizes as well
+        from sklearn.preprocessing import StandardScaler
+        scaler = StandardScaler().fit(X)
+        X = scaler.transform(X)
+
+    if name == 'rf':
+        from sklearn.ensemble import RandomForestClassifier
+        model = RandomForestClassifier(random_state=42, n_jobs=1, **params).fit(X, y)
+    elif name == 'svm':
+        from sklearn.svm import SVC
+        model = SVC(**params).fit(X, y)
+    elif name == 'lgbm':
+        import lightgbm as lgb
+        params = dict(params)
+        rounds = params.pop('num_boost_round')
+        lgb_params = {'objective': 'multiclass', 'num_class': n_classes, 'metric': 'multi_logloss',
+                      'seed': 42, 'num_threads': 1, 'verbosity': -1, **params}
+        model = lgb.train(lgb_params, lgb.Dataset(X, label=y), num_boost_round=rounds)
+    else:
+        raise ValueError(f"Unknown model '{name}', expected one of {list(PARAM_GRID)}")
+    return model, scaler
+
+
+def predict(model, scaler, X):
+    if scaler is not None:
+        X = scaler.transform(X)
+    if hasattr(model, 'classes_'):
+        return model.predict(X)
+    return np.argmax(model.predict(X), axis=1)  # lightgbm.Booster returns probabilities
+
+
+def window_latency_ms(predict_fn, X):
+    """Mean milliseconds to predict one window at a time, as the real-time loop does."""
+    rows = X[:LATENCY_WINDOWS]
+    predict_fn(rows[:1])  # warm-up
+    start = time.perf_counter()
+    for i in range(len(rows)):
+        predict_fn(rows[i:i + 1])
+    return (time.perf_counter() - start) / len(rows) * 1000
+
+
+_X = None
+_y = None
+_windows = None
+
+
+def _init_worker(matrix_path, y, window_spec):
+    global _X, _y, _windows
+    _X = np.load(matrix_path, mmap_mode='r')
+    _y = y
+    data_root, rate, window, stride, labels = window_spec
+    _windows = WindowedDataset(load_samples(data_root, rate), window, stride=stride, labels=labels)
+
+
+def load_samples(data_root, rate):
+    dataset = load_dataset(data_root)
+    return dataset.resampled(rate) if rate else dataset
+
+
+def training_matrix(train_idx, features, copies, seed):
+    """Cached features of the training windows, plus `copies` augmented passes over them."""
+    if not copies:
+        return np.asarray(_X[train_idx]), _y[train_idx]
+    return augmented_matrix(_windows, train_idx, Augmenter(seed=seed), copies, transform=TRANSFORMS[features])
+
+
+def run_fold(task):
+    """Fit and score one (model, params, fold) task in a worker process."""
+    from sklearn.metrics import accuracy_score, f1_score
+    name, params, fold, train_idx, test_idx, n_classes, features, copies = task
+    X_train, y_train = training_matrix(train_idx, features, copies, seed=fold)
+    X_test, y_test = np.asarray(_X[test_idx]), _y[test_idx]
+
+    start = time.perf_counter()
+    model, scaler = fit_model(name, params, X_train, y_train, n_classes)
+    fit_s = time.perf_counter() - start
+    y_pred = predict(model, scaler, X_test)
+
+    compiled_ms = np.nan
+    if name in TREE_MODELS:
+        from tree_export import CompiledTrees, export_model
+        compiled = CompiledTrees(*export_model(model))
+        X_scaled = scaler.transform(X_test) if scaler is not None else X_test
+        compiled_ms = window_latency_ms(compiled.predict_proba, X_scaled)
+
+    return {
+        'model': name,
+        'params': format_params(params),
+        'fold': fold,
+        'accuracy': accuracy_score(y_test, y_pred),
+        'f1_macro': f1_score(y_test, y_pred, average='macro', labels=np.unique(y_test), zero_division=0),
+        'fit_s': fit_s,
+        'latency_ms': window_latency_ms(lambda rows: predict(model, scaler, rows), X_test),
+        'compiled_ms': compiled_ms,
+    }
+
+
+def make_folds(y, groups, n_folds, seed=42):
+    from sklearn.model_selection import StratifiedGroupKFold
+    splitter = StratifiedGroupKFold(n_splits=n_folds, shuffle=True, random_state=seed)
+    return list(splitter.split(np.zeros(len(y)), y, groups))
+
+
+def leaderboard(results):
+    """One row per configuration, best mean accuracy first (ties: faster first)."""
+    df = pd.DataFrame(results)
+    board = df.groupby(['model', 'params'], sort=False).agg(
+        accuracy=('accuracy', 'mean'), accuracy_std=('accuracy', 'std'), f1_macro=('f1_macro', 'mean'),
+        fit_s=('fit_s', 'mean'), latency_ms=('latency_ms', 'mean'), compiled_ms=('compiled_ms', 'mean'),
+    ).reset_index()
+    return board.sort_values(['accuracy', 'latency_ms'], ascending=[False, True], ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Grouped cross-validation and hyperparameter search")
+    parser.add_argument('--data-root', default=DATA_ROOT)
+    parser.add_argument('--models', nargs='+', choices=list(PARAM_GRID), default=list(PARAM_GRID))
+    parser.add_argument('--folds', type=int, default=3, help="grouped folds (at most the number of subjects)")
+    parser.add_argument('--rate', type=float, default=SAMPLE_RATE_HZ,
+                        help="resample recordings to this many Hz (0 keeps raw rows)")
+    parser.add_argument('--window', type=int, default=None, help="rows per window (default: shortest recording)")
+    parser.add_argument('--stride', type=int, default=None, help="rows between windows (default: one per recording)")
+    parser.add_argument('--features', choices=list(TRANSFORMS), default='handcrafted')
+    parser.add_argument('--augment', type=int, default=0, metavar='COPIES',
+                        help="augmented passes over each training fold (augment.py)")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument('--output', help="write the leaderboard to this CSV file")
+    parser.add_argument('--save', help="refit the best configuration on all data and save a bundle here")
+    parser.add_argument('--save-model', choices=list(PARAM_GRID), help="restrict --save to one model type")
+    args = parser.parse_args()
+
+    dataset = load_samples(args.data_root, args.rate)
+    label_ids = dataset.label_ids(CLASS_LIST)
+    valid = label_ids >= 0
+    if not valid.any():
+        raise ValueError("No valid files found.")
+    window = args.window or int(dataset.lengths[valid].min())
+    windows = WindowedDataset(dataset, window=window, stride=args.stride, labels=label_ids)
+    X, y = windows.cached_matrix(TRANSFORMS[args.features], name=args.features)
+    groups = subject_groups(dataset, args.data_root)[windows.recording_ids]
+
+    folds = make_folds(y, groups, args.folds)
+    for fold, (_, test_idx) in enumerate(folds):
+        subjects = sorted({str(g) for g in groups[test_idx] if os.sep not in g and '/' not in g})
+        print(f"fold {fold}: {len(test_idx)} test windows, subjects {subjects}")
+
+    feature_ms = window_latency_ms(TRANSFORMS[args.features], windows.windows(np.arange(min(len(windows), 100))))
+    print(f"{len(y)} windows of {window} rows, {X.shape[1]} {args.features} features "
+          f"({feature_ms:.3f} ms per window, shared by every model)")
+
+    tasks = [(name, params, fold, train_idx, test_idx, len(CLASS_LIST), args.features, args.augment)
+             for name in args.models for params in param_grid(name)
+             for fold, (train_idx, test_idx) in enumerate(folds)]
+    print(f"Running {len(tasks)} fits on {args.jobs} workers...")
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.jobs, initializer=_init_worker,
+                             initargs=(X.filename, np.asarray(y),
+                                       (args.data_root, args.rate, window, args.stride, label_ids))) as pool:
+        results = list(pool.map(run_fold, tasks))
+    print(f"Search finished in {time.perf_counter() - start:.1f}s")
+
+    board = leaderboard(results)
+    with pd.option_context('display.width', 200, 'display.max_colwidth', 60):
+        print(board.to_string(float_format=lambda v: f"{v:.3f}"))
+    if args.output:
+        board.to_csv(args.output, index=False)
+        print(f"Leaderboard saved to {args.output}")
+
+    if args.save:
+        candidates = board[board['model'] == args.save_model] if args.save_model else board
+        best = candidates.iloc[0]
+        params = next(p for p in param_grid(best['model']) if format_params(p) == best['params'])
+        print(f"Refitting {best['model']} ({best['params']}) on all {len(y)} windows")
+        X_all, y_all = np.asarray(X), y
+        if args.augment:
+            X_all, y_all = augmented_matrix(windows, np.arange(len(windows)), Augmenter(seed=42), args.augment,
+                                            transform=TRANSFORMS[args.features])
+        model, scaler = fit_model(best['model'], params, X_all, y_all, len(CLASS_LIST))
+
+        from serving import save_bundle
+        bundle = save_bundle(args.save, model, CLASS_LIST, window_rows=window, features=args.features,
+                             scaler=scaler, sample_rate=args.rate or None, params=params, cv_accuracy=float(best['accuracy']),
+                             cv_folds=args.folds, augment_copies=args.augment)
+        if best['model'] in TREE_MODELS:
+            from tree_export import export_bundle
+            export_bundle(bundle, os.path.splitext(args.save)[0] + '.npz')
+
+
+if __name__ == '__main__':
+    main()
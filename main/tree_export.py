@@ -0,0 +1,376 @@
+"""
+Export trained tree ensembles to flat arrays and evaluate them with NumPy.
+
+    python tree_export.py ../model/bundle.pkl ../model/bundle.npz --benchmark
+
+Both the sklearn RandomForest (svm.py) and the LightGBM booster (lgbm.py)
+become the same structure: one set of node arrays for all trees
+
+    feature, threshold, left, right, default_left, missing, value
+
+with leaves pointing at themselves, so evaluation is a fixed number of
+vectorized steps over a (batch, n_trees) array of node indices.
+
+Ensembles of small trees (at most 64 leaves each, e.g. LightGBM) also get a
+bitvector layout, QuickScorer-style: every split is tested in one vectorized
+comparison, a split that goes right clears the bits of the leaves in its left
+subtree, and the exit leaf of each tree is the lowest bit left after AND-ing
+its splits (one np.bitwise_and.reduceat). This replaces max_depth dependent
+gathers with a handful of flat passes. The level walk stays for deep forests.
+
+LightGBM sends NaN to the default child only for 'NaN'/'Zero' missing types;
+with missing_type None it compares NaN as 0.0, and so does CompiledTrees. The .npz file
+holds the arrays plus the bundle metadata (class list, window length, feature
+names and the scaler as an affine transform), and ModelServer loads it
+without importing sklearn or lightgbm at all.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+MISSING_NONE, MISSING_ZERO, MISSING_NAN = 0, 1, 2
+ZERO_THRESHOLD = 1e-35  # LightGBM treats |x| <= kZeroThreshold as zero/missing
+MAX_BITVECTOR_LEAVES = 64
+
+
+def _go_left(values, threshold, missing, default_left, nan_as_zero):
+    """Split decisions for gathered feature values, with LightGBM's missing-value rules."""
+    if nan_as_zero:
+        values = np.where(np.isnan(values) & (missing == MISSING_NONE), 0.0, values)
+    go_left = values <= threshold
+    if (missing != MISSING_NONE).any():
+        is_missing = ((missing == MISSING_NAN) & np.isnan(values)) | \
+                     ((missing == MISSING_ZERO) & ((np.abs(values) <= ZERO_THRESHOLD) | np.isnan(values)))
+        go_left = np.where(is_missing, default_left, go_left)
+    return go_left
+
+
+class CompiledTrees:
+    """Array-backed tree ensemble with an sklearn-like predict_proba."""
+
+    def __init__(self, arrays, meta):
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.default_left = arrays['default_left']
+        self.missing = arrays['missing']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+        self.tree_class = arrays['tree_class']
+        self.kind = meta['kind']  # 'forest' (average leaf distributions) or 'boosting' (sum raw scores)
+        self.objective = meta.get('objective', '')
+        self.max_depth = meta['max_depth']
+        self.n_features_in_ = meta['n_features']
+        self.classes_ = np.array(meta['classes'])
+        self.float32_inputs = meta.get('float32_inputs', False)
+        self.nan_as_zero = meta.get('nan_as_zero', self.kind == 'boosting')
+        self.has_missing = bool((self.missing != MISSING_NONE).any())
+        self.bitvector = 'bv_starts' in arrays
+        if self.bitvector:
+            self._bv_feature = arrays['bv_feature'].astype(np.intp)
+            self._bv_threshold = arrays['bv_threshold']
+            self._bv_missing = arrays['bv_missing']
+            self._bv_default_left = arrays['bv_default_left']
+            self._bv_left_bits = arrays['bv_left_bits']
+            self._bv_keep_right = ~self._bv_left_bits  # bits that survive a split going right
+            self._bv_starts = arrays['bv_starts']
+            self._bv_leaf_offset = np.arange(len(self.roots)) * arrays['bv_leaves'].shape[1]
+            self._bv_leaves = arrays['bv_leaves'].ravel()
+            self._bv_has_missing = bool((self._bv_missing != MISSING_NONE).any())
+        # children[2 * node + go_left] -> next node, so each step is one flat gather
+        self._children = np.stack([self.right, self.left], axis=1).ravel()
+        self._class_onehot = (self.tree_class[:, None] == np.arange(len(self.classes_))).astype(np.float64)
+        self._leaf_value = np.ascontiguousarray(self.value[:, 0])  # boosting: one raw score per leaf
+
+    def apply(self, X):
+        """Leaf index reached in every tree: (batch, n_trees)."""
+        X = np.asarray(X, dtype=np.float64)
+        if self.float32_inputs:  # sklearn compares float32-cast inputs against its thresholds
+            X = X.astype(np.float32).astype(np.float64)
+        nan_as_zero = self.nan_as_zero and bool(np.isnan(X).any())
+        if self.bitvector:
+            return self._apply_bitvector(X, nan_as_zero)
+        flat = X.ravel()
+        row_base = (np.arange(len(X)) * X.shape[1])[:, None]
+        nodes = np.repeat(self.roots[None, :], len(X), axis=0)
+        # ndarray.take is several times cheaper than fancy indexing for these small gathers
+        for _ in range(self.max_depth):
+            values = flat.take(row_base + self.feature.take(nodes))
+            if self.has_missing or nan_as_zero:
+                go_left = _go_left(values, self.threshold.take(nodes), self.missing.take(nodes),
+                                   self.default_left.take(nodes), nan_as_zero)
+            else:
+                go_left = values <= self.threshold.take(nodes)
+            nodes = self._children.take(2 * nodes + go_left)
+        return nodes
+
+    def _apply_bitvector(self, X, nan_as_zero):
+        values = X.take(self._bv_feature, axis=1)  # every split of every tree at once
+        if self._bv_has_missing or nan_as_zero:
+            go_left = _go_left(values, self._bv_threshold, self._bv_missing, self._bv_default_left,
+                               nan_as_zero)
+        else:
+            go_left = values <= self._bv_threshold
+        keep = np.multiply(self._bv_left_bits, go_left, dtype=self._bv_left_bits.dtype)
+        keep |= self._bv_keep_right
+        alive = np.bitwise_and.reduceat(keep, self._bv_starts, axis=1)
+        lowest = alive & (~alive + 1)  # the exit leaf is the leftmost leaf no split ruled out
+        bit = np.log2(lowest.astype(np.float64)).astype(np.intp)
+        return self._bv_leaves.take(self._bv_leaf_offset + bit)
+
+    def predict_proba(self, X):
+        leaves = self.apply(X)
+        if self.kind == 'forest':
+            return self.value[leaves].mean(axis=1)
+        raw = self._leaf_value.take(leaves) @ self._class_onehot
+        if self.objective == 'binary':
+            p = 1.0 / (1.0 + np.exp(-raw[:, 0]))
+            return np.stack([1.0 - p, p], axis=1)
+        raw -= raw.max(axis=1, keepdims=True)
+        exp = np.exp(raw)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+class AffineScaler:
+    """StandardScaler / MinMaxScaler reduced to X * scale + offset."""
+
+    def __init__(self, scale, offset):
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.offset = np.asarray(offset, dtype=np.float64)
+        self.n_features_in_ = len(self.scale)
+
+    def transform(self, X):
+        return np.asarray(X, dtype=np.float64) * self.scale + self.offset
+
+
+def _node_arrays(n_nodes, n_outputs):
+    return {
+        'feature': np.zeros(n_nodes, dtype=np.int32),
+        'threshold': np.zeros(n_nodes, dtype=np.float64),
+        'left': np.zeros(n_nodes, dtype=np.int32),
+        'right': np.zeros(n_nodes, dtype=np.int32),
+        'default_left': np.zeros(n_nodes, dtype=bool),
+        'missing': np.zeros(n_nodes, dtype=np.int8),
+        'value': np.zeros((n_nodes, n_outputs), dtype=np.float64),
+    }
+
+
+def _depth(left, right, root):
+    depth, frontier = 0, [root]
+    while True:
+        children = [c for node in frontier for c in (left[node], right[node]) if c != node]
+        if not children:
+            return depth
+        frontier = children
+        depth += 1
+
+
+def bitvector_arrays(arrays):
+    """The bitvector layout (see module docstring) of flat node arrays, or None if a tree is too big."""
+    left, right = arrays['left'], arrays['right']
+    trees = []
+    for root in arrays['roots']:
+        leaves, splits = [], []  # leaves left to right; (node, first leaf, leaves in left subtree)
+
+        def visit(node):
+            if left[node] == node:
+                leaves.append(node)
+                return 1
+            first = len(leaves)
+            n_left = visit(left[node])
+            splits.append((node, first, n_left))
+            return n_left + visit(right[node])
+
+        visit(int(root))
+        if len(leaves) > MAX_BITVECTOR_LEAVES:
+            return None
+        trees.append((leaves, splits))
+
+    width = max(len(leaves) for leaves, _ in trees)
+    dtype = np.uint32 if width <= 32 else np.uint64
+    nodes, bits, starts = [], [], []
+    for leaves, splits in trees:
+        starts.append(len(nodes))
+        if not splits:  # single-leaf tree: one split that never rules anything out
+            nodes.append(leaves[0])
+            bits.append(0)
+        for node, first, n_left in splits:
+            nodes.append(node)
+            bits.append(((1 << n_left) - 1) << first)
+    nodes = np.array(nodes, dtype=np.int64)
+    leaf_table = np.zeros((len(trees), width), dtype=np.int32)
+    for i, (leaves, _) in enumerate(trees):
+        leaf_table[i, :len(leaves)] = leaves
+    return {
+        'bv_feature': arrays['feature'][nodes],
+        'bv_threshold': arrays['threshold'][nodes],
+        'bv_missing': arrays['missing'][nodes],
+        'bv_default_left': arrays['default_left'][nodes],
+        'bv_left_bits': np.array(bits, dtype=dtype),
+        'bv_starts': np.array(starts, dtype=np.intp),
+        'bv_leaves': leaf_table,
+    }
+
+
+def export_random_forest(forest):
+    """Flatten a fitted sklearn forest (RandomForest/ExtraTrees classifier)."""
+    trees = [est.tree_ for est in forest.estimators_]
+    n_classes = len(forest.classes_)
+    arrays = _node_arrays(sum(t.node_count for t in trees), n_classes)
+    roots, depth, offset = [], 0, 0
+    for t in trees:
+        n = t.node_count
+        span = slice(offset, offset + n)
+        own = np.arange(offset, offset + n, dtype=np.int32)
+        is_leaf = t.children_left < 0
+        arrays['feature'][span] = np.where(is_leaf, 0, t.feature)
+        arrays['threshold'][span] = t.threshold
+        arrays['left'][span] = np.where(is_leaf, own, t.children_left + offset)
+        arrays['right'][span] = np.where(is_leaf, own, t.children_right + offset)
+        value = t.value[:, 0, :]
+        arrays['value'][span] = value / np.maximum(value.sum(axis=1, keepdims=True), 1e-300)
+        roots.append(offset)
+        depth = max(depth, t.max_depth)
+        offset += n
+    arrays['roots'] = np.array(roots, dtype=np.int32)
+    arrays['tree_class'] = np.zeros(len(trees), dtype=np.int32)
+    meta = {'kind': 'forest', 'max_depth': int(depth), 'n_features': int(forest.n_features_in_),
+            'classes': [int(c) for c in forest.classes_], 'float32_inputs': True}
+    return arrays, meta
+
+
+def export_lightgbm(booster):
+    """Flatten a lightgbm.Booster (multiclass or binary, numerical splits only)."""
+    dump = booster.dump_model()
+    num_class = dump.get('num_class', 1)
+    objective = dump.get('objective', '').split()[0] if dump.get('objective') else ''
+    nodes = []  # (feature, threshold, left, right, default_left, missing, value)
+    roots, tree_class = [], []
+
+    def add(node):
+        index = len(nodes)
+        nodes.append(None)
+        if 'leaf_value' in node:
+            nodes[index] = (0, 0.0, index, index, False, MISSING_NONE, node['leaf_value'])
+            return index
+        if node.get('decision_type', '<=') != '<=':
+            raise ValueError(f"Unsupported LightGBM split type {node['decision_type']} (categorical features)")
+        missing = {'None': MISSING_NONE, 'Zero': MISSING_ZERO, 'NaN': MISSING_NAN}[node.get('missing_type', 'None')]
+        left = add(node['left_child'])
+        right = add(node['right_child'])
+        nodes[index] = (node['split_feature'], float(node['threshold']), left, right,
+                        bool(node.get('default_left', True)), missing, 0.0)
+        return index
+
+    for i, tree in enumerate(dump['tree_info']):
+        roots.append(add(tree['tree_structure']))
+        tree_class.append(i % num_class)
+
+    arrays = _node_arrays(len(nodes), 1)
+    for i, (feature, threshold, left, right, default_left, missing, value) in enumerate(nodes):
+        arrays['feature'][i] = feature
+        arrays['threshold'][i] = threshold
+        arrays['left'][i] = left
+        arrays['right'][i] = right
+        arrays['default_left'][i] = default_left
+        arrays['missing'][i] = missing
+        arrays['value'][i, 0] = value
+    arrays['roots'] = np.array(roots, dtype=np.int32)
+    arrays['tree_class'] = np.array(tree_class, dtype=np.int32)  # binary: every tree scores class 0
+    depth = max(_depth(arrays['left'], arrays['right'], r) for r in roots)
+    n_classes = num_class if objective != 'binary' else 2
+    meta = {'kind': 'boosting', 'objective': objective, 'max_depth': int(depth),
+            'n_features': int(booster.num_feature()), 'classes': list(range(n_classes)), 'nan_as_zero': True}
+    arrays.update(bitvector_arrays(arrays) or {})
+    return arrays, meta
+
+
+def export_model(model):
+    if hasattr(model, 'estimators_'):
+        return export_random_forest(model)
+    if hasattr(model, 'dump_model'):
+        return export_lightgbm(model)
+    raise ValueError(f"Don't know how to export {type(model).__name__}; expected a tree forest or LightGBM booster")
+
+
+def export_scaler(scaler):
+    if scaler is None:
+        return None
+    if hasattr(scaler, 'mean_'):  # StandardScaler
+        scale = 1.0 / np.where(scaler.scale_ == 0, 1.0, scaler.scale_) if scaler.scale_ is not None else np.ones_like(scaler.mean_)
+        return scale, -scaler.mean_ * scale
+    if hasattr(scaler, 'min_'):  # MinMaxScaler
+        return scaler.scale_, scaler.min_
+    raise ValueError(f"Don't know how to export scaler {type(scaler).__name__}")
+
+
+def export_bundle(bundle, out_path):
+    """Write a serving bundle (see serving.save_bundle) as a compiled .npz file."""
+    arrays, model_meta = export_model(bundle['model'])
+    scaler = export_scaler(bundle['scaler'])
+    if scaler is not None:
+        arrays['scaler_scale'], arrays['scaler_offset'] = scaler
+    meta = {key: bundle[key] for key in
+            ['version', 'features', 'feature_names', 'n_features', 'class_list', 'window_rows', 'created']}
+    meta['sample_rate'] = bundle.get('sample_rate')
+    meta['metadata'] = bundle.get('metadata', {})
+    meta['model'] = model_meta
+    np.savez(out_path, meta=np.array(json.dumps(meta)), **arrays)
+    print(f"Compiled model saved to {out_path}")
+
+
+def load_compiled(path):
+    """Read a compiled .npz into a bundle dict that ModelServer accepts."""
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data['meta']))
+        arrays = {key: data[key] for key in data.files if key != 'meta'}
+    bundle = {key: value for key, value in meta.items() if key != 'model'}
+    bundle['model'] = CompiledTrees(arrays, meta['model'])
+    bundle['scaler'] = AffineScaler(arrays['scaler_scale'], arrays['scaler_offset']) \
+        if 'scaler_scale' in arrays else None
+    return bundle
+
+
+def benchmark(bundle, compiled, n=500):
+    """Single-window latency of the original model vs the compiled arrays."""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(n, bundle['n_features']))
+    if bundle['scaler'] is not None:
+        X = bundle['scaler'].transform(X)
+    model = bundle['model']
+    original = model.predict_proba if hasattr(model, 'predict_proba') else model.predict
+
+    results = {}
+    for name, predict in [('original', original), ('compiled', compiled.predict_proba)]:
+        predict(X[:1])  # warm-up
+        start = time.perf_counter()
+        for i in range(n):
+            predict(X[i:i + 1])
+        results[name] = (time.perf_counter() - start) / n * 1e6
+
+    agree = np.mean(np.argmax(np.asarray(original(X)).reshape(n, -1), axis=1) ==
+                    np.argmax(compiled.predict_proba(X), axis=1))
+    print(f"single-window latency: original {results['original']:.1f} us, "
+          f"compiled {results['compiled']:.1f} us ({results['original'] / results['compiled']:.1f}x), "
+          f"agreement {agree:.1%}")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compile a model bundle to flat NumPy arrays")
+    parser.add_argument('bundle', help="bundle written by svm.py / lgbm.py, e.g. ../model/bundle.pkl")
+    parser.add_argument('output', help="compiled output, e.g. ../model/bundle.npz")
+    parser.add_argument('--benchmark', action='store_true', help="compare single-window latency")
+    args = parser.parse_args()
+
+    import joblib
+    bundle = joblib.load(args.bundle)
+    export_bundle(bundle, args.output)
+    if args.benchmark:
+        benchmark(bundle, load_compiled(args.output)['model'])